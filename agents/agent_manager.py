@@ -3,50 +3,95 @@ from src.core.agent_communication import MessageBroker
 from src.agents.implementations import (
     SensingAgent, AnalysisAgent, AlertAgent, CoordinationAgent
 )
+from src.agents.sharding import ShardedSensing
 
 class AgentManager:
     def __init__(self, config):
         self.config = config
         self.broker = MessageBroker()
         self.agents = {}
-    
+        self.sensing_shards = None
+        self.model_pipeline = None
+
     async def initialize_agents(self):
         """Initialize all agents based on configuration"""
-        
-        # Create Sensing Agents
-        if self.config['agents']['sensing']['enabled']:
-            for i in range(self.config['agents']['sensing']['count']):
+
+        # Create Sensing Agents. With `processes` > 0 they run in worker
+        # processes, sensor_ids partitioned across shards and `count` agents
+        # spread over them; otherwise every agent runs on this event loop.
+        sensing = self.config['agents']['sensing']
+        if sensing['enabled'] and sensing.get('processes', 0) > 0:
+            self.sensing_shards = ShardedSensing(
+                self.broker,
+                sensing['sensor_ids'],
+                shards=sensing['processes'],
+                agents_per_shard=max(1, sensing['count'] // sensing['processes']),
+                interval=sensing.get('interval', 1.0),
+                batch_size=sensing.get('batch_size', 256),
+                max_restarts=sensing.get('max_restarts', 5),
+                locations=sensing.get('locations'),
+            )
+        elif sensing['enabled']:
+            for i in range(sensing['count']):
                 agent = SensingAgent(
                     f"sensing_agent_{i}",
                     self.broker,
-                    self.config['agents']['sensing']['sensor_ids']
+                    sensing['sensor_ids'],
+                    locations=sensing.get('locations')
                 )
                 self.agents[agent.agent_id] = agent
-        
-        # Create Analysis Agent
-        if self.config['agents']['analysis']['enabled']:
-            agent = AnalysisAgent("analysis_agent", self.broker)
+
+        # Create Analysis Agent. An optional `model` ({name, path, max_batch_size,
+        # max_latency}) also scores readings through the batched inference engine.
+        analysis = self.config['agents']['analysis']
+        if analysis['enabled']:
+            model = analysis.get('model')
+            if model:
+                from models.ml_model import registry
+                from pipelines.model_pipeline import ModelPipeline
+                registry.register_path(model['name'], model['path'])
+                self.model_pipeline = ModelPipeline(
+                    max_batch_size=model.get('max_batch_size', 256),
+                    max_latency=model.get('max_latency', 0.005)
+                )
+            agent = AnalysisAgent("analysis_agent", self.broker, engine=self.model_pipeline,
+                                  model=model['name'] if model else "sensor-anomaly")
             self.agents[agent.agent_id] = agent
-        
+
         # Create Alert Agent
         if self.config['agents']['alert']['enabled']:
             agent = AlertAgent("alert_agent", self.broker)
             self.agents[agent.agent_id] = agent
-        
+
         # Create Coordination Agent
         if self.config['agents']['coordination']['enabled']:
             agent = CoordinationAgent("coordination_agent", self.broker)
             self.agents[agent.agent_id] = agent
-    
+
     async def start_all_agents(self):
-        """Start all initialized agents"""
+        """Start all initialized agents (and the sensing shard supervisor)"""
         tasks = [
             asyncio.create_task(agent.start())
             for agent in self.agents.values()
         ]
+        if self.sensing_shards is not None:
+            tasks.extend(await self.sensing_shards.start())
         return tasks
-    
+
     async def stop_all_agents(self):
         """Stop all agents gracefully"""
+        if self.sensing_shards is not None:
+            await self.sensing_shards.stop()
         for agent in self.agents.values():
             await agent.stop()
+        if self.model_pipeline is not None:
+            await self.model_pipeline.stop()
+
+    def get_status(self):
+        """Broker metrics plus per-shard process health"""
+        status = {"agents": list(self.agents), "broker": self.broker.get_metrics()}
+        if self.sensing_shards is not None:
+            status["sensing_shards"] = self.sensing_shards.status()
+        if self.model_pipeline is not None:
+            status["model_pipeline"] = self.model_pipeline.metrics()
+        return status
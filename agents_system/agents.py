@@ -1,59 +1,289 @@
-# Agent wiring using OpenAI Agents SDK
-instructions="""
-You are GreenMind Coordinator. Orchestrate: DataIngestor -> Analyzer -> Planner -> Executor -> Reporter.
-Given user goal, call the appropriate agents and return a JSON summary.
-"""
-)
-
-
-# For simple prototype we'll represent other agents as thin wrappers
-
-
-data_ingestor_agent = Agent(
-name="DataIngestor",
-instructions="""
-Fetch data for a given region using the data_ingestor.fetch_forest_cover function.
-Return a compact JSON with fields required by Analyzer.
-""",
-tools=[fetch_forest_cover]
-)
-
-
-analyzer_agent = Agent(
-name="Analyzer",
-instructions="""
-Analyze metrics and detect anomalies. Return analysis with keys: is_anomaly, percent_change.
-""",
-tools=[detect_anomaly]
-)
-
-
-planner_agent = Agent(
-name="Planner",
-instructions="""
-Create a mitigation plan from analysis output.
-""",
-tools=[build_plan]
-)
-
-
-executor_agent = Agent(
-name="Executor",
-instructions="""
-Execute plan actions (create ticket, notify Slack) and return execution results.
-""",
-tools=[execute_actions]
-)
-
-
-reporter_agent = Agent(
-name="Reporter",
-instructions="""
-Generate a human-friendly report (markdown or plain text) summarizing metrics, analysis, plan, execution.
-""",
-tools=[make_report]
-)
-
-
-# Wire handoffs
-coordinator.handoffs = [data_ingestor_agent, analyzer_agent, planner_agent, executor_agent, reporter_agent]
\ No newline at end of file
+# Agent wiring using OpenAI Agents SDK
+"""GreenMind coordinator.
+
+The fixed DataIngestor -> Analyzer -> Planner -> Executor -> Reporter chain is
+deterministic, so `Coordinator` runs it as direct calls (the orchestrator's
+region pipeline) and only asks a model to reason about regions the analyzer
+flags as anomalous. Non-anomalous regions cost no model calls. Model answers
+are memoized in a SQLite `ModelCache` keyed by the model, its instructions and
+the normalized inputs, so re-running a region with unchanged numbers costs
+none either.
+
+A model is any object with a `name` and ``async complete(instructions, prompt)
+-> str``: `AgentsSDKModel` (OpenAI Agents SDK) in production, `StubModel` in
+tests and offline runs. `build_coordinator_agent()` still builds the original
+all-LLM handoff graph for interactive use.
+
+The SDK's import name, `agents`, is also the name of this repo's own agent
+package; when the repo comes first on sys.path the SDK is loaded from the
+rest of sys.path under a private module name instead (see `_sdk`).
+"""
+import asyncio
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import metrics as instrumentation
+from .timeseries import sqlite_path
+
+REVIEW_INSTRUCTIONS = """
+You are GreenMind Analyst. A region's forest cover changed more than the alert threshold between two
+Sentinel-2 windows. Given the metrics as JSON, assess the likely cause and severity.
+Answer with JSON only: {"summary": str, "severity": "low" | "medium" | "high", "steps": [str, ...]}
+where steps are at most three extra actions beyond validating imagery and a ground survey.
+"""
+
+# Metric fields the review prompt is built from (and the cache key is normalized over).
+REVIEW_FIELDS = ("region", "forest_percent", "previous_forest_percent", "ndvi_mean", "previous_ndvi_mean",
+                 "ndvi_percentiles", "valid_pixels", "loss")
+FLOAT_DIGITS = 2
+
+
+def normalize(value: Any, digits: int = FLOAT_DIGITS) -> Any:
+    """Round floats (recursively) so inputs that differ only in noise share a cache key."""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {str(k): normalize(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v, digits) for v in value]
+    return value
+
+
+def cache_key(model: str, instructions: str, payload: Dict[str, Any]) -> str:
+    canonical = json.dumps([model, instructions.strip(), normalize(payload)], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ModelCache:
+    """Persistent model response cache (a SQLite table next to the metrics history)."""
+
+    def __init__(self, database_url: Optional[str] = None, ttl: Optional[float] = None):
+        if database_url is None:
+            from .config import get_settings
+            database_url = get_settings().database_url
+        self.ttl = ttl
+        self._conn = sqlite3.connect(sqlite_path(database_url), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS model_responses ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM model_responses WHERE key = ?",
+                                     (key,)).fetchone()
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO model_responses (key, model, response, created_at)"
+                               " VALUES (?, ?, ?, ?)", (key, model, response, time.time()))
+
+    def close(self):
+        self._conn.close()
+
+
+class StubModel:
+    """Deterministic local model: answers from the numbers in the prompt, records every call."""
+
+    name = "stub"
+
+    def __init__(self, reply: Optional[str] = None):
+        self.reply = reply
+        self.calls: List[Tuple[str, str]] = []
+
+    async def complete(self, instructions: str, prompt: str) -> str:
+        self.calls.append((instructions, prompt))
+        if self.reply is not None:
+            return self.reply
+        data = json.loads(prompt)
+        change = data.get("percent_change") or 0.0
+        severity = "high" if abs(change) >= 15 else "medium" if abs(change) >= 5 else "low"
+        return json.dumps({"summary": f"{data.get('region')}: forest cover changed {change:+.1f}%",
+                           "severity": severity, "steps": []})
+
+
+class AgentsSDKModel:
+    """OpenAI Agents SDK backend; the SDK is imported on first use."""
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.name = model
+
+    async def complete(self, instructions: str, prompt: str) -> str:
+        Agent, Runner, _ = _sdk()
+        agent = Agent(name="Analyst", instructions=instructions, model=self.name)
+        result = await Runner.run(agent, prompt)
+        return str(result.final_output)
+
+
+_SDK_MODULE = "_openai_agents_sdk"
+
+
+def _load_sdk():
+    """Import the SDK's `agents` package from sys.path minus the repo root, as `_SDK_MODULE`."""
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = [p for p in sys.path if os.path.abspath(p or os.curdir) != repo]
+    spec = importlib.machinery.PathFinder.find_spec("agents", path)
+    if spec is None or not spec.submodule_search_locations:
+        raise RuntimeError("the OpenAI Agents SDK (openai-agents) is required for LLM mode")
+    spec = importlib.util.spec_from_file_location(_SDK_MODULE, spec.origin,
+                                                  submodule_search_locations=list(spec.submodule_search_locations))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[_SDK_MODULE] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception as exc:
+        del sys.modules[_SDK_MODULE]
+        raise RuntimeError("the OpenAI Agents SDK (openai-agents) failed to import") from exc
+    if not hasattr(module, "Runner"):
+        del sys.modules[_SDK_MODULE]
+        raise RuntimeError("the OpenAI Agents SDK (openai-agents) is required for LLM mode")
+    return module
+
+
+def _sdk():
+    sdk = sys.modules.get("agents")
+    if not hasattr(sdk, "Runner"):  # not imported yet, or the repo's own `agents` package
+        sdk = sys.modules.get(_SDK_MODULE) or _load_sdk()
+    return sdk.Agent, sdk.Runner, sdk.function_tool
+
+
+def _parse_review(text: str) -> Dict[str, Any]:
+    try:
+        review = json.loads(text)
+    except (TypeError, ValueError):
+        return {"summary": str(text).strip()}
+    return review if isinstance(review, dict) else {"summary": str(review)}
+
+
+class Coordinator:
+    """Deterministic region pipeline with model review of anomalous regions only.
+
+    `review_all=True` also reviews regions the analyzer did not flag.
+    """
+
+    def __init__(self, model=None, cache: Optional[ModelCache] = None,
+                 instructions: str = REVIEW_INSTRUCTIONS, review_all: bool = False):
+        self.model = model or StubModel()
+        self.cache = cache
+        self.instructions = instructions
+        self.review_all = review_all
+        self.stats = {"reviewed": 0, "skipped": 0, "model_calls": 0, "cache_hits": 0}
+
+    def _payload(self, metrics: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {k: metrics[k] for k in REVIEW_FIELDS if k in metrics}
+        payload["percent_change"] = analysis.get("percent_change")
+        if "z_score" in analysis:
+            payload["z_score"] = analysis["z_score"]
+        return normalize(payload)
+
+    async def review(self, metrics: Dict[str, Any], analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Orchestrator reviewer hook: None (no model call) unless the region is anomalous."""
+        if not (analysis.get("is_anomaly") or self.review_all):
+            self.stats["skipped"] += 1
+            return None
+        self.stats["reviewed"] += 1
+        payload = self._payload(metrics, analysis)
+        key = cache_key(self.model.name, self.instructions, payload)
+        text = await asyncio.to_thread(self.cache.get, key) if self.cache is not None else None
+        calls = instrumentation.counter("model_reviews_total", "Anomaly reviews by source")
+        if text is not None:
+            self.stats["cache_hits"] += 1
+            calls.inc(source="cache")
+        else:
+            self.stats["model_calls"] += 1
+            calls.inc(source="model")
+            with instrumentation.span("model_call", model=self.model.name):
+                text = await self.model.complete(self.instructions, json.dumps(payload, sort_keys=True))
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, key, self.model.name, text)
+        return dict(_parse_review(text), model=self.model.name)
+
+    async def run(self, region: str, bbox=None, **kwargs) -> Dict[str, Any]:
+        from .orchestrator import run_for_region
+        return await run_for_region(region, bbox=bbox, reviewer=self.review, **kwargs)
+
+    def run_many(self, regions, **kwargs):
+        """Async iterator over results for many regions (see orchestrator.run_for_regions)."""
+        from .orchestrator import run_for_regions
+        return run_for_regions(regions, reviewer=self.review, **kwargs)
+
+
+def build_coordinator_agent():
+    """The original all-LLM coordinator: every stage is a model handoff (slow, token-heavy)."""
+    Agent, _, function_tool = _sdk()
+    from .data_ingestor import fetch_forest_cover
+    from .analyzer import detect_anomaly
+    from .planner import build_plan
+    from .executor import execute_actions
+    from .reporter import make_report
+
+    coordinator = Agent(
+        name="Coordinator",
+        instructions="""
+You are GreenMind Coordinator. Orchestrate: DataIngestor -> Analyzer -> Planner -> Executor -> Reporter.
+Given user goal, call the appropriate agents and return a JSON summary.
+"""
+    )
+
+    # For simple prototype we'll represent other agents as thin wrappers
+
+    data_ingestor_agent = Agent(
+        name="DataIngestor",
+        instructions="""
+Fetch data for a given region using the data_ingestor.fetch_forest_cover function.
+Return a compact JSON with fields required by Analyzer.
+""",
+        tools=[function_tool(fetch_forest_cover)]
+    )
+
+    analyzer_agent = Agent(
+        name="Analyzer",
+        instructions="""
+Analyze metrics and detect anomalies. Return analysis with keys: is_anomaly, percent_change.
+""",
+        tools=[function_tool(detect_anomaly)]
+    )
+
+    planner_agent = Agent(
+        name="Planner",
+        instructions="""
+Create a mitigation plan from analysis output.
+""",
+        tools=[function_tool(build_plan)]
+    )
+
+    executor_agent = Agent(
+        name="Executor",
+        instructions="""
+Execute plan actions (create ticket, notify Slack) and return execution results.
+""",
+        tools=[function_tool(execute_actions)]
+    )
+
+    reporter_agent = Agent(
+        name="Reporter",
+        instructions="""
+Generate a human-friendly report (markdown or plain text) summarizing metrics, analysis, plan, execution.
+""",
+        tools=[function_tool(make_report)]
+    )
+
+    # Wire handoffs
+    coordinator.handoffs = [data_ingestor_agent, analyzer_agent, planner_agent, executor_agent, reporter_agent]
+    return coordinator
@@ -1,8 +1,188 @@
-# No need to call fetch twice — the ingestor now provides both.
-async def detect_anomaly(metrics, threshold_pct=5.0):
-    cur = metrics.get("forest_percent")
-    prev = metrics.get("previous_forest_percent")
-    if not prev or not cur:
-        return {"is_anomaly": False, "reason": "missing previous data"}
-    pct_change = ((cur - prev) / prev) * 100.0
-    return {"is_anomaly": abs(pct_change) >= threshold_pct, "percent_change": pct_change}
\ No newline at end of file
+import asyncio
+import datetime
+import math
+import statistics
+from typing import Any, Dict, List, Optional
+
+
+# A single clearing this large is an anomaly even when the region-wide
+# forest_percent barely moves.
+PATCH_THRESHOLD_HA = 5.0
+
+
+def _with_patches(analysis: Dict[str, Any], metrics: Dict[str, Any],
+                  patch_threshold_ha: float = PATCH_THRESHOLD_HA) -> Dict[str, Any]:
+    """Carry the ingestor's loss patches into `analysis` and flag a patch of `patch_threshold_ha` or more."""
+    patches = metrics.get("loss_patches")
+    if not patches:
+        return analysis
+    analysis["loss_patches"] = patches
+    if patches[0]["area_ha"] >= patch_threshold_ha and not analysis.get("is_anomaly"):
+        analysis["is_anomaly"] = True
+        analysis["reason"] = f"loss patch of {patches[0]['area_ha']:g} ha"
+    return analysis
+
+
+# No need to call fetch twice — the ingestor now provides both.
+async def detect_anomaly(metrics, threshold_pct=5.0, patch_threshold_ha=PATCH_THRESHOLD_HA):
+    cur = metrics.get("forest_percent")
+    prev = metrics.get("previous_forest_percent")
+    if not prev or not cur:
+        return {"is_anomaly": False, "reason": "missing previous data"}
+    pct_change = ((cur - prev) / prev) * 100.0
+    return _with_patches({"is_anomaly": abs(pct_change) >= threshold_pct, "percent_change": pct_change},
+                         metrics, patch_threshold_ha)
+
+
+def score_anomalies(current, previous, threshold_pct: float = 5.0, patch_area_ha=None,
+                    patch_threshold_ha: float = PATCH_THRESHOLD_HA) -> Dict[str, Any]:
+    """Vectorized `detect_anomaly` over N regions given as columnar arrays.
+
+    `current`/`previous` are forest_percent values per region; None, NaN and 0
+    count as missing, as in `detect_anomaly`. `patch_area_ha` is the area of
+    each region's largest loss patch (None/NaN = no patches); a valid region
+    with a patch of `patch_threshold_ha` or more is anomalous whatever its
+    percent change. Returns arrays of length N: percent_change (NaN where
+    missing), is_anomaly, valid, and z_score, the percent change standardised
+    across the valid regions of this batch.
+    """
+    import numpy as np
+    cur = np.asarray(current, dtype=np.float64)
+    prev = np.asarray(previous, dtype=np.float64)
+    valid = np.isfinite(cur) & np.isfinite(prev) & (cur != 0) & (prev != 0)
+
+    pct_change = np.full(cur.shape, np.nan)
+    np.divide(cur - prev, prev, out=pct_change, where=valid)
+    pct_change[valid] *= 100.0
+    is_anomaly = valid & (np.abs(pct_change, where=valid, out=np.zeros_like(pct_change)) >= threshold_pct)
+    if patch_area_ha is not None:
+        patch = np.asarray(patch_area_ha, dtype=np.float64)
+        is_anomaly |= valid & (np.nan_to_num(patch, nan=0.0) >= patch_threshold_ha)
+
+    z_score = np.full(cur.shape, np.nan)
+    if valid.any():
+        values = pct_change[valid]
+        std = values.std()
+        z_score[valid] = (values - values.mean()) / std if std > 0 else 0.0
+    return {"percent_change": pct_change, "is_anomaly": is_anomaly, "valid": valid, "z_score": z_score}
+
+
+def detect_anomalies_batch(regions, current, previous, threshold_pct: float = 5.0,
+                           limit: Optional[int] = None, patch_area_ha=None,
+                           patch_threshold_ha: float = PATCH_THRESHOLD_HA) -> List[Dict[str, Any]]:
+    """Score N regions at once and return the anomalous ones, most severe first.
+
+    Severity is the absolute percent change; ties keep the input order. Each
+    entry carries region, percent_change, z_score and rank (1 = most severe).
+    Loss patches are flagged as in `score_anomalies`.
+    """
+    import numpy as np
+    scores = score_anomalies(current, previous, threshold_pct, patch_area_ha, patch_threshold_ha)
+    idx = np.flatnonzero(scores["is_anomaly"])
+    order = idx[np.argsort(-np.abs(scores["percent_change"][idx]), kind="stable")]
+    if limit is not None:
+        order = order[:limit]
+    pct = scores["percent_change"][order].tolist()
+    z = scores["z_score"][order].tolist()
+    return [
+        {"region": regions[i], "is_anomaly": True, "percent_change": p, "z_score": zs, "rank": rank}
+        for rank, (i, p, zs) in enumerate(zip(order.tolist(), pct, z), start=1)
+    ]
+
+
+def _seasonal_ranges(date: str, first_year: int, window_days: int) -> List[tuple]:
+    """Inclusive ISO date ranges of the same time of year (+/- `window_days`) in each year before `date`'s."""
+    day = datetime.date.fromisoformat(date)
+    before = datetime.date(day.year, 1, 1) - datetime.timedelta(days=1)
+    window = datetime.timedelta(days=window_days)
+    ranges = []
+    for year in range(first_year, day.year):
+        try:
+            same_day = day.replace(year=year)
+        except ValueError:  # 29 Feb
+            same_day = day.replace(year=year, day=28)
+        ranges.append(((same_day - window).isoformat(), min(same_day + window, before).isoformat()))
+    return ranges
+
+
+def _seasonal_median(store, region: str, date: str, window_days: int = 15) -> Optional[float]:
+    """Median forest_percent of the same time of year (+/- `window_days`) in earlier years.
+
+    Only those date ranges are read from the store, not the region's whole history.
+    """
+    first = store.first_date(region)
+    if first is None:
+        return None
+    # A window around New Year reaches into the year after its own.
+    values = store.values_between(region, _seasonal_ranges(date, int(first[:4]) - 1, window_days))
+    return statistics.median(values) if len(values) >= 2 else None
+
+
+async def detect_anomaly_incremental(metrics: Dict[str, Any], store, threshold_pct: float = 5.0,
+                                     alpha: float = 0.3, z_threshold: float = 3.0,
+                                     min_history: int = 3) -> Dict[str, Any]:
+    """Detect anomalies against a rolling per-region baseline kept in `store`.
+
+    Only the current window is needed. The baseline is an EWMA of
+    forest_percent with an exponentially weighted variance; when the store has
+    at least two values from the same season in earlier years, their median is
+    used instead. A region is anomalous when the percent change from the
+    baseline reaches `threshold_pct`, or, once `min_history` points are in, its
+    z-score reaches `z_threshold`. The first run seeds the baseline from
+    `previous_forest_percent` when present. The metrics are recorded in
+    `store` and the baseline is advanced once per region and date. Store
+    calls run in a worker thread, off the event loop.
+    """
+    region = metrics["region"]
+    date = metrics["date"]
+    cur = metrics.get("forest_percent")
+    if cur is None or math.isnan(cur):
+        return {"is_anomaly": False, "reason": "missing current data"}
+
+    def save(state):
+        store.record(metrics)
+        store.save_baseline(region, state)
+
+    state = await asyncio.to_thread(store.get_baseline, region)
+    if state is None:
+        prev = metrics.get("previous_forest_percent")
+        if prev is None or math.isnan(prev):
+            await asyncio.to_thread(save, {"ewma": cur, "ewvar": 0.0, "count": 1, "last_date": date})
+            return {"is_anomaly": False, "reason": "no baseline yet"}
+        state = {"ewma": prev, "ewvar": 0.0, "count": 1, "last_date": None}
+
+    base, update = state, True
+    if state["last_date"] is not None and date <= state["last_date"]:
+        if date == state["last_date"] and state.get("previous_state"):
+            base = state["previous_state"]  # re-run of the latest date: redo its update
+        else:
+            update = False  # older than the baseline: score only
+
+    seasonal = await asyncio.to_thread(_seasonal_median, store, region, date)
+    baseline = seasonal if seasonal is not None else base["ewma"]
+    method = "seasonal_median" if seasonal is not None else "ewma"
+
+    pct_change = ((cur - baseline) / baseline) * 100.0 if baseline else 0.0
+    z_score = None
+    if base["count"] >= min_history and base["ewvar"] > 0:
+        z_score = (cur - base["ewma"]) / math.sqrt(base["ewvar"])
+    is_anomaly = abs(pct_change) >= threshold_pct or (z_score is not None and abs(z_score) >= z_threshold)
+
+    if update:
+        diff = cur - base["ewma"]
+        incr = alpha * diff
+        await asyncio.to_thread(save, {
+            "ewma": base["ewma"] + incr,
+            "ewvar": (1 - alpha) * (base["ewvar"] + diff * incr),
+            "count": base["count"] + 1,
+            "last_date": date,
+            "previous_state": {k: v for k, v in base.items() if k != "previous_state"},
+        })
+
+    return _with_patches({
+        "is_anomaly": is_anomaly,
+        "percent_change": pct_change,
+        "baseline": baseline,
+        "baseline_method": method,
+        "z_score": z_score,
+    }, metrics)
@@ -1,19 +1,40 @@
-from pydantic import BaseSettings
-
-
-class Settings(BaseSettings):
-openai_api_key: str
-sentinel_client_id: str | None = None
-sentinel_client_secret: str | None = None
-database_url: str = "sqlite:///./greenmind.db"
-slack_webhook_url: str | None = None
-jira_base_url: str | None = None
-jira_api_token: str | None = None
-
-
-class Config:
-env_file = ".env"
-env_file_encoding = 'utf-8'
-
-
-settings = Settings()
\ No newline at end of file
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    # Only needed for LLM review (agents_system.agents); checked there, not here.
+    openai_api_key: str | None = None
+    sentinel_client_id: str | None = None
+    sentinel_client_secret: str | None = None
+    database_url: str = "sqlite:///./greenmind.db"
+    slack_webhook_url: str | None = None
+    jira_base_url: str | None = None
+    jira_api_token: str | None = None
+    jira_project_key: str = "GM"
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = 'utf-8'
+        extra = 'ignore'
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Settings from the environment / .env, read on first use."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def __getattr__(name):
+    # `from .config import settings` keeps working, without reading the
+    # environment at import time.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
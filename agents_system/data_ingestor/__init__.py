@@ -0,0 +1,575 @@
+# agents_system/data_ingestor/__init__.py
+import os
+import asyncio
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Tuple, Optional
+from core import metrics
+from .cache import TileCache, cache_key
+from .catalog import SentinelHubCatalogClient, WindowPlan, plan_window
+from .patches import PatchCollector, TilePatches, label_tile, loss_map
+from .reduce import NdviStats, merge_stats, reduce_ndvi
+
+if TYPE_CHECKING:
+    from sentinelhub import SHConfig, SentinelHubRequest
+
+# ======== CONFIGURATION ========
+SH_CLIENT_ID = os.getenv("SENTINELHUB_CLIENT_ID")
+SH_CLIENT_SECRET = os.getenv("SENTINELHUB_CLIENT_SECRET")
+SH_BASE_URL = os.getenv("SENTINELHUB_BASE_URL", "https://services.sentinel-hub.com")
+SH_TOKEN_URL = os.getenv("SENTINELHUB_OAUTH_TOKEN_URL", "https://oauth.sentinel-hub.com/oauth/token")
+# Upper bound on concurrent SentinelHub downloads issued from this process.
+SH_MAX_THREADS = int(os.getenv("SENTINELHUB_MAX_THREADS", "8"))
+# On-disk response cache; set SENTINELHUB_CACHE_DIR to an empty string to disable it.
+SH_CACHE_DIR = os.getenv("SENTINELHUB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "greenmind", "sentinelhub"))
+SH_CACHE_MAX_MB = int(os.getenv("SENTINELHUB_CACHE_MAX_MB", "4096"))
+# Catalog pre-check (see .catalog); set SENTINELHUB_CATALOG_PRECHECK=0 to always fetch pixels.
+SH_CATALOG_PRECHECK = os.getenv("SENTINELHUB_CATALOG_PRECHECK", "1") != "0"
+SH_MAX_CLOUD = float(os.getenv("SENTINELHUB_MAX_CLOUD", "30"))
+SH_CATALOG_MAX_WIDEN = int(os.getenv("SENTINELHUB_CATALOG_MAX_WIDEN", "1"))
+# Per-pixel loss map and loss patches (see .patches) when both windows are fetched.
+SH_LOSS_PATCHES = os.getenv("SENTINELHUB_LOSS_PATCHES", "1") != "0"
+
+# Output resolution in metres per pixel.
+RESOLUTION = 10
+# Largest output raster side the Process API accepts; bigger bboxes are tiled.
+MAX_TILE_PX = int(os.getenv("SENTINELHUB_MAX_TILE_PX", "2500"))
+
+# The sentinelhub package takes a few hundred ms to import; it is loaded on
+# first use (see get_config) so importing the ingestor stays cheap.
+_config: Optional["SHConfig"] = None
+
+
+def get_config() -> "SHConfig":
+    """SentinelHub client configuration from the SENTINELHUB_* environment, built on first use."""
+    global _config
+    if _config is None:
+        from sentinelhub import SHConfig
+        config = SHConfig()
+        config.sh_client_id = SH_CLIENT_ID
+        config.sh_client_secret = SH_CLIENT_SECRET
+        config.sh_base_url = SH_BASE_URL
+        config.sh_token_url = SH_TOKEN_URL
+        _config = config
+    return _config
+
+# ======== EVALSCRIPT (computes NDVI + vegetation mask) ========
+EVALSCRIPT = """
+//VERSION=3
+function setup() {
+  return {
+    input: [{ bands: ["B04", "B08", "dataMask"] }],
+    output: [
+      { id: "ndvi", bands: 1, sampleType: "FLOAT32" },
+      { id: "mask", bands: 1, sampleType: "UINT8" }
+    ]
+  };
+}
+
+function evaluatePixel(sample) {
+  var red = sample.B04;
+  var nir = sample.B08;
+  var ndvi = (nir - red) / (nir + red + 1e-6);
+  var mask = ndvi >= 0.4 ? 1 : 0;
+  return [ndvi, mask];
+}
+"""
+
+# ======== HELPER FUNCTIONS ========
+
+_executor: Optional[ThreadPoolExecutor] = None
+_tile_cache: Optional[TileCache] = None
+_UNSET = object()
+_catalog: Any = _UNSET
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool that runs blocking SentinelHub downloads off the event loop."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SH_MAX_THREADS, thread_name_prefix="sentinelhub")
+    return _executor
+
+
+def get_tile_cache() -> Optional[TileCache]:
+    """Shared on-disk response cache, or None when caching is disabled."""
+    global _tile_cache
+    if _tile_cache is None and SH_CACHE_DIR:
+        _tile_cache = TileCache(SH_CACHE_DIR, SH_CACHE_MAX_MB * 1024 * 1024)
+    return _tile_cache
+
+
+def get_catalog():
+    """Catalog client for the pre-check: set by set_catalog(), else the SentinelHub one when
+    credentials are configured and the pre-check is enabled, else None (no pre-check)."""
+    global _catalog
+    if _catalog is _UNSET:
+        _catalog = SentinelHubCatalogClient() if SH_CATALOG_PRECHECK and SH_CLIENT_ID else None
+    return _catalog
+
+
+def set_catalog(client):
+    """Install a catalog client (e.g. catalog.StubCatalog); None disables the pre-check."""
+    global _catalog
+    _catalog = client
+
+
+async def _run_blocking(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+
+def _build_request(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str],
+                   size: Optional[Tuple[int, int]] = None) -> "SentinelHubRequest":
+    """Build (but do not send) the SentinelHub Process API request for one window."""
+    from sentinelhub import BBox, CRS, DataCollection, MimeType, SentinelHubRequest, bbox_to_dimensions
+    bb = BBox(bbox=bbox, crs=CRS.WGS84)
+    if size is None:
+        size = bbox_to_dimensions(bb, resolution=RESOLUTION)
+    return SentinelHubRequest(
+        evalscript=EVALSCRIPT,
+        input_data=[SentinelHubRequest.input_data(
+            data_collection=DataCollection.SENTINEL2_L2A,
+            time_interval=time_range,
+            mosaicking_order='mostRecent',
+        )],
+        responses=[
+            SentinelHubRequest.output_response('ndvi', MimeType.TIFF),
+            SentinelHubRequest.output_response('mask', MimeType.TIFF),
+        ],
+        bbox=bb,
+        size=size,
+        config=get_config(),
+    )
+
+
+def _split_outputs(response):
+    """Return (ndvi, mask) from one decoded response.
+
+    With two outputs SentinelHub answers with a TAR archive, which is decoded
+    into a dict keyed by output file name.
+    """
+    if isinstance(response, dict):
+        return response["ndvi.tif"], response["mask.tif"]
+    return response[0], response[1]
+
+
+def _count_raster(source: str, ndvi, mask):
+    """Record one fetched (ndvi, mask) window in the raster counters."""
+    metrics.counter("raster_windows_total", "NDVI windows fetched, by source").inc(source=source)
+    metrics.counter("raster_bytes_total", "Decoded NDVI + mask raster bytes, by source").inc(
+        ndvi.nbytes + mask.nbytes, source=source)
+
+
+def _window_key(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str]) -> str:
+    return cache_key(bbox, time_range, EVALSCRIPT, RESOLUTION)
+
+
+def _split_pixels(n: int, max_px: int) -> List[Tuple[int, int]]:
+    """Split [0, n) into near-equal (start, end) spans no longer than `max_px`."""
+    parts = max(1, -(-n // max_px))
+    edges = [round(i * n / parts) for i in range(parts + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _tile_layout(bbox: Tuple[float, float, float, float], max_px: Optional[int] = None):
+    """(height, width) of the full-bbox pixel grid and its (tile_bbox, (width, height), (row, col)) tiles."""
+    from sentinelhub import BBox, CRS, bbox_to_dimensions
+    max_px = max_px or MAX_TILE_PX
+    width, height = bbox_to_dimensions(BBox(bbox=bbox, crs=CRS.WGS84), resolution=RESOLUTION)
+    minx, miny, maxx, maxy = bbox
+    dx = (maxx - minx) / width
+    dy = (maxy - miny) / height
+    tiles = []
+    for r0, r1 in _split_pixels(height, max_px):  # row 0 is the northern edge
+        for c0, c1 in _split_pixels(width, max_px):
+            tile_bbox = (minx + c0 * dx, maxy - r1 * dy, minx + c1 * dx, maxy - r0 * dy)
+            tiles.append((tile_bbox, (c1 - c0, r1 - r0), (r0, c0)))
+    return (height, width), tiles
+
+
+def tile_grid(bbox: Tuple[float, float, float, float],
+              max_px: Optional[int] = None) -> List[Tuple[Tuple[float, float, float, float], Tuple[int, int]]]:
+    """Split `bbox` into sub-tiles of at most `max_px` x `max_px` output pixels.
+
+    Returns (tile_bbox, (width, height)) pairs. Tile edges fall on the pixel grid
+    of the full-bbox request, so the tiles cover exactly the pixels a single
+    request for `bbox` would return, with no overlap.
+    """
+    return [(tile_bbox, size) for tile_bbox, size, _ in _tile_layout(bbox, max_px)[1]]
+
+
+def _get_window(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str],
+                size: Optional[Tuple[int, int]] = None):
+    """Blocking fetch of one (ndvi, mask) window, served from the tile cache when possible."""
+    cache = get_tile_cache()
+    if cache is not None:
+        key = _window_key(bbox, time_range)
+        hit = cache.get(key)
+        if hit is not None:
+            _count_raster("cache", *hit)
+            return hit
+    with metrics.span("sentinelhub_download", mode="single"):
+        data = _build_request(bbox, time_range, size).get_data()
+    ndvi, mask = _split_outputs(data[0])
+    _count_raster("network", ndvi, mask)
+    if cache is not None:
+        cache.put(key, ndvi, mask)
+    return ndvi, mask
+
+
+async def _make_request(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str],
+                        size: Optional[Tuple[int, int]] = None):
+    """Perform SentinelHub Process API request in the download pool; returns (ndvi, mask).
+
+    Windows already in the tile cache are served from disk without a request.
+    """
+    return await _run_blocking(_get_window, bbox, time_range, size)
+
+
+def _tile_stats(bbox, time_range, size) -> NdviStats:
+    """Blocking: fetch one tile and reduce it to additive stats; the raster is dropped here."""
+    ndvi, mask = _get_window(bbox, time_range, size)
+    with metrics.span("ndvi_reduce"):
+        return reduce_ndvi(ndvi, mask)
+
+
+def _tile_change(curr, prev) -> Tuple[NdviStats, NdviStats, TilePatches]:
+    """Blocking: reduce the current and previous (ndvi, mask) rasters of one tile and label its loss patches."""
+    with metrics.span("ndvi_reduce"):
+        curr_stats = reduce_ndvi(*curr)
+    with metrics.span("ndvi_reduce"):
+        prev_stats = reduce_ndvi(*prev)
+    with metrics.span("loss_patches"):
+        patches = label_tile(loss_map(prev[0], prev[1], curr[0], curr[1]))
+    return curr_stats, prev_stats, patches
+
+
+class _TilePair:
+    """Meeting point of a tile's two window downloads: whichever finishes second
+    computes the change in its own worker, so rasters never queue on the event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first = None
+
+    def fetch(self, index: int, bbox, time_range, size):
+        """Blocking: fetch window `index` (0 = current, 1 = previous); the second caller returns `_tile_change`."""
+        raster = _get_window(bbox, time_range, size)
+        with self._lock:
+            if self._first is None:
+                self._first = (index, raster)
+                return None
+            other, self._first = self._first, None
+        rasters = {index: raster, other[0]: other[1]}
+        return _tile_change(rasters[0], rasters[1])
+
+
+def _download_batch(requests: List["SentinelHubRequest"]) -> List[Any]:
+    """Download many requests with one multi-threaded SentinelHub client call."""
+    from sentinelhub import SentinelHubDownloadClient
+    download_requests = [dl for request in requests for dl in request.download_list]
+    client = SentinelHubDownloadClient(config=get_config())
+    return client.download(download_requests, max_threads=SH_MAX_THREADS)
+
+
+def _iter_windows(jobs: List[Tuple[Any, Tuple[str, str], Tuple[int, int]]]) -> Iterator[Tuple[Any, Any]]:
+    """Blocking: yield the (ndvi, mask) raster of each (tile_bbox, time_range, size) job, in order.
+
+    Jobs are resolved a chunk at a time: cache hits are read from disk and the
+    misses of a chunk go out in one multi-request download. Only one chunk of
+    rasters is held in memory.
+    """
+    cache = get_tile_cache()
+    chunk = 2 * SH_MAX_THREADS
+    for start in range(0, len(jobs), chunk):
+        end = min(start + chunk, len(jobs))
+        rasters = {}
+        missing = []
+        for i in range(start, end):
+            bbox, time_range, _ = jobs[i]
+            hit = cache.get(_window_key(bbox, time_range)) if cache is not None else None
+            if hit is not None:
+                _count_raster("cache", *hit)
+                rasters[i] = hit
+            else:
+                missing.append(i)
+        if missing:
+            with metrics.span("sentinelhub_download", mode="batch"):
+                responses = _download_batch([_build_request(*jobs[i]) for i in missing])
+            for i, response in zip(missing, responses):
+                ndvi, mask = _split_outputs(response)
+                _count_raster("network", ndvi, mask)
+                if cache is not None:
+                    cache.put(_window_key(jobs[i][0], jobs[i][1]), ndvi, mask)
+                rasters[i] = (ndvi, mask)
+        for i in range(start, end):
+            yield rasters.pop(i)
+
+
+def _batch_stats(jobs: List[Tuple[Any, Tuple[str, str], Tuple[int, int]]]) -> List[NdviStats]:
+    """Blocking: reduce (tile_bbox, time_range, size) jobs to NdviStats (see `_iter_windows`)."""
+    stats = []
+    for ndvi, mask in _iter_windows(jobs):
+        with metrics.span("ndvi_reduce"):
+            stats.append(reduce_ndvi(ndvi, mask))
+    return stats
+
+
+def _batch_changes(pairs: List[Tuple[Any, Tuple[str, str], Tuple[str, str], Tuple[int, int]]]):
+    """Blocking: `_tile_change` for (tile_bbox, current_range, previous_range, size) jobs, batched."""
+    jobs = [(tile_bbox, time_range, size)
+            for tile_bbox, curr_range, prev_range, size in pairs for time_range in (curr_range, prev_range)]
+    rasters = _iter_windows(jobs)
+    return [_tile_change(curr, next(rasters)) for curr in rasters]  # jobs alternate current, previous
+
+
+def compute_percent_and_mean(ndvi_array, mask_array):
+    """Compute average NDVI and % vegetation pixels."""
+    with metrics.span("ndvi_reduce"):
+        stats = reduce_ndvi(ndvi_array, mask_array, histogram=False)
+    return stats.mean, stats.percent
+
+
+async def _fetch_window(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str]) -> NdviStats:
+    """Fetch one window tile by tile and return its merged NdviStats.
+
+    Tiles are fetched concurrently in the download pool and each is reduced in
+    its worker thread, so at most SH_MAX_THREADS tiles are in memory at once.
+    """
+    tiles = tile_grid(bbox)
+    stats = await asyncio.gather(*(
+        _run_blocking(_tile_stats, tile_bbox, time_range, size) for tile_bbox, size in tiles
+    ))
+    return merge_stats(stats)
+
+
+async def _fetch_change(bbox: Tuple[float, float, float, float], current_range: Tuple[str, str],
+                        previous_range: Tuple[str, str]) -> Tuple[NdviStats, NdviStats, PatchCollector]:
+    """Fetch both windows tile by tile, aligned on the same pixel grid, and return their
+    merged NdviStats and the region's loss patches.
+
+    Each tile's two rasters are downloaded concurrently in the download pool
+    and reduced and labeled there as soon as both are in (see `_TilePair`), so
+    only tiles with a download in flight are in memory.
+    """
+    shape, tiles = _tile_layout(bbox)
+
+    async def one(tile_bbox, size):
+        pair = _TilePair()
+        done = await asyncio.gather(_run_blocking(pair.fetch, 0, tile_bbox, current_range, size),
+                                    _run_blocking(pair.fetch, 1, tile_bbox, previous_range, size))
+        return done[0] or done[1]
+
+    changes = await asyncio.gather(*(one(tile_bbox, size) for tile_bbox, size, _ in tiles))
+    return _merge_changes(bbox, shape, tiles, changes)
+
+
+def _merge_changes(bbox, shape, tiles, changes) -> Tuple[NdviStats, NdviStats, PatchCollector]:
+    collector = PatchCollector(bbox, shape, resolution=RESOLUTION)
+    for (_, _, offset), (_, _, patches) in zip(tiles, changes):
+        collector.add(offset, patches)
+    return merge_stats(c[0] for c in changes), merge_stats(c[1] for c in changes), collector
+
+
+async def _plan(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str],
+                catalog) -> Optional[WindowPlan]:
+    """Catalog pre-check for one window (None when there is no catalog)."""
+    if catalog is None:
+        return None
+    with metrics.span("catalog_search"):
+        plan = await _run_blocking(plan_window, catalog, bbox, time_range, SH_MAX_CLOUD, SH_CATALOG_MAX_WIDEN)
+    metrics.counter("catalog_windows_total", "Windows by catalog pre-check outcome").inc(outcome=plan.outcome)
+    return plan
+
+
+async def _skipped() -> None:
+    return None
+
+
+async def _fetch_checked(bbox: Tuple[float, float, float, float], time_range: Tuple[str, str],
+                         catalog) -> Tuple[Optional[NdviStats], Optional[WindowPlan]]:
+    """Pre-check a window, then fetch the chosen acquisition day; (None, plan) when skipped."""
+    plan = await _plan(bbox, time_range, catalog)
+    if plan is not None and plan.skip:
+        return None, plan
+    return await _fetch_window(bbox, plan.time_range if plan else time_range), plan
+
+
+def _acquisition(plan: Optional[WindowPlan]) -> Optional[Dict[str, Any]]:
+    if plan is None:
+        return None
+    if plan.skip:
+        return {"skipped": plan.reason}
+    return {"date": plan.scene.date, "cloud_cover": plan.scene.cloud_cover, "widened": plan.widened}
+
+
+def _time_windows(current_days: int, lag_days: int, window_days: int):
+    today = datetime.date.today()
+    # Current: last 10 days
+    current_range = ((today - datetime.timedelta(days=current_days)).isoformat(), today.isoformat())
+    # Previous: 40-30 days ago
+    prev_end = today - datetime.timedelta(days=lag_days - window_days)
+    prev_start = prev_end - datetime.timedelta(days=window_days)
+    previous_range = (prev_start.isoformat(), prev_end.isoformat())
+    return current_range, previous_range
+
+
+def _window_range(plan: Optional[WindowPlan], time_range: Tuple[str, str]) -> Optional[Tuple[str, str]]:
+    """The time range to fetch for a pre-checked window; None when it is skipped."""
+    if plan is None:
+        return time_range
+    return None if plan.skip else plan.time_range
+
+
+def _build_metrics(region, bbox, current_range, previous_range,
+                   curr: Optional[NdviStats], prev: Optional[NdviStats],
+                   plans: Tuple[Optional[WindowPlan], ...] = (),
+                   loss: Optional[PatchCollector] = None) -> Dict[str, Any]:
+    """Metrics dict for a region; a window skipped by the catalog pre-check has no stats
+    (forest_percent None for the current one, no previous_* keys for the previous one).
+    With a loss map, "loss" sums it up and "loss_patches" lists the largest patches."""
+    region_metrics = {
+        "region": region,
+        "date": current_range[1],
+        "forest_percent": round(curr.percent, 2) if curr is not None else None,
+        "ndvi_mean": float(round(curr.mean, 3)) if curr is not None else None,
+        "ndvi_percentiles": {q: round(v, 3) for q, v in curr.percentiles().items()} if curr is not None else {},
+        "valid_pixels": curr.valid_count if curr is not None else 0,
+        "source": "sentinelhub",
+        "bbox": bbox,
+        "current_range": current_range,
+    }
+    if prev is not None:
+        region_metrics["previous_forest_percent"] = round(prev.percent, 2)
+        region_metrics["previous_ndvi_mean"] = float(round(prev.mean, 3))
+        region_metrics["previous_range"] = previous_range
+    if any(plan is not None for plan in plans):
+        region_metrics["acquisition"] = dict(zip(("current", "previous"), map(_acquisition, plans)))
+    if loss is not None:
+        region_metrics["loss"], region_metrics["loss_patches"] = loss.result()
+    return region_metrics
+
+# ======== MAIN FUNCTION ========
+
+DEFAULT_BBOX = (90.0, 26.0, 91.0, 27.0)  # Default test bbox (Assam, India)
+
+
+async def fetch_forest_cover(region: str,
+                             bbox: Optional[Tuple[float,float,float,float]] = None,
+                             current_days: int = 10,
+                             lag_days: int = 40,
+                             window_days: int = 10,
+                             include_previous: bool = True,
+                             patches: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Fetch forest cover metrics for `region`, comparing two time windows:
+    - current window: last `current_days`
+    - previous window: (`lag_days` - `lag_days` + `window_days`)
+
+    With `include_previous=False` only the current window is fetched and the
+    previous_* keys are left out; use this when the previous value comes from
+    the metrics history (see `agents_system.timeseries`).
+
+    Both windows are downloaded concurrently in the SentinelHub thread pool. Large
+    bboxes are split into Process API sized tiles (see `tile_grid`) and reduced
+    tile by tile, so peak memory does not grow with the region size.
+
+    With a catalog client (see `get_catalog`) each window is pre-checked first:
+    pixels are fetched only for its clearest acquisition day, and a window with
+    no usable scene is skipped; "acquisition" in the result says which.
+
+    With `patches` (default: SENTINELHUB_LOSS_PATCHES, on) and both windows
+    fetched, each tile's two windows are compared pixel by pixel and the
+    connected loss patches are extracted (see `.patches`): "loss" has the
+    totals and "loss_patches" the largest patches with area, centroid and bbox.
+    """
+    if not bbox:
+        bbox = DEFAULT_BBOX
+    if patches is None:
+        patches = SH_LOSS_PATCHES
+    current_range, previous_range = _time_windows(current_days, lag_days, window_days)
+    catalog = get_catalog()
+
+    if not include_previous:
+        curr, plan = await _fetch_checked(bbox, current_range, catalog)
+        return _build_metrics(region, bbox, current_range, previous_range, curr, None, (plan,))
+
+    if patches:
+        plans = await asyncio.gather(_plan(bbox, current_range, catalog), _plan(bbox, previous_range, catalog))
+        curr_window, prev_window = map(_window_range, plans, (current_range, previous_range))
+        if curr_window and prev_window:
+            curr, prev, loss = await _fetch_change(bbox, curr_window, prev_window)
+            return _build_metrics(region, bbox, current_range, previous_range, curr, prev, tuple(plans), loss)
+        curr, prev = await asyncio.gather(*(
+            _fetch_window(bbox, window) if window else _skipped() for window in (curr_window, prev_window)))
+        return _build_metrics(region, bbox, current_range, previous_range, curr, prev, tuple(plans))
+
+    (curr, curr_plan), (prev, prev_plan) = await asyncio.gather(
+        _fetch_checked(bbox, current_range, catalog),
+        _fetch_checked(bbox, previous_range, catalog),
+    )
+    return _build_metrics(region, bbox, current_range, previous_range, curr, prev, (curr_plan, prev_plan))
+
+
+async def fetch_forest_cover_batch(regions: List[Dict[str, Any]],
+                                   current_days: int = 10,
+                                   lag_days: int = 40,
+                                   window_days: int = 10,
+                                   include_previous: bool = True,
+                                   patches: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch forest cover metrics for many regions ({"name", "bbox"} dicts, as in a
+    region manifest) with batched SentinelHub downloads.
+
+    Every tile of every current/previous window is handed to the SDK's
+    multi-request download client, a bounded chunk at a time, so they share one
+    session and one bounded set of threads. Results are returned in the order
+    of `regions`. Loss patches are extracted as in `fetch_forest_cover`.
+    """
+    if patches is None:
+        patches = SH_LOSS_PATCHES
+    current_range, previous_range = _time_windows(current_days, lag_days, window_days)
+    bboxes = [spec.get("bbox") or DEFAULT_BBOX for spec in regions]
+    ranges = (current_range, previous_range) if include_previous else (current_range,)
+    catalog = get_catalog()
+    plans = await asyncio.gather(*(_plan(bbox, time_range, catalog) for bbox in bboxes for time_range in ranges))
+
+    per_region = len(ranges)
+    jobs, pairs = [], []
+    spans = []  # (start, end) into jobs for each (region, window); None when skipped
+    layouts = {}  # region index -> (shape, tiles, (start, end) into pairs) for loss-map regions
+    for i, bbox in enumerate(bboxes):
+        windows = list(map(_window_range, plans[per_region * i:per_region * (i + 1)], ranges))
+        if patches and include_previous and all(windows):
+            shape, tiles = _tile_layout(bbox)
+            start = len(pairs)
+            pairs.extend((tile_bbox, windows[0], windows[1], size) for tile_bbox, size, _ in tiles)
+            layouts[i] = (shape, tiles, (start, len(pairs)))
+            spans.extend([None] * per_region)
+            continue
+        for window in windows:
+            if window is None:
+                spans.append(None)
+                continue
+            start = len(jobs)
+            jobs.extend((tile_bbox, window, size) for tile_bbox, size in tile_grid(bbox))
+            spans.append((start, len(jobs)))
+
+    tile_stats, tile_changes = await asyncio.gather(_run_blocking(_batch_stats, jobs),
+                                                    _run_blocking(_batch_changes, pairs))
+    stats = [merge_stats(tile_stats[span[0]:span[1]]) if span else None for span in spans]
+
+    results = []
+    for i, (spec, bbox) in enumerate(zip(regions, bboxes)):
+        loss = None
+        if i in layouts:
+            shape, tiles, (start, end) = layouts[i]
+            curr, prev, loss = _merge_changes(bbox, shape, tiles, tile_changes[start:end])
+        else:
+            curr = stats[per_region * i]
+            prev = stats[per_region * i + 1] if include_previous else None
+        results.append(_build_metrics(spec["name"], bbox, current_range, previous_range, curr, prev,
+                                      tuple(plans[per_region * i:per_region * (i + 1)]), loss))
+    return results
@@ -0,0 +1,126 @@
+# agents_system/data_ingestor/cache.py
+"""Persistent, content-addressed cache for SentinelHub (ndvi, mask) responses.
+
+Each entry is a directory named after the hash of the request parameters and
+holds ``ndvi.npy`` and ``mask.npy``; hits are returned as read-only memory-mapped
+arrays so a cached window costs no network I/O and no up-front copy. The cache
+is bounded by total size on disk and evicts least-recently-used entries.
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+_FILES = ("ndvi.npy", "mask.npy")
+
+
+def cache_key(bbox: Tuple[float, float, float, float],
+              time_range: Tuple[str, str],
+              evalscript: str,
+              resolution: float) -> str:
+    """Content address for one window request."""
+    script_hash = hashlib.sha256(evalscript.encode("utf-8")).hexdigest()
+    payload = json.dumps({
+        "bbox": [round(float(v), 9) for v in bbox],
+        "time_range": list(time_range),
+        "evalscript": script_hash,
+        "resolution": float(resolution),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TileCache:
+    """Size-bounded LRU cache of (ndvi, mask) arrays stored as `.npy` files under `root`."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _scan(self):
+        """Rebuild the LRU index from disk, ordered by last access (mtime)."""
+        found = []
+        for name in os.listdir(self.root):
+            path = self._path(name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in _FILES)
+            except OSError:
+                shutil.rmtree(path, ignore_errors=True)  # partial entry
+                continue
+            found.append((os.path.getmtime(path), name, size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+        self.stats["bytes"] = sum(self._entries.values())
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            if key not in self._entries:
+                self.stats["misses"] += 1
+                return None
+            path = self._path(key)
+            try:
+                ndvi = np.load(os.path.join(path, "ndvi.npy"), mmap_mode="r")
+                mask = np.load(os.path.join(path, "mask.npy"), mmap_mode="r")
+                os.utime(path)
+            except (OSError, ValueError):
+                # Evicted by another process or corrupted; treat as a miss.
+                self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return ndvi, mask
+
+    def put(self, key: str, ndvi: np.ndarray, mask: np.ndarray):
+        path = self._path(key)
+        tmp = os.path.join(self.root, f".{key}.{os.getpid()}.{threading.get_ident()}")
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            np.save(os.path.join(tmp, "ndvi.npy"), np.ascontiguousarray(ndvi))
+            np.save(os.path.join(tmp, "mask.npy"), np.ascontiguousarray(mask))
+            size = sum(os.path.getsize(os.path.join(tmp, f)) for f in _FILES)
+            with self._lock:
+                if key in self._entries:
+                    return
+                if size > self.max_bytes:
+                    return
+                try:
+                    os.replace(tmp, path)
+                except OSError:
+                    if not os.path.isdir(path):  # else: written concurrently by another process
+                        raise
+                self._entries[key] = size
+                self.stats["bytes"] += size
+                self._evict()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _drop(self, key: str):
+        size = self._entries.pop(key, 0)
+        self.stats["bytes"] -= size
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _evict(self):
+        while self.stats["bytes"] > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
@@ -0,0 +1,113 @@
+# agents_system/data_ingestor/catalog.py
+"""Catalog pre-check: decide per window whether pixels are worth downloading.
+
+A metadata search (SentinelHub Catalog, no processing units) lists the
+Sentinel-2 scenes over a bbox in a time window. `plan_window` picks the
+clearest one at or below `max_cloud` percent cloud cover (the most recent on
+ties) and narrows the Process API request to that day. With no usable scene the
+window is widened backwards, up to `max_widen` times by its own length, and
+otherwise skipped - the caller gets no stats for it instead of a raster of
+clouds and NaNs.
+
+Catalog clients are duck-typed: ``search(bbox, time_range) -> [Scene]``,
+blocking (it runs in the download pool). `SentinelHubCatalogClient` is the real
+one; `StubCatalog` serves fixed scenes for tests and offline runs.
+"""
+import datetime
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+BBoxT = Tuple[float, float, float, float]
+TimeRange = Tuple[str, str]
+
+DEFAULT_MAX_CLOUD = 30.0
+
+
+@dataclass(frozen=True)
+class Scene:
+    date: str  # YYYY-MM-DD acquisition date
+    cloud_cover: float  # percent
+    id: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class WindowPlan:
+    requested: TimeRange
+    time_range: Optional[TimeRange]  # what to fetch; None = skip
+    scene: Optional[Scene] = None
+    widened: int = 0  # how many times the window was extended
+    reason: Optional[str] = None  # why it was skipped
+
+    @property
+    def skip(self) -> bool:
+        return self.time_range is None
+
+    @property
+    def outcome(self) -> str:
+        return "skipped" if self.skip else "widened" if self.widened else "scene"
+
+
+class SentinelHubCatalogClient:
+    """Sentinel-2 L2A scene search through the SentinelHub Catalog API."""
+
+    def __init__(self, config=None):
+        self.config = config
+
+    def search(self, bbox: BBoxT, time_range: TimeRange) -> List[Scene]:
+        from sentinelhub import BBox, CRS, DataCollection, SentinelHubCatalog
+        from . import get_config
+        catalog = SentinelHubCatalog(config=self.config or get_config())
+        results = catalog.search(
+            DataCollection.SENTINEL2_L2A,
+            bbox=BBox(bbox=bbox, crs=CRS.WGS84),
+            time=time_range,
+            fields={"include": ["id", "properties.datetime", "properties.eo:cloud_cover"], "exclude": []},
+        )
+        return [Scene(item["properties"]["datetime"][:10], float(item["properties"].get("eo:cloud_cover", 100.0)),
+                      item.get("id"))
+                for item in results]
+
+
+class StubCatalog:
+    """Local catalog: fixed scenes (or a function of bbox) filtered by time window; records searches."""
+
+    def __init__(self, scenes: Iterable[Scene] = (), by_bbox: Optional[Callable[[BBoxT], Iterable[Scene]]] = None):
+        self.scenes = list(scenes)
+        self.by_bbox = by_bbox
+        self.searches: List[Tuple[BBoxT, TimeRange]] = []
+
+    def search(self, bbox: BBoxT, time_range: TimeRange) -> List[Scene]:
+        self.searches.append((bbox, time_range))
+        scenes = self.by_bbox(bbox) if self.by_bbox is not None else self.scenes
+        return [s for s in scenes if time_range[0] <= s.date <= time_range[1]]
+
+
+def best_scene(scenes: Sequence[Scene], max_cloud: float = DEFAULT_MAX_CLOUD) -> Optional[Scene]:
+    """Clearest scene at or below `max_cloud`, most recent first on ties."""
+    usable = [s for s in scenes if s.cloud_cover <= max_cloud]
+    if not usable:
+        return None
+    return max(usable, key=lambda s: (-s.cloud_cover, s.date))
+
+
+def _shift(date: str, days: int) -> str:
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=days)).isoformat()
+
+
+def plan_window(client, bbox: BBoxT, time_range: TimeRange, max_cloud: float = DEFAULT_MAX_CLOUD,
+                max_widen: int = 1) -> WindowPlan:
+    """Blocking: choose the acquisition day to fetch for one window, widen it, or skip it."""
+    start, end = time_range
+    length = max(1, (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days)
+    searched: List[Scene] = []
+    for widened in range(max_widen + 1):
+        window = (_shift(start, -length * widened), end)
+        searched = client.search(bbox, window)
+        scene = best_scene(searched, max_cloud)
+        if scene is not None:
+            return WindowPlan(time_range, (scene.date, scene.date), scene, widened)
+    if searched:
+        reason = f"all {len(searched)} scenes above {max_cloud:g}% cloud"
+    else:
+        reason = "no Sentinel-2 scenes"
+    return WindowPlan(time_range, None, None, max_widen, reason)
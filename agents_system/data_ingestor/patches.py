@@ -0,0 +1,266 @@
+# agents_system/data_ingestor/patches.py
+"""Per-pixel forest loss map and connected loss patches.
+
+A pixel is lost when it was vegetated in the previous window, is not in the
+current one and its NDVI fell by at least `min_drop`; a NaN (cloud, no data)
+in either window never counts. Lost pixels are grouped into connected patches
+(8-connectivity by default) so a clearing in one corner of a region is reported
+with its own area, centroid and bbox instead of being averaged into the
+region's forest_percent.
+
+Labeling is vectorized numpy and works tile by tile: `label_tile` turns each
+row of the loss map into horizontal runs, links runs that touch in adjacent
+rows, and resolves the links with an array union-find, so its cost grows with
+the number of runs rather than pixels and no label image is built.
+`PatchCollector` keeps only per-patch sums plus the labels along each tile's
+four edges, then joins patches across tile borders, so a whole region is
+processed in memory bounded by one tile.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+BBoxT = Tuple[float, float, float, float]
+
+DEFAULT_MIN_DROP = 0.2  # NDVI
+DEFAULT_MIN_PIXELS = 10  # 0.1 ha at 10 m; smaller patches are counted as loss but not listed
+DEFAULT_MAX_PATCHES = 20
+
+
+def loss_map(prev_ndvi, prev_mask, curr_ndvi, curr_mask, min_drop: float = DEFAULT_MIN_DROP) -> np.ndarray:
+    """Boolean loss map of two aligned (ndvi, mask) windows of the same tile."""
+    with np.errstate(invalid="ignore"):
+        loss = np.subtract(prev_ndvi, curr_ndvi, dtype=np.float32) >= min_drop  # NaN compares False
+    loss &= prev_mask != 0
+    loss &= curr_mask == 0
+    return loss
+
+
+def _runs(mask: np.ndarray):
+    """Horizontal runs of True pixels in row-major order: (rows, starts, ends), ends exclusive."""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    rows, cols = np.nonzero(np.diff(padded, axis=1))  # a run's start and end alternate along each row
+    return rows[0::2], cols[0::2], cols[1::2]
+
+
+def _expand(lo: np.ndarray, hi: np.ndarray):
+    """For each i, the indices lo[i]..hi[i]-1: returns (owner, index) arrays."""
+    counts = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(lo, counts) + offsets
+
+
+def _union(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Root (smallest member) of each of `n` nodes given the edges a[i] - b[i]."""
+    parent = np.arange(n)
+    while len(a):
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            break
+        a, b = a[differ], b[differ]
+        ra, rb = ra[differ], rb[differ]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:  # pointer jumping until every node points at its root
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent
+
+
+def _touching(top_rows, top_starts, top_ends, bottom_rows, bottom_starts, bottom_ends, reach: int):
+    """Pairs (i, j) of runs i in one row and j in the row below that touch.
+
+    Both run lists must be sorted by (row, start); `reach` is 1 for
+    8-connectivity (diagonal contact counts) and 0 for 4-connectivity.
+    """
+    span = 1 + int(max(top_ends.max(initial=0), bottom_ends.max(initial=0))) + reach
+    # Runs in a row are disjoint and sorted, so those overlapping [s - reach, e + reach)
+    # form a contiguous slice of the row above, found by binary search on a (row, column) key.
+    row_above = bottom_rows - 1
+    lo = np.searchsorted(top_rows * span + top_ends, row_above * span + bottom_starts - reach, side="right")
+    hi = np.searchsorted(top_rows * span + top_starts, row_above * span + bottom_ends + reach, side="left")
+    j, i = _expand(lo, hi)
+    return i, j
+
+
+class TilePatches(NamedTuple):
+    """Loss patches of one tile, in tile pixel coordinates."""
+    pixels: np.ndarray  # int64 per patch
+    row_sum: np.ndarray  # float64, for centroids
+    col_sum: np.ndarray
+    bounds: np.ndarray  # (n, 4) int64: row_min, col_min, row_max, col_max (inclusive)
+    edges: Tuple[np.ndarray, ...]  # patch label (-1 = none) along the top, bottom, left and right edges
+    shape: Tuple[int, int]
+
+    @property
+    def loss_pixels(self) -> int:
+        return int(self.pixels.sum())
+
+
+def label_tile(loss: np.ndarray, connectivity: int = 8) -> TilePatches:
+    """Connected components of a tile's boolean loss map, as per-patch sums and edge labels."""
+    if connectivity not in (4, 8):
+        raise ValueError("connectivity must be 4 or 8")
+    height, width = loss.shape
+    rows, starts, ends = _runs(loss)
+    i, j = _touching(rows, starts, ends, rows, starts, ends, 1 if connectivity == 8 else 0)
+    roots = _union(len(rows), i, j)
+    _, label = np.unique(roots, return_inverse=True)
+    n = int(label.max()) + 1 if len(label) else 0
+
+    lengths = (ends - starts).astype(np.int64)
+    pixels = np.bincount(label, weights=lengths, minlength=n).astype(np.int64)
+    row_sum = np.bincount(label, weights=rows * lengths.astype(np.float64), minlength=n)
+    col_sum = np.bincount(label, weights=lengths * (starts + ends - 1) / 2.0, minlength=n)
+    bounds = np.empty((n, 4), dtype=np.int64)
+    bounds[:, 0:2] = np.iinfo(np.int64).max
+    bounds[:, 2:4] = -1
+    np.minimum.at(bounds[:, 0], label, rows)
+    np.minimum.at(bounds[:, 1], label, starts)
+    np.maximum.at(bounds[:, 2], label, rows)
+    np.maximum.at(bounds[:, 3], label, ends - 1)
+
+    def paint(sel, length, lo, hi):
+        edge = np.full(length, -1, dtype=np.int64)
+        owner, idx = _expand(lo[sel], hi[sel])
+        edge[idx] = label[sel][owner]
+        return edge
+
+    top = paint(rows == 0, width, starts, ends)
+    bottom = paint(rows == height - 1, width, starts, ends)
+    left, right = np.full(height, -1, dtype=np.int64), np.full(height, -1, dtype=np.int64)
+    left[rows[starts == 0]] = label[starts == 0]
+    right[rows[ends == width]] = label[ends == width]
+    return TilePatches(pixels, row_sum, col_sum, bounds, (top, bottom, left, right), (height, width))
+
+
+@dataclass(frozen=True)
+class Patch:
+    pixels: int
+    area_ha: float
+    centroid: Tuple[float, float]  # lon, lat
+    bbox: BBoxT
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"pixels": self.pixels, "area_ha": self.area_ha, "centroid": list(self.centroid),
+                "bbox": list(self.bbox)}
+
+
+class PatchCollector:
+    """Joins the `TilePatches` of a tiled region into region-wide patches.
+
+    `shape` is the (height, width) pixel grid of the full `bbox`; tiles are
+    added with their (row, col) pixel offset. Patches under `min_pixels` that
+    touch no tile edge are dropped on arrival (they cannot grow), so memory
+    stays proportional to the listed patches plus the tile edges.
+    """
+
+    def __init__(self, bbox: BBoxT, shape: Tuple[int, int], resolution: float = 10.0,
+                 connectivity: int = 8, min_pixels: int = DEFAULT_MIN_PIXELS):
+        self.bbox = bbox
+        self.shape = shape
+        self.pixel_ha = resolution * resolution / 10_000.0
+        self.reach = 1 if connectivity == 8 else 0
+        self.min_pixels = min_pixels
+        self.loss_pixels = 0
+        self._parts: List[Tuple[np.ndarray, ...]] = []  # (pixels, row_sum, col_sum, bounds) in region coords
+        self._edges: Dict[Tuple[int, int], Tuple[Tuple[int, int], Tuple[np.ndarray, ...]]] = {}
+        self._count = 0
+
+    def add(self, offset: Tuple[int, int], tile: TilePatches):
+        r0, c0 = offset
+        height, width = tile.shape
+        self.loss_pixels += tile.loss_pixels
+        on_edge = np.zeros(len(tile.pixels), dtype=bool)
+        for edge in tile.edges:
+            on_edge[edge[edge >= 0]] = True
+        keep = on_edge | (tile.pixels >= self.min_pixels)
+        ids = np.full(len(tile.pixels), -1, dtype=np.int64)
+        ids[keep] = self._count + np.arange(int(keep.sum()))
+        self._count += int(keep.sum())
+        pixels = tile.pixels[keep]
+        bounds = tile.bounds[keep] + np.array([r0, c0, r0, c0])
+        self._parts.append((pixels, tile.row_sum[keep] + r0 * pixels, tile.col_sum[keep] + c0 * pixels, bounds))
+        edges = tuple(np.where(edge >= 0, ids[edge], -1) if len(ids) else edge for edge in tile.edges)
+        self._edges[(r0, c0)] = ((r0 + height, c0 + width), edges)
+
+    def _links(self):
+        """Patch id pairs that touch across tile borders."""
+        pairs = []
+        tiles = self._edges
+        by_end_col = {(r0, end[1]): (r0, c0) for (r0, c0), (end, _) in tiles.items()}
+
+        def touch(x, y, reach):
+            both = [(x, y)]
+            if reach:
+                both += [(x[1:], y[:-1]), (x[:-1], y[1:])]
+            for u, v in both:
+                hit = (u >= 0) & (v >= 0)
+                pairs.append(np.stack([u[hit], v[hit]]))
+
+        for (r0, c0), ((r1, c1), (top, bottom, left, right)) in tiles.items():
+            below = tiles.get((r1, c0))
+            if below is not None:
+                touch(bottom, below[1][0], self.reach)
+            beside = tiles.get((r0, c1))
+            if beside is not None:
+                touch(right, beside[1][2], self.reach)
+            if self.reach:
+                corner = tiles.get((r1, c1))  # down-right
+                if corner is not None:
+                    touch(bottom[-1:], corner[1][0][:1], 0)
+                key = by_end_col.get((r1, c0))  # down-left: the tile below ending at our first column
+                if key is not None:
+                    touch(bottom[:1], tiles[key][1][0][-1:], 0)
+        if not pairs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        links = np.concatenate(pairs, axis=1)
+        return links[0], links[1]
+
+    def result(self, limit: Optional[int] = DEFAULT_MAX_PATCHES) -> Tuple[Dict[str, object], List[Dict[str, object]]]:
+        """(summary, patches): totals over all loss, and the `limit` largest patches, largest first."""
+        if self._parts:
+            pixels, row_sum, col_sum, bounds = (np.concatenate(column) for column in zip(*self._parts))
+        else:
+            pixels, row_sum, col_sum, bounds = np.empty(0), np.empty(0), np.empty(0), np.empty((0, 4))
+        roots = _union(self._count, *self._links())
+        _, label = np.unique(roots, return_inverse=True)
+        n = int(label.max()) + 1 if len(label) else 0
+        merged = np.bincount(label, weights=pixels, minlength=n).astype(np.int64)
+        rows = np.bincount(label, weights=row_sum, minlength=n)
+        cols = np.bincount(label, weights=col_sum, minlength=n)
+        box = np.empty((n, 4), dtype=np.int64)
+        box[:, 0:2] = np.iinfo(np.int64).max
+        box[:, 2:4] = -1
+        for k, ufunc in enumerate((np.minimum, np.minimum, np.maximum, np.maximum)):
+            ufunc.at(box[:, k], label, bounds[:, k].astype(np.int64))
+
+        listed = np.flatnonzero(merged >= self.min_pixels)
+        order = listed[np.lexsort((box[listed, 1], box[listed, 0], -merged[listed]))]
+        if limit is not None:
+            order = order[:limit]
+        minx, miny, maxx, maxy = self.bbox
+        height, width = self.shape
+        dx, dy = (maxx - minx) / width, (maxy - miny) / height
+        patches = []
+        for k in order.tolist():
+            count = int(merged[k])
+            r_min, c_min, r_max, c_max = box[k].tolist()
+            centroid = (minx + (cols[k] / count + 0.5) * dx, maxy - (rows[k] / count + 0.5) * dy)
+            patches.append(Patch(count, round(count * self.pixel_ha, 2),
+                                 tuple(round(float(v), 6) for v in centroid),
+                                 tuple(round(float(v), 6) for v in (minx + c_min * dx, maxy - (r_max + 1) * dy,
+                                                             minx + (c_max + 1) * dx, maxy - r_min * dy))).to_dict())
+        summary = {
+            "pixels": int(self.loss_pixels),
+            "area_ha": round(self.loss_pixels * self.pixel_ha, 2),
+            "patches": int(len(listed)),
+            "largest_ha": round(int(merged.max()) * self.pixel_ha, 2) if n else 0.0,
+        }
+        return summary, patches
@@ -0,0 +1,132 @@
+# agents_system/data_ingestor/reduce.py
+"""Fused single-pass NDVI reducer.
+
+`reduce_ndvi` walks the float32 NDVI / uint8 mask buffers returned by
+SentinelHub in blocks small enough to stay in cache, reusing a fixed set of
+scratch buffers, and produces everything the pipeline needs from one pass:
+NDVI sum, valid and vegetated pixel counts and an NDVI histogram. No
+full-raster temporaries or float64 copies are made.
+"""
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+HIST_BINS = 200  # NDVI histogram over [-1, 1], 0.01 wide bins
+HIST_RANGE = (-1.0, 1.0)
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+# Pixels per block: 64k float32 = 256 KiB, so scratch buffers stay in L2.
+_BLOCK_PIXELS = 1 << 16
+
+
+class NdviStats(NamedTuple):
+    """Additive NDVI summary of a raster; stats of disjoint tiles merge exactly."""
+    ndvi_sum: float
+    valid_count: int
+    vegetated_count: int
+    histogram: Optional[np.ndarray] = None  # int64 counts per HIST_BINS bin
+
+    @property
+    def mean(self) -> float:
+        return self.ndvi_sum / self.valid_count if self.valid_count else float("nan")
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.vegetated_count / self.valid_count if self.valid_count else float("nan")
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[float, float]:
+        """Approximate NDVI percentiles, interpolated linearly inside histogram bins."""
+        if self.histogram is None or not self.valid_count:
+            return {q: float("nan") for q in qs}
+        lo, hi = HIST_RANGE
+        width = (hi - lo) / HIST_BINS
+        cumulative = np.cumsum(self.histogram)
+        out = {}
+        for q in qs:
+            target = q / 100.0 * cumulative[-1]
+            i = int(np.searchsorted(cumulative, target, side="left"))
+            i = min(i, HIST_BINS - 1)
+            below = cumulative[i - 1] if i else 0
+            in_bin = self.histogram[i]
+            frac = (target - below) / in_bin if in_bin else 0.0
+            out[q] = lo + (i + frac) * width
+        return out
+
+
+def merge_stats(stats: Iterable[NdviStats]) -> NdviStats:
+    """Combine stats of disjoint tiles into the stats of their union."""
+    stats = list(stats)
+    histogram = None
+    if stats and all(s.histogram is not None for s in stats):
+        histogram = np.sum([s.histogram for s in stats], axis=0)
+    return NdviStats(
+        ndvi_sum=float(np.sum([s.ndvi_sum for s in stats], dtype=np.float64)) if stats else 0.0,
+        valid_count=sum(s.valid_count for s in stats),
+        vegetated_count=sum(s.vegetated_count for s in stats),
+        histogram=histogram,
+    )
+
+
+def reduce_ndvi(ndvi: np.ndarray, mask: np.ndarray, histogram: bool = True) -> NdviStats:
+    """Single streaming pass over an NDVI raster and its vegetation mask.
+
+    `ndvi` is used in its native dtype (float32 from SentinelHub); NaN marks
+    no-data. `mask` is any integer/bool raster where non-zero means vegetated.
+    Both may be memory-mapped; they are read block by block and never copied.
+    """
+    ndvi = ndvi.reshape(-1) if ndvi.flags.c_contiguous else np.ravel(ndvi)
+    mask = mask.reshape(-1) if mask.flags.c_contiguous else np.ravel(mask)
+    if ndvi.shape != mask.shape:
+        raise ValueError(f"ndvi and mask sizes differ: {ndvi.shape} vs {mask.shape}")
+
+    n = ndvi.size
+    block = min(_BLOCK_PIXELS, max(n, 1))
+    nan_buf = np.empty(block, dtype=bool)
+    veg_buf = np.empty(block, dtype=bool)
+    val_buf = np.empty(block, dtype=ndvi.dtype if ndvi.dtype.kind == "f" else np.float64)
+    if histogram:
+        lo, hi = HIST_RANGE
+        scale = HIST_BINS / (hi - lo)
+        idx_buf = np.empty(block, dtype=np.intp)
+        counts = np.zeros(HIST_BINS + 1, dtype=np.int64)  # last bin collects NaNs
+
+    ndvi_sum = 0.0
+    valid_count = 0
+    vegetated_count = 0
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        m = stop - start
+        x = ndvi[start:stop]
+        nan = nan_buf[:m]
+        veg = veg_buf[:m]
+        vals = val_buf[:m]
+
+        np.isnan(x, out=nan)
+        block_nan = int(np.count_nonzero(nan))
+        valid_count += m - block_nan
+
+        # Zero-filled copy of the block: summing it is ~2x faster than a masked reduce.
+        np.copyto(vals, x)
+        if block_nan:
+            np.copyto(vals, 0.0, where=nan)
+        ndvi_sum += float(np.add.reduce(vals, dtype=np.float64))
+
+        np.logical_not(nan, out=veg)
+        np.logical_and(mask[start:stop], veg, out=veg)
+        vegetated_count += int(np.count_nonzero(veg))
+
+        if histogram:
+            idx = idx_buf[:m]
+            np.subtract(vals, lo, out=vals)
+            np.multiply(vals, scale, out=vals)
+            np.clip(vals, 0, HIST_BINS - 1, out=vals)
+            if block_nan:
+                np.copyto(vals, HIST_BINS, where=nan)
+            np.copyto(idx, vals, casting="unsafe")
+            counts += np.bincount(idx, minlength=HIST_BINS + 1)
+
+    return NdviStats(
+        ndvi_sum=ndvi_sum,
+        valid_count=valid_count,
+        vegetated_count=vegetated_count,
+        histogram=counts[:HIST_BINS].copy() if histogram else None,
+    )
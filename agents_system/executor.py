@@ -1,12 +1,45 @@
-from typing import Dict, Any
-from .tools import create_ticket, post_slack
-
-
-async def execute_actions(plan: Dict[str, Any]) -> Dict[str, Any]:
-"""Execute the top action via function tool (ticket creation) and notify Slack."""
-top_step = plan.get("steps", [])[0]
-title = f"Action: {top_step['step']}"
-description = f"Auto-generated action for region {plan.get('region')} — plan: {plan}"
-ticket = create_ticket(title=title, description=description)
-slack_resp = post_slack(f"Created ticket {ticket['ticket_id']} for region {plan.get('region')}")
-return {"ticket": ticket, "slack": slack_resp}
\ No newline at end of file
+import asyncio
+import datetime
+from typing import Dict, Any, Optional
+from core import metrics
+from .tools import ActionClient, get_action_client
+
+
+def _action(plan: Dict[str, Any]):
+    top_step = plan.get("steps", [])[0]
+    title = f"Action: {top_step['step']}"
+    description = f"Auto-generated action for region {plan.get('region')} — plan: {plan}"
+    return top_step, title, description
+
+
+async def execute_actions(plan: Dict[str, Any], client: Optional[ActionClient] = None,
+                          outbox=None, date: Optional[str] = None) -> Dict[str, Any]:
+    """Execute the top action via function tool (ticket creation) and notify Slack.
+
+    Calls from concurrent region pipelines share `client` (by default the
+    process-wide one), so their tickets and Slack posts go out in batches over
+    pooled connections.
+
+    With an `outbox` (agents_system.outbox.Outbox) nothing is sent inline: the
+    ticket is recorded under the idempotency key ``region:date:step`` and an
+    OutboxDrainer delivers it and the Slack notification later. Re-running the
+    same region on the same date does not queue a second ticket.
+    """
+    top_step, title, description = _action(plan)
+    if outbox is not None:
+        with metrics.span("execute_actions", mode="outbox"):
+            date = date or datetime.date.today().isoformat()
+            key = f"{plan.get('region')}:{date}:{top_step['step']}"
+            queued = await asyncio.to_thread(outbox.enqueue, "ticket", {
+                "title": title,
+                "description": description,
+                "priority": "medium",
+                "notify": f"Created ticket {{ticket_id}} for region {plan.get('region')}",
+            }, key)
+        return {"ticket": queued, "slack": {"queued": queued["queued"], "idempotency_key": f"{key}:slack"}}
+
+    client = client or get_action_client()
+    with metrics.span("execute_actions", mode="direct"):
+        ticket = await client.create_ticket(title=title, description=description)
+        slack_resp = await client.post_slack(f"Created ticket {ticket['ticket_id']} for region {plan.get('region')}")
+    return {"ticket": ticket, "slack": slack_resp}
@@ -0,0 +1,95 @@
+# agents_system/mock_server.py
+"""Local stand-in for the Slack webhook and Jira REST endpoints.
+
+Used by the executor tests and handy for running sweeps without touching real
+services:
+
+    python -m agents_system.mock_server --port 8099
+    SLACK_WEBHOOK_URL=http://127.0.0.1:8099/slack JIRA_BASE_URL=http://127.0.0.1:8099 ...
+"""
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+class MockActionServer:
+    """Records every call; can add latency and fail the first N requests."""
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0, fail_status: int = 503):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = set()  # client (host, port) pairs seen
+        self._ticket_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = None
+
+    def _record(self, request: web.Request, body: Any) -> Optional[web.Response]:
+        self.requests.append({"path": request.path, "body": body})
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if len(self.requests) <= self.fail_first:
+            return web.Response(status=self.fail_status, headers={"Retry-After": "0"})
+        return None
+
+    async def _slack(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        return self._record(request, body) or web.Response(text="ok")
+
+    async def _jira_bulk(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self.latency)
+        failed = self._record(request, body)
+        if failed:
+            return failed
+        issues = []
+        for _ in body.get("issueUpdates", []):
+            n = next(self._ticket_ids)
+            issues.append({"id": str(10000 + n), "key": f"GM-{n}"})
+        return web.json_response({"issues": issues, "errors": []}, status=201)
+
+    def slack_messages(self) -> List[str]:
+        return [r["body"]["text"] for r in self.requests if r["path"] == "/slack"]
+
+    def jira_calls(self) -> List[Dict[str, Any]]:
+        return [r["body"] for r in self.requests if r["path"] == "/rest/api/2/issue/bulk"]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/slack", self._slack)
+        app.router.add_post("/rest/api/2/issue/bulk", self._jira_bulk)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(port: int, latency: float):
+    server = MockActionServer(latency=latency)
+    url = await server.start(port=port)
+    print(f"mock Slack webhook: {url}/slack")
+    print(f"mock Jira base url: {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.latency))
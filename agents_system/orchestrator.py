@@ -1,40 +1,241 @@
-import asyncio
-from .data_ingestor import fetch_forest_cover
-from .analyzer import detect_anomaly
-from .planner import build_plan
-from .executor import execute_actions
-from .reporter import make_report
-from .config import settings
-
-
-async def run_for_region(region: str = "default-region"):
-# 1) Fetch
-metrics = await fetch_forest_cover(region)
-
-
-# 2) Analyze
-analysis = await detect_anomaly(metrics, threshold_pct=5.0)
-
-
-# 3) Plan
-plan = await build_plan(analysis, region)
-
-
-# 4) Execute
-execution = await execute_actions(plan)
-
-
-# 5) Report
-report = await make_report(metrics, analysis, plan, execution)
-
-
-return {"metrics": metrics, "analysis": analysis, "plan": plan, "execution": execution, "report": report}
-
-
-if __name__ == '__main__':
-import argparse
-parser = argparse.ArgumentParser()
-parser.add_argument('--region', default='test-region')
-args = parser.parse_args()
-out = asyncio.run(run_for_region(args.region))
-print(out['report'])
\ No newline at end of file
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from core import metrics
+from .data_ingestor import fetch_forest_cover
+from .analyzer import detect_anomaly, detect_anomaly_incremental
+from .planner import build_plan
+from .executor import execute_actions
+from .tools import close_action_client, get_action_client
+from .reporter import make_report
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+async def _stage(name: str, coro, timeout: Optional[float]):
+    """Await one pipeline stage, bounded by `timeout` seconds (None = no limit).
+
+    Each stage is timed into the ``region_stage_seconds{stage=...}`` histogram.
+    """
+    try:
+        with metrics.span("region_stage", stage=name):
+            async with asyncio.timeout(timeout):
+                return await coro
+    except TimeoutError as exc:
+        raise TimeoutError(f"stage '{name}' timed out after {timeout}s") from exc
+
+
+async def run_for_region(region: str = "default-region",
+                         bbox: Optional[Tuple[float, float, float, float]] = None,
+                         stage_timeout: Optional[float] = None,
+                         store=None,
+                         outbox=None,
+                         reviewer=None):
+    """Run the region pipeline once.
+
+    With a `store` (agents_system.timeseries.MetricsStore) only the current
+    window is fetched once the region has a baseline, and anomalies are scored
+    against its rolling history. With an `outbox` (agents_system.outbox.Outbox)
+    side effects are queued for background delivery instead of sent inline.
+
+    `reviewer` is an optional ``async (metrics, analysis) -> dict | None`` run
+    between analysis and planning (see agents_system.agents.Coordinator); a
+    non-empty result is attached to the analysis as "review".
+    """
+    # 1) Fetch
+    include_previous = store is None or await asyncio.to_thread(store.get_baseline, region) is None
+    region_metrics = await _stage("fetch",
+                                  fetch_forest_cover(region, bbox=bbox, include_previous=include_previous),
+                                  stage_timeout)
+
+    # 2) Analyze
+    if store is not None:
+        analysis = await _stage("analyze", detect_anomaly_incremental(region_metrics, store, threshold_pct=5.0),
+                                stage_timeout)
+    else:
+        analysis = await _stage("analyze", detect_anomaly(region_metrics, threshold_pct=5.0), stage_timeout)
+
+    if reviewer is not None:
+        review = await _stage("review", reviewer(region_metrics, analysis), stage_timeout)
+        if review:
+            analysis = {**analysis, "review": review}
+
+    # 3) Plan
+    plan = await _stage("plan", build_plan(analysis, region), stage_timeout)
+
+    # 4) Execute
+    if outbox is not None:
+        execution = await _stage("execute",
+                                 execute_actions(plan, outbox=outbox, date=region_metrics.get("date")),
+                                 stage_timeout)
+    else:
+        execution = await _stage("execute", execute_actions(plan), stage_timeout)
+
+    # 5) Report
+    report = await _stage("report", make_report(region_metrics, analysis, plan, execution), stage_timeout)
+
+    return {"metrics": region_metrics, "analysis": analysis, "plan": plan, "execution": execution,
+            "report": report}
+
+
+def load_region_manifest(path: str) -> List[Dict[str, Any]]:
+    """Read a region manifest: a JSON or YAML list of {"name": ..., "bbox": [minx, miny, maxx, maxy]}.
+
+    A mapping with a top-level "regions" key is accepted as well.
+    """
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("regions", [])
+
+    regions = []
+    for entry in data:
+        bbox = entry.get("bbox")
+        if bbox is not None:
+            if len(bbox) != 4:
+                raise ValueError(f"region {entry.get('name')!r}: bbox must have 4 values, got {bbox!r}")
+            bbox = tuple(float(v) for v in bbox)
+        regions.append({"name": entry["name"], "bbox": bbox})
+    return regions
+
+
+async def run_for_regions(regions: Iterable[Dict[str, Any]],
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          stage_timeout: Optional[float] = None,
+                          store=None,
+                          outbox=None,
+                          reviewer=None) -> AsyncIterator[Dict[str, Any]]:
+    """Run the region pipeline for many regions concurrently.
+
+    At most `concurrency` regions are in flight at once. Results are yielded as
+    each region finishes (not in manifest order); a region that fails or times
+    out yields {"region": name, "error": ...} instead of aborting the sweep.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    done = object()
+    in_flight = metrics.gauge("regions_in_flight", "Regions currently running the pipeline")
+    outcomes = metrics.counter("regions_total", "Finished region runs by outcome")
+
+    async def _run_one(spec: Dict[str, Any]):
+        name = spec["name"]
+        async with semaphore:
+            in_flight.inc()
+            try:
+                out = await run_for_region(name, bbox=spec.get("bbox"), stage_timeout=stage_timeout,
+                                           store=store, outbox=outbox, reviewer=reviewer)
+                out["region"] = name
+            except Exception as exc:
+                out = {"region": name, "error": f"{type(exc).__name__}: {exc}"}
+            finally:
+                in_flight.dec()
+        outcomes.inc(outcome="error" if "error" in out else "ok")
+        results.put_nowait(out)
+
+    async def _fan_out():
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for spec in regions:
+                    tg.create_task(_run_one(spec))
+        finally:
+            results.put_nowait(done)
+
+    runner = asyncio.create_task(_fan_out())
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+        await runner
+    finally:
+        if not runner.done():
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+
+async def _sweep(manifest: str, concurrency: int, stage_timeout: Optional[float], store=None, outbox=None,
+                 reviewer=None) -> int:
+    drainer = None
+    if outbox is not None:
+        from .outbox import OutboxDrainer
+        drainer = OutboxDrainer(outbox)
+        drainer.start()
+    failures = 0
+    try:
+        async for out in run_for_regions(load_region_manifest(manifest), concurrency, stage_timeout,
+                                         store=store, outbox=outbox, reviewer=reviewer):
+            if "error" in out:
+                failures += 1
+                print(f"[{out['region']}] FAILED: {out['error']}", flush=True)
+            else:
+                print(out["report"], flush=True)
+                print(flush=True)
+    finally:
+        if drainer is not None:
+            await drainer.stop()
+        await close_action_client()
+    return failures
+
+
+async def _sweep_one(region: str, stage_timeout: Optional[float], store=None, outbox=None, reviewer=None):
+    # A single region has nothing to batch its ticket and Slack post with.
+    get_action_client(max_delay=0)
+    try:
+        out = await run_for_region(region, stage_timeout=stage_timeout, store=store, outbox=outbox,
+                                   reviewer=reviewer)
+        if outbox is not None:
+            from .outbox import OutboxDrainer
+            await OutboxDrainer(outbox).drain_once()
+    finally:
+        await close_action_client()
+    return out
+
+
+if __name__ == '__main__':
+    import argparse
+    import atexit
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--region', default='test-region')
+    parser.add_argument('--manifest', help='JSON/YAML region manifest; runs a concurrent multi-region sweep')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--stage-timeout', type=float, default=None, help='per-stage timeout in seconds')
+    parser.add_argument('--history', action='store_true',
+                        help='keep metrics in settings.database_url and fetch only the new window')
+    parser.add_argument('--outbox', action='store_true',
+                        help='queue tickets/Slack posts in a durable outbox and deliver them in the background')
+    parser.add_argument('--trace', metavar='PATH', help='append a JSON line per timed stage/download/reduce to PATH')
+    parser.add_argument('--review', metavar='MODEL',
+                        help="have MODEL ('stub' or an OpenAI model name) review anomalous regions; "
+                             "answers are cached in settings.database_url")
+    args = parser.parse_args()
+    if args.trace:
+        trace = metrics.JsonlTraceWriter(args.trace)
+        metrics.add_trace_hook(trace)
+        atexit.register(trace.close)
+    store = outbox = None
+    if args.history:
+        from .timeseries import MetricsStore
+        store = MetricsStore()
+    if args.outbox:
+        from .outbox import Outbox
+        outbox = Outbox()
+    reviewer = None
+    if args.review:
+        from .agents import AgentsSDKModel, Coordinator, ModelCache, StubModel
+        model = StubModel() if args.review == 'stub' else AgentsSDKModel(args.review)
+        reviewer = Coordinator(model, ModelCache()).review
+    if args.manifest:
+        sys.exit(1 if asyncio.run(_sweep(args.manifest, args.concurrency, args.stage_timeout, store, outbox,
+                                         reviewer)) else 0)
+    out = asyncio.run(_sweep_one(args.region, args.stage_timeout, store, outbox, reviewer))
+    print(out['report'])
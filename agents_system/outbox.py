@@ -0,0 +1,197 @@
+# agents_system/outbox.py
+"""Durable outbox for executor side effects.
+
+Region pipelines record tickets and Slack posts here (a SQLite table next to
+the metrics history) instead of calling out inline, so they finish at
+local-write speed. Each entry carries an idempotency key such as
+``region:date:step``; enqueueing the same key twice is a no-op, so re-running a
+region cannot create duplicate tickets. `OutboxDrainer` delivers pending
+entries in the background with bounded concurrency, retrying with backoff.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .timeseries import sqlite_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+PENDING, IN_FLIGHT, DELIVERED, DEAD = "pending", "in_flight", "delivered", "dead"
+
+
+class Outbox:
+    """SQLite-backed queue of side effects keyed by idempotency key."""
+
+    def __init__(self, database_url: Optional[str] = None, max_attempts: int = 8,
+                 backoff: float = 2.0, lease_seconds: float = 300.0):
+        if database_url is None:
+            from .config import get_settings
+            database_url = get_settings().database_url
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease_seconds = lease_seconds
+        self._conn = sqlite3.connect(sqlite_path(database_url), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], idempotency_key: str) -> Dict[str, Any]:
+        """Record a side effect; returns {"queued": False} if the key is already known."""
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, kind, payload, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (idempotency_key, kind, json.dumps(payload), now, now, now),
+            )
+            row = self._conn.execute("SELECT status FROM outbox WHERE idempotency_key = ?",
+                                     (idempotency_key,)).fetchone()
+        return {"queued": cur.rowcount == 1, "idempotency_key": idempotency_key, "status": row[0]}
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to `limit` due entries for delivery.
+
+        Entries left in flight by a crashed drainer become due again once their
+        lease expires, so delivery is at-least-once.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, updated_at = ?"
+                " WHERE id IN (SELECT id FROM outbox WHERE (status = ? OR status = ?) AND next_attempt_at <= ?"
+                "              ORDER BY next_attempt_at LIMIT ?)"
+                " RETURNING id, idempotency_key, kind, payload, attempts",
+                (IN_FLIGHT, now + self.lease_seconds, now, PENDING, IN_FLIGHT, now, limit),
+            ).fetchall()
+        return [{"id": r[0], "idempotency_key": r[1], "kind": r[2], "payload": json.loads(r[3]), "attempts": r[4]}
+                for r in rows]
+
+    def mark_delivered(self, entry_id: int, result: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE outbox SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+                               (DELIVERED, json.dumps(result), time.time(), entry_id))
+
+    def mark_failed(self, entry_id: int, attempts: int, error: str):
+        """Schedule a retry with exponential backoff, or give up after max_attempts."""
+        now = time.time()
+        status = DEAD if attempts >= self.max_attempts else PENDING
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, result = ?, updated_at = ? WHERE id = ?",
+                (status, now + self.backoff * (2 ** (attempts - 1)), json.dumps({"error": error}), now, entry_id),
+            )
+
+    def get(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT kind, status, attempts, result FROM outbox WHERE idempotency_key = ?",
+                                     (idempotency_key,)).fetchone()
+        if row is None:
+            return None
+        return {"kind": row[0], "status": row[1], "attempts": row[2], "result": json.loads(row[3]) if row[3] else None}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+class OutboxDrainer:
+    """Background worker delivering outbox entries through an ActionClient.
+
+    Outbox reads and writes run in worker threads, off the event loop.
+
+    A delivered ticket that carries a `notify` message enqueues the Slack post
+    for it (key ``<ticket key>:slack``) with the real ticket id filled in.
+    """
+
+    def __init__(self, outbox: Outbox, client=None, concurrency: int = 8, poll_interval: float = 0.5):
+        self.outbox = outbox
+        self.client = client
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _client(self):
+        if self.client is None:
+            from .tools import get_action_client
+            self.client = get_action_client()
+        return self.client
+
+    async def _deliver(self, entry: Dict[str, Any]):
+        payload = entry["payload"]
+        try:
+            if entry["kind"] == "ticket":
+                result = await self._client().create_ticket(payload["title"], payload["description"],
+                                                           payload.get("priority", "medium"))
+                ok = result.get("status") == "created"
+            elif entry["kind"] == "slack":
+                result = await self._client().post_slack(payload["message"])
+                ok = result.get("ok", False) or result.get("error") == "no webhook configured"
+            else:
+                raise ValueError(f"unknown outbox kind {entry['kind']!r}")
+        except Exception as exc:
+            await asyncio.to_thread(self.outbox.mark_failed, entry["id"], entry["attempts"],
+                                    f"{type(exc).__name__}: {exc}")
+            return
+        if not ok:
+            await asyncio.to_thread(self.outbox.mark_failed, entry["id"], entry["attempts"],
+                                    json.dumps(result, default=str))
+            return
+        await asyncio.to_thread(self.outbox.mark_delivered, entry["id"], result)
+        if entry["kind"] == "ticket" and payload.get("notify"):
+            await asyncio.to_thread(self.outbox.enqueue, "slack",
+                                    {"message": payload["notify"].format(ticket_id=result.get("ticket_id"))},
+                                    f"{entry['idempotency_key']}:slack")
+
+    async def drain_once(self) -> int:
+        """Deliver everything that is due now; returns the number of entries attempted."""
+        attempted = 0
+        while True:
+            batch = await asyncio.to_thread(self.outbox.claim, self.concurrency)
+            if not batch:
+                return attempted
+            attempted += len(batch)
+            await asyncio.gather(*(self._deliver(entry) for entry in batch))
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            if not await self.drain_once():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> asyncio.Task:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self, drain: bool = True):
+        """Stop the worker, by default after delivering what is currently due."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if drain:
+            await self.drain_once()
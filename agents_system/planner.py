@@ -1,17 +1,28 @@
-from typing import Dict, Any
-
-
-async def build_plan(analysis: Dict[str, Any], region: str) -> Dict[str, Any]:
-"""Create a short mitigation/action plan.
-Returns steps and estimated effort.
-"""
-steps = []
-if analysis.get("is_anomaly"):
-steps.append({"step": "Validate with higher-res imagery", "eta": "2 days"})
-steps.append({"step": "Notify local forestry team", "eta": "1 day"})
-steps.append({"step": "Create ground survey ticket", "eta": "3 days"})
-effort = "medium"
-else:
-steps.append({"step": "Keep monitoring", "eta": "7 days"})
-effort = "low"
-return {"region": region, "steps": steps, "effort": effort}
\ No newline at end of file
+from typing import Dict, Any
+
+SURVEY_TARGETS = 3
+
+
+async def build_plan(analysis: Dict[str, Any], region: str) -> Dict[str, Any]:
+    """Create a short mitigation/action plan.
+    Returns steps and estimated effort.
+    """
+    steps = []
+    if analysis.get("is_anomaly"):
+        steps.append({"step": "Validate with higher-res imagery", "eta": "2 days"})
+        steps.append({"step": "Notify local forestry team", "eta": "1 day"})
+        survey = {"step": "Create ground survey ticket", "eta": "3 days"}
+        # Send the survey to the largest loss patches rather than the region as a whole
+        targets = [{"centroid": p["centroid"], "bbox": p["bbox"], "area_ha": p["area_ha"]}
+                   for p in analysis.get("loss_patches", [])[:SURVEY_TARGETS]]
+        if targets:
+            survey["targets"] = targets
+        steps.append(survey)
+        # Extra steps suggested by the model review of the anomaly, if any
+        for step in (analysis.get("review") or {}).get("steps", []):
+            steps.append({"step": str(step), "eta": "tbd"})
+        effort = "medium"
+    else:
+        steps.append({"step": "Keep monitoring", "eta": "7 days"})
+        effort = "low"
+    return {"region": region, "steps": steps, "effort": effort}
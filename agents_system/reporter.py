@@ -1,14 +1,21 @@
-from typing import Dict, Any
-
-
-async def make_report(metrics: Dict[str, Any], analysis: Dict[str, Any], plan: Dict[str, Any], execution: Dict[str, Any]) -> str:
-lines = []
-lines.append(f"Region: {metrics.get('region')}")
-lines.append(f"Date: {metrics.get('date')}")
-lines.append("\n=== Analysis ===")
-lines.append(str(analysis))
-lines.append("\n=== Plan ===")
-lines.append(str(plan))
-lines.append("\n=== Execution ===")
-lines.append(str(execution))
-return "\n".join(lines)
\ No newline at end of file
+from typing import Dict, Any
+
+
+async def make_report(metrics: Dict[str, Any], analysis: Dict[str, Any], plan: Dict[str, Any], execution: Dict[str, Any]) -> str:
+    lines = []
+    lines.append(f"Region: {metrics.get('region')}")
+    lines.append(f"Date: {metrics.get('date')}")
+    loss = metrics.get("loss")
+    if loss:
+        lines.append("\n=== Forest loss ===")
+        lines.append(f"{loss['area_ha']} ha lost in {loss['patches']} patches (largest {loss['largest_ha']} ha)")
+        for patch in metrics.get("loss_patches", []):
+            lon, lat = patch["centroid"]
+            lines.append(f"- {patch['area_ha']} ha at {lat:.5f}, {lon:.5f} (bbox {patch['bbox']})")
+    lines.append("\n=== Analysis ===")
+    lines.append(str(analysis))
+    lines.append("\n=== Plan ===")
+    lines.append(str(plan))
+    lines.append("\n=== Execution ===")
+    lines.append(str(execution))
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+# agents_system/timeseries.py
+"""Local time-series store for per-region metrics.
+
+Every metrics dict produced by `fetch_forest_cover` is appended here, together
+with the running anomaly baseline of each region, in the SQLite database named
+by `settings.database_url`. With history available the analyzer only needs the
+newest window on each run instead of re-fetching the previous one.
+"""
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS region_metrics (
+    region TEXT NOT NULL,
+    date TEXT NOT NULL,
+    forest_percent REAL,
+    ndvi_mean REAL,
+    valid_pixels INTEGER,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (region, date)
+);
+CREATE TABLE IF NOT EXISTS region_baseline (
+    region TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+"""
+
+
+def sqlite_path(database_url: str) -> str:
+    """Map a `sqlite:///path` URL to a filesystem path (":memory:" is kept as is)."""
+    prefix = "sqlite:///"
+    if database_url == ":memory:" or database_url == "sqlite://":
+        return ":memory:"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"metrics store needs a sqlite:/// database_url, got {database_url!r}")
+    return database_url[len(prefix):] or ":memory:"
+
+
+class MetricsStore:
+    """Append-only metrics history plus per-region baseline state.
+
+    Baselines are also kept in memory, so the analyzer reads its running state
+    without a query; writes go through to SQLite so they survive restarts.
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        if database_url is None:
+            from .config import get_settings
+            database_url = get_settings().database_url
+        self._conn = sqlite3.connect(sqlite_path(database_url), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._baselines: Dict[str, Dict[str, Any]] = {}
+
+    def close(self):
+        self._conn.close()
+
+    def record(self, metrics: Dict[str, Any]):
+        """Store one metrics dict; a second record for the same region and date replaces the first."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO region_metrics VALUES (?, ?, ?, ?, ?, ?)",
+                (metrics["region"], metrics["date"], metrics.get("forest_percent"),
+                 metrics.get("ndvi_mean"), metrics.get("valid_pixels"), json.dumps(metrics, default=list)),
+            )
+
+    def history(self, region: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Metrics for `region`, oldest first (the newest `limit` rows if given)."""
+        query = "SELECT payload FROM region_metrics WHERE region = ? ORDER BY date DESC"
+        params: tuple = (region,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(rows)]
+
+    def series(self, region: str, since: Optional[str] = None) -> List[tuple]:
+        """(date, forest_percent) pairs for `region`, oldest first."""
+        query = "SELECT date, forest_percent FROM region_metrics WHERE region = ?"
+        params: tuple = (region,)
+        if since is not None:
+            query += " AND date >= ?"
+            params += (since,)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY date", params).fetchall()
+
+    def first_date(self, region: str) -> Optional[str]:
+        with self._lock:
+            return self._conn.execute("SELECT MIN(date) FROM region_metrics WHERE region = ?", (region,)).fetchone()[0]
+
+    def values_between(self, region: str, ranges: List[tuple]) -> List[float]:
+        """Non-null forest_percent of `region` dated inside any of the inclusive (start, end) `ranges`."""
+        if not ranges:
+            return []
+        where = " OR ".join("date BETWEEN ? AND ?" for _ in ranges)
+        params = (region,) + tuple(bound for r in ranges for bound in r)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT forest_percent FROM region_metrics WHERE region = ? AND forest_percent IS NOT NULL "
+                f"AND ({where})", params).fetchall()
+        return [value for (value,) in rows]
+
+    def get_baseline(self, region: str) -> Optional[Dict[str, Any]]:
+        if region in self._baselines:
+            return self._baselines[region]
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM region_baseline WHERE region = ?", (region,)).fetchone()
+        state = json.loads(row[0]) if row else None
+        if state is not None:
+            self._baselines[region] = state
+        return state
+
+    def save_baseline(self, region: str, state: Dict[str, Any]):
+        self._baselines[region] = state
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO region_baseline VALUES (?, ?)", (region, json.dumps(state)))
@@ -1,20 +1,264 @@
-# Lightweight wrappers for function tools that agents can call
-from agents import function_tool
-
-
-@function_tool
-def create_ticket(title: str, description: str, priority: str = "medium") -> dict:
-"""Create a ticket (placeholder). Replace with Jira/ServiceNow API calls."""
-# In production: call Jira / database / ticketing API
-return {"ticket_id": "GM-0001", "title": title, "status": "created", "priority": priority}
-
-
-@function_tool
-def post_slack(message: str) -> dict:
-"""Post a message to Slack via webhook. This is synchronous; for higher throughput use async requests."""
-import requests
-from ..config import settings
-if not settings.slack_webhook_url:
-return {"ok": False, "error": "no webhook configured"}
-res = requests.post(settings.slack_webhook_url, json={"text": message})
-return {"ok": res.ok, "status_code": res.status_code}
\ No newline at end of file
+# Lightweight wrappers for function tools that agents can call.
+# These are plain coroutines so the executor can await them directly;
+# wrap them with `agents.function_tool` where an LLM agent needs them as tools.
+#
+# All outbound HTTP goes through one shared, connection-pooled aiohttp session.
+# Notifications from many regions are coalesced into batched Slack messages and
+# Jira bulk-create calls, with retry/backoff and a per-destination rate limit.
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from core import metrics
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HttpClient:
+    """Shared aiohttp session with retry/backoff and per-destination rate limits."""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_connections: int = 100, max_per_host: int = 10,
+                 rate_per_destination: float = 5.0, burst: int = 5,
+                 max_retries: int = 3, backoff: float = 0.5, timeout: float = 30.0):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.rate_per_destination = rate_per_destination
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._session = None  # aiohttp.ClientSession, created on first request
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_per_host)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _limiter(self, url: str) -> RateLimiter:
+        destination = urlsplit(url).netloc
+        if destination not in self._limiters:
+            self._limiters[destination] = RateLimiter(self.rate_per_destination, self.burst)
+        return self._limiters[destination]
+
+    async def request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        """Send a request and return {"ok", "status_code", "body"}; retries 429/5xx and connection errors."""
+        import aiohttp
+        limiter = self._limiter(url)
+        host = urlsplit(url).netloc
+        latency = metrics.histogram("http_request_seconds", "Outbound HTTP attempt latency")
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                async with self._get_session().request(method, url, **kwargs) as res:
+                    if res.content_type == "application/json":
+                        body = await res.json()
+                    else:
+                        body = await res.text()
+                    latency.observe(time.perf_counter() - start, host=host, status=res.status)
+                    if res.status not in self.RETRY_STATUSES or attempt == self.max_retries:
+                        return {"ok": res.status < 400, "status_code": res.status, "body": body}
+                    retry_after = res.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                latency.observe(time.perf_counter() - start, host=host, status=type(exc).__name__)
+                if attempt == self.max_retries:
+                    raise
+            metrics.counter("http_retries_total", "Outbound HTTP retries").inc(host=host)
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class Batcher:
+    """Coalesces submitted items and sends them as one batch.
+
+    A batch goes out when `max_batch` items are pending or `max_delay` seconds
+    after the first pending item (with `max_delay=0`, on the next event loop
+    turn: only items submitted together share a batch). `send_batch` gets the list of items and must
+    return one result per item; each `submit` caller gets its own result.
+    """
+
+    def __init__(self, send_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch: int = 20, max_delay: float = 0.5):
+        self.send_batch = send_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set = set()
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush_pending)
+        return await future
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[tuple]):
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def flush(self):
+        """Send whatever is pending and wait for all in-flight batches."""
+        self._flush_pending()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+
+class ActionClient:
+    """Slack/Jira side effects over a shared HttpClient, batched per destination."""
+
+    def __init__(self, slack_webhook_url: Optional[str] = None, jira_base_url: Optional[str] = None,
+                 jira_api_token: Optional[str] = None, jira_project_key: str = "GM",
+                 http: Optional[HttpClient] = None, max_batch: int = 20, max_delay: float = 0.5):
+        self.slack_webhook_url = slack_webhook_url
+        self.jira_base_url = jira_base_url.rstrip("/") if jira_base_url else None
+        self.jira_api_token = jira_api_token
+        self.jira_project_key = jira_project_key
+        self.http = http or HttpClient()
+        self._slack = Batcher(self._send_slack_batch, max_batch, max_delay)
+        self._jira = Batcher(self._send_jira_batch, max_batch, max_delay)
+
+    @classmethod
+    def from_settings(cls, **kwargs) -> "ActionClient":
+        from .config import get_settings
+        settings = get_settings()
+        return cls(settings.slack_webhook_url, settings.jira_base_url, settings.jira_api_token,
+                   settings.jira_project_key, **kwargs)
+
+    async def create_ticket(self, title: str, description: str, priority: str = "medium") -> dict:
+        if not self.jira_base_url:
+            # No ticketing backend configured: placeholder ticket.
+            return {"ticket_id": "GM-0001", "title": title, "status": "created", "priority": priority}
+        return await self._jira.submit({"title": title, "description": description, "priority": priority})
+
+    async def post_slack(self, message: str) -> dict:
+        if not self.slack_webhook_url:
+            return {"ok": False, "error": "no webhook configured"}
+        return await self._slack.submit(message)
+
+    async def _send_slack_batch(self, messages: List[str]) -> List[dict]:
+        res = await self.http.request("POST", self.slack_webhook_url, json={"text": "\n".join(messages)})
+        result = {"ok": res["ok"], "status_code": res["status_code"], "batched": len(messages)}
+        return [result] * len(messages)
+
+    async def _send_jira_batch(self, tickets: List[dict]) -> List[dict]:
+        headers = {"Authorization": f"Bearer {self.jira_api_token}"} if self.jira_api_token else {}
+        payload = {"issueUpdates": [{"fields": {
+            "project": {"key": self.jira_project_key},
+            "issuetype": {"name": "Task"},
+            "summary": t["title"],
+            "description": t["description"],
+            "priority": {"name": t["priority"].capitalize()},
+        }} for t in tickets]}
+        res = await self.http.request("POST", f"{self.jira_base_url}/rest/api/2/issue/bulk",
+                                      json=payload, headers=headers)
+        body = res["body"] if isinstance(res["body"], dict) else {}
+        errors = {e.get("failedElementNumber"): e for e in body.get("errors", [])}
+        issues = iter(body.get("issues", []))
+        results = []
+        for i, t in enumerate(tickets):
+            if not res["ok"] or i in errors:
+                error = errors.get(i, {}).get("elementErrors") or res["body"]
+                results.append({"ticket_id": None, "title": t["title"], "status": "failed",
+                                "priority": t["priority"], "error": error})
+            else:
+                issue = next(issues, {})
+                results.append({"ticket_id": issue.get("key"), "title": t["title"], "status": "created",
+                                "priority": t["priority"]})
+        return results
+
+    async def flush(self):
+        await asyncio.gather(self._slack.flush(), self._jira.flush())
+
+    async def close(self):
+        await self.flush()
+        await self.http.close()
+
+
+_client: Optional[ActionClient] = None
+
+
+def get_action_client(**kwargs) -> ActionClient:
+    """Process-wide ActionClient configured from settings; `kwargs` (e.g. max_delay) apply when it is created."""
+    global _client
+    if _client is None:
+        _client = ActionClient.from_settings(**kwargs)
+    return _client
+
+
+async def close_action_client():
+    """Send what is pending and close the process-wide client's HTTP session (end of a CLI run)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.close()
+
+
+async def create_ticket(title: str, description: str, priority: str = "medium") -> dict:
+    """Create a Jira ticket (placeholder ticket when Jira is not configured)."""
+    return await get_action_client().create_ticket(title, description, priority)
+
+
+async def post_slack(message: str) -> dict:
+    """Post a message to Slack via webhook; concurrent calls are coalesced into one post."""
+    return await get_action_client().post_slack(message)
@@ -1,5 +1,5 @@
-import json
-
-
-def summarize_changes(change_metrics: dict) -> str:
-return json.dumps(change_metrics, indent=2)
\ No newline at end of file
+import json
+
+
+def summarize_changes(change_metrics: dict) -> str:
+    return json.dumps(change_metrics, indent=2)
@@ -0,0 +1,60 @@
+"""WebSocket fan-out: one hub, thousands of simulated clients.
+
+Each client runs the same loop as the /ws endpoint (get -> send); a fraction
+of them are slow and shed their oldest updates instead of holding others up.
+
+    python -m benchmarks.bench_broadcast --clients 5000 --updates 200
+"""
+import argparse
+import asyncio
+import time
+
+from src.api.broadcast import BroadcastHub
+
+
+async def run(clients: int, updates: int, slow_fraction: float) -> dict:
+    hub = BroadcastHub(max_queue=64)
+    received = [0] * clients
+    slow_count = int(clients * slow_fraction)
+
+    async def client(i: int, subscription):
+        send_delay = 0.05 if i < slow_count else 0
+        while (payload := await subscription.get()) is not None:
+            received[i] += 1
+            await asyncio.sleep(send_delay)  # stand-in for websocket.send_text
+
+    subscriptions = [hub.subscribe() for _ in range(clients)]
+    tasks = [asyncio.create_task(client(i, s)) for i, s in enumerate(subscriptions)]
+    data = {"sensor_id": "sensor_001", "measurements": {"temperature": 24.1, "aqi": 61, "co2": 417}}
+    start = time.perf_counter()
+    for _ in range(updates):
+        hub.publish("sensor_data", data)
+        await asyncio.sleep(0)
+    publish_seconds = time.perf_counter() - start
+    for s in subscriptions[slow_count:]:
+        s.close()
+    await asyncio.gather(*tasks[slow_count:])
+    fast_done = time.perf_counter() - start
+    for s in subscriptions[:slow_count]:
+        s.close()
+    for t in tasks[:slow_count]:
+        t.cancel()
+    return {"publish_seconds": publish_seconds, "fast_done": fast_done, "deliveries": hub.stats["delivered"],
+            "fast_min": min(received[slow_count:]), "dropped": hub.metrics()["dropped"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--slow", type=float, default=0.05, help="fraction of slow clients")
+    args = parser.parse_args()
+    r = asyncio.run(run(args.clients, args.updates, args.slow))
+    print(f"{args.clients} clients x {args.updates} updates ({args.slow:.0%} slow)")
+    print(f"  fan-out {r['deliveries'] / r['fast_done']:12,.0f} deliveries/s, all fast clients done in "
+          f"{r['fast_done']:.2f}s")
+    print(f"  every fast client got {r['fast_min']}/{args.updates}; slow clients dropped {r['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Broker throughput: many sensing agents feeding one analysis agent.
+
+    python -m benchmarks.bench_broker --producers 50 --messages 20000
+"""
+import argparse
+import asyncio
+import time
+
+from src.core.agent_communication import Message, MessageBroker, MessagePriority, MessageType
+
+PRIORITIES = [MessagePriority.LOW, MessagePriority.NORMAL, MessagePriority.NORMAL, MessagePriority.HIGH]
+
+
+def _message(producer: int, i: int) -> Message:
+    return Message(id=f"{producer}-{i}", sender=f"sensing_{producer}", receiver="analysis", type=MessageType.DATA,
+                   priority=PRIORITIES[i % len(PRIORITIES)], payload={"temperature": 20.0 + i % 10},
+                   timestamp="2025-01-01T00:00:00")
+
+
+async def run(producers: int, per_producer: int, batch: int, queue_size: int) -> dict:
+    broker = MessageBroker(max_queue_size=queue_size, send_timeout=None)
+    broker.register_agent("analysis")
+    total = producers * per_producer
+
+    async def produce(p: int):
+        msgs = [_message(p, i) for i in range(per_producer)]
+        if batch > 1:
+            for start in range(0, per_producer, batch):
+                await broker.send_batch(msgs[start:start + batch])
+                await asyncio.sleep(0)  # yield like a real sensing loop would
+        else:
+            for m in msgs:
+                await broker.send_message(m)
+
+    async def consume():
+        received = 0
+        while received < total:
+            if batch > 1:
+                received += len(await broker.receive_batch("analysis", max_messages=batch * 4, timeout=5))
+            else:
+                received += await broker.receive_message("analysis", timeout=5) is not None
+        return received
+
+    start = time.perf_counter()
+    consumer = asyncio.create_task(consume())
+    await asyncio.gather(*(produce(p) for p in range(producers)))
+    received = await consumer
+    elapsed = time.perf_counter() - start
+    metrics = broker.get_metrics()["totals"]
+    return {"received": received, "seconds": elapsed, "rate": received / elapsed, **metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--producers", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=4000, help="messages per producer")
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    args = parser.parse_args()
+    print(f"{args.producers} sensing agents x {args.messages} messages -> 1 analysis agent "
+          f"(mailbox {args.queue_size})")
+    for batch in (1, 64):
+        r = asyncio.run(run(args.producers, args.messages, batch, args.queue_size))
+        label = "single send/receive" if batch == 1 else f"batches of {batch}"
+        print(f"  {label:22s} {r['rate']:12,.0f} msg/s  ({r['received']} in {r['seconds']:.2f}s, "
+              f"overflow waits {r['overflow']}, dropped {r['dropped']})")
+
+
+if __name__ == "__main__":
+    main()
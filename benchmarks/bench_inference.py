@@ -0,0 +1,126 @@
+"""Model inference benchmark: per-request calls vs. the dynamic batching ModelPipeline.
+
+`--clients` concurrent callers (think AnalysisAgents, one request per sensor
+reading) each send `--requests` rows back to back. Per-request mode runs
+every row through model.predict alone in a worker thread - what inference
+costs without batching; batched mode goes through ModelPipeline, which groups
+whatever is queued, up to --max-batch rows (waiting up to --max-latency for
+--min-batch rows).
+
+Models are saved to a temporary directory and loaded back memory-mapped
+through a ModelRegistry, as in production.
+
+    python -m benchmarks.bench_inference
+    python -m benchmarks.bench_inference --clients 1 64 512 --hidden 512 --max-latency 0.002
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from models.ml_model import MLPClassifier, ModelRegistry, ZScoreAnomaly, feature_matrix
+from pipelines.model_pipeline import ModelPipeline, _percentile
+
+
+def make_models(root: str, hidden: int, seed: int = 0) -> ModelRegistry:
+    rng = np.random.default_rng(seed)
+    readings = np.column_stack([rng.normal(25, 5, 5000), rng.uniform(30, 90, 5000), rng.normal(60, 25, 5000),
+                                np.abs(rng.normal(20, 12, 5000)), rng.normal(415, 30, 5000)])
+    ZScoreAnomaly.fit(readings).save(f"{root}/sensor-anomaly")
+    sizes = [5, hidden, hidden, 3]
+    MLPClassifier([(rng.normal(size=(a, b)) / np.sqrt(a)).astype(np.float32) for a, b in zip(sizes, sizes[1:])],
+                  [np.zeros(b, np.float32) for b in sizes[1:]], ["clear", "haze", "smoke"],
+                  mean=readings.mean(axis=0).astype(np.float32),
+                  scale=readings.std(axis=0).astype(np.float32)).save(f"{root}/sensor-classifier")
+    registry = ModelRegistry()
+    registry.discover(root)
+    return registry
+
+
+def make_rows(n: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    return [{"temperature": float(t), "humidity": 60.0, "aqi": float(a), "pm25": 20.0, "co2": 415.0}
+            for t, a in zip(rng.normal(25, 5, n), rng.normal(60, 25, n))]
+
+
+async def per_request(model, rows, clients: int):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def infer(row):
+        return model.predict(feature_matrix([row], model.features))[0]
+
+    async def call(row):
+        started = loop.time()
+        await loop.run_in_executor(executor, infer, row)
+        return loop.time() - started
+
+    latencies = await _drive(rows, clients, call)
+    executor.shutdown()
+    return latencies
+
+
+async def batched(registry, name, rows, clients: int, max_batch: int, max_latency: float, min_batch: int):
+    loop = asyncio.get_running_loop()
+    pipeline = ModelPipeline(registry, max_batch_size=max_batch, max_latency=max_latency, min_batch_size=min_batch)
+    await pipeline.predict(name, rows[0])  # load the model outside the timed run
+
+    async def call(row):
+        started = loop.time()
+        await pipeline.predict(name, row)
+        return loop.time() - started
+
+    latencies = await _drive(rows, clients, call)
+    mean_batch = pipeline.metrics()["mean_batch_size"]
+    await pipeline.stop()
+    return latencies, mean_batch
+
+
+async def _drive(rows, clients: int, call):
+    async def client(part):
+        return [await call(row) for row in part]
+    parts = await asyncio.gather(*(client(rows[i::clients]) for i in range(clients)))
+    return [latency for part in parts for latency in part]
+
+
+def report(label, n, elapsed, latencies, extra=""):
+    print(f"  {label:12s} {n / elapsed:10.0f} req/s  p50 {_percentile(latencies, 50) * 1e3:7.2f} ms"
+          f"  p99 {_percentile(latencies, 99) * 1e3:7.2f} ms{extra}")
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--requests", type=int, default=20_000, help="rows per scenario")
+    parser.add_argument("--hidden", type=int, default=256, help="MLP hidden layer width")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-latency", type=float, default=0.005, help="seconds")
+    parser.add_argument("--min-batch", type=int, default=1, help="wait up to --max-latency for this many rows")
+    args = parser.parse_args()
+
+    rows = make_rows(args.requests)
+    with tempfile.TemporaryDirectory() as root:
+        registry = make_models(root, args.hidden)
+        for name in ("sensor-anomaly", "sensor-classifier"):
+            model = registry.get(name)
+            print(f"{name} ({type(model).__name__}), {args.requests} requests, "
+                  f"max batch {args.max_batch}, max latency {args.max_latency * 1e3:g} ms")
+            for clients in args.clients:
+                print(f" {clients} clients")
+                start = time.perf_counter()
+                latencies = asyncio.run(per_request(model, rows, clients))
+                single = report("per-request", len(rows), time.perf_counter() - start, latencies)
+                start = time.perf_counter()
+                latencies, mean_batch = asyncio.run(batched(registry, name, rows, clients, args.max_batch,
+                                                            args.max_latency, args.min_batch))
+                rate = report("batched", len(rows), time.perf_counter() - start, latencies,
+                              f"  mean batch {mean_batch:.1f}")
+                print(f"  speedup {rate / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
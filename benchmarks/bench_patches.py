@@ -0,0 +1,104 @@
+"""Loss-map / patch-extraction benchmark over a full 1 deg x 1 deg region.
+
+The region (~11k x 10k pixels at 10 m) is fetched through the real tiled
+ingestor with `_build_request` answering from a synthetic scene: forest with
+NDVI noise, cloud holes, and circular clearings scattered across the region
+(many crossing tile borders) plus salt-and-pepper loss noise in the current
+window. Tiles are generated on demand, so the full raster never exists in
+memory - as with real downloads.
+
+The run is repeated without the loss map (`patches=False`) to show its cost;
+peak traced memory shows it stays bounded by a few tiles.
+
+    python -m benchmarks.bench_patches
+    python -m benchmarks.bench_patches --bbox 90 26 90.5 26.5 --clearings 500 --noise 0.02
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import numpy as np
+
+from agents_system import data_ingestor
+
+
+class SyntheticScene:
+    """Both windows of a region, rendered one tile at a time on the full-bbox pixel grid."""
+
+    def __init__(self, bbox, clearings: int = 200, noise: float = 0.005, clouds: float = 0.02, seed: int = 0):
+        (self.height, self.width), _ = data_ingestor._tile_layout(bbox)
+        self.bbox = bbox
+        self.noise, self.clouds, self.seed = noise, clouds, seed
+        rng = np.random.default_rng(seed)
+        self.discs = np.column_stack([rng.uniform(0, self.height, clearings), rng.uniform(0, self.width, clearings),
+                                      rng.uniform(3, 120, clearings)])
+        self.current, _ = data_ingestor._time_windows(10, 40, 10)
+
+    def request(self, tile_bbox, time_range, size):
+        scene = self
+
+        class Request:
+            def get_data(self):
+                return [scene.render(tile_bbox, time_range, size)]
+
+        return Request()
+
+    def render(self, tile_bbox, time_range, size):
+        width, height = size
+        minx, _, maxx, maxy = self.bbox
+        c0 = round((tile_bbox[0] - minx) / (maxx - minx) * self.width)
+        r0 = round((maxy - tile_bbox[3]) / (maxy - self.bbox[1]) * self.height)
+        current = time_range == self.current
+        rng = np.random.default_rng([self.seed, r0, c0, current])
+        ndvi = rng.uniform(0.5, 0.9, size=(height, width)).astype(np.float32)
+        if current:
+            rows = np.arange(r0, r0 + height, dtype=np.float32)[:, None]
+            cols = np.arange(c0, c0 + width, dtype=np.float32)[None, :]
+            for cy, cx, radius in self.discs:
+                if r0 - radius <= cy < r0 + height + radius and c0 - radius <= cx < c0 + width + radius:
+                    ndvi[(rows - cy) ** 2 + (cols - cx) ** 2 < radius * radius] = 0.1
+            ndvi[rng.random((height, width), dtype=np.float32) < self.noise] = 0.1
+        ndvi[rng.random((height, width), dtype=np.float32) < self.clouds] = np.nan
+        return {"ndvi.tif": ndvi, "mask.tif": (ndvi >= 0.4).astype(np.uint8)}
+
+
+def run(bbox, patches: bool):
+    tracemalloc.start()
+    start, cpu = time.perf_counter(), time.process_time()
+    metrics = asyncio.run(data_ingestor.fetch_forest_cover("bench", bbox=bbox, patches=patches))
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return wall, cpu, peak, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bbox", type=float, nargs=4, default=list(data_ingestor.DEFAULT_BBOX))
+    parser.add_argument("--clearings", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.005, help="fraction of single lost pixels")
+    args = parser.parse_args()
+
+    bbox = tuple(args.bbox)
+    scene = SyntheticScene(bbox, args.clearings, args.noise)
+    data_ingestor._build_request = scene.request
+    data_ingestor.get_tile_cache = lambda: None
+    data_ingestor.set_catalog(None)
+    tiles = len(data_ingestor.tile_grid(bbox))
+    print(f"region {scene.width}x{scene.height} px ({scene.width * scene.height / 1e6:.0f} Mpx) in {tiles} tiles, "
+          f"{args.clearings} clearings, {args.noise:.1%} noise")
+
+    base_wall, base_cpu, base_peak, _ = run(bbox, patches=False)
+    wall, cpu, peak, metrics = run(bbox, patches=True)
+    for name, w, c, p in (("stats only", base_wall, base_cpu, base_peak), ("stats + loss patches", wall, cpu, peak)):
+        print(f"  {name:22s} wall {w:6.2f} s  cpu {c:6.2f} s  peak {p / 2**20:7.1f} MiB")
+    print(f"  loss map + labeling: +{wall - base_wall:.2f} s wall, +{cpu - base_cpu:.2f} s cpu")
+    loss = metrics["loss"]
+    print(f"  {loss['area_ha']:.1f} ha lost, {loss['patches']} patches >= 0.1 ha, largest {loss['largest_ha']} ha")
+    for patch in metrics["loss_patches"][:3]:
+        print(f"    {patch['area_ha']:8.2f} ha at {patch['centroid']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""DataPipeline under bursty sensor load: fixed vs adaptive batch size.
+
+The sink costs a fixed round-trip plus a per-record amount, like a database
+insert. Bursts of readings arrive with idle gaps in between.
+
+    python -m benchmarks.bench_pipeline --bursts 20 --burst-size 2000
+"""
+import argparse
+import asyncio
+import time
+
+from pipelines.data_pipeline import DataPipeline
+
+
+class DbLikeSink:
+    def __init__(self, fixed: float, per_record: float):
+        self.fixed = fixed
+        self.per_record = per_record
+        self.written = 0
+
+    async def write_batch(self, records):
+        await asyncio.sleep(self.fixed + self.per_record * len(records))
+        self.written += len(records)
+
+
+def _reading(i: int) -> dict:
+    return {"sensor_id": f"sensor_{i % 500:03d}", "timestamp": "2025-01-01T00:00:00",
+            "measurements": {"temperature": 20.0 + i % 10, "aqi": 40.0 + i % 50}}
+
+
+async def run(adaptive: bool, bursts: int, burst_size: int, gap: float, batch_size: int) -> dict:
+    sink = DbLikeSink(fixed=0.005, per_record=0.00002)
+    kwargs = {} if adaptive else {"min_batch_size": batch_size, "max_batch_size": batch_size}
+    pipeline = DataPipeline(batch_size=batch_size, sink=sink, max_latency=0.25, target_write_latency=0.02,
+                            max_pending=50_000, **kwargs)
+    task = asyncio.create_task(pipeline.start_processing())
+    start = time.perf_counter()
+    for b in range(bursts):
+        for i in range(burst_size):
+            await pipeline.submit(_reading(b * burst_size + i))
+        await asyncio.sleep(gap)
+    await pipeline.stop_processing()
+    await task
+    elapsed = time.perf_counter() - start - bursts * gap
+    return dict(pipeline.metrics(), rate=sink.written / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=2000)
+    parser.add_argument("--gap", type=float, default=0.1, help="idle seconds between bursts")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    print(f"{args.bursts} bursts x {args.burst_size} readings, sink = 5ms + 20us/record")
+    for adaptive in (False, True):
+        r = asyncio.run(run(adaptive, args.bursts, args.burst_size, args.gap, args.batch_size))
+        label = "adaptive" if adaptive else f"fixed {args.batch_size}"
+        print(f"  {label:10s} {r['rate']:10,.0f} rec/s  p50 {r['p50_latency'] * 1000:7.1f} ms  "
+              f"p99 {r['p99_latency'] * 1000:7.1f} ms  final batch {r['batch_size']}  ({r['persisted']} persisted)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Micro-benchmark: fused NDVI reducer vs. the original compute_percent_and_mean.
+
+    python -m benchmarks.bench_reducer --size 10000 --repeat 3
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from agents_system.data_ingestor.reduce import DEFAULT_PERCENTILES, HIST_BINS, HIST_RANGE, reduce_ndvi
+
+
+def legacy_compute_percent_and_mean(ndvi_array, mask_array):
+    """The pre-fusion implementation, kept here as the baseline."""
+    ndvi_vals = ndvi_array.astype(float)
+    mask_vals = mask_array.astype(bool)
+    mean_ndvi = float(np.nanmean(ndvi_vals))
+    valid_pixels = ~np.isnan(ndvi_vals)
+    pct = 100.0 * (mask_vals & valid_pixels).sum() / valid_pixels.sum()
+    return mean_ndvi, pct
+
+
+def legacy_with_histogram(ndvi_array, mask_array):
+    """Baseline plus the histogram/percentiles the fused reducer also returns."""
+    mean_ndvi, pct = legacy_compute_percent_and_mean(ndvi_array, mask_array)
+    finite = ndvi_array[~np.isnan(ndvi_array)]
+    hist = np.histogram(finite, bins=HIST_BINS, range=HIST_RANGE)[0]
+    percentiles = np.percentile(finite, DEFAULT_PERCENTILES)
+    return mean_ndvi, pct, hist, percentiles
+
+
+def make_inputs(size: int, nan_fraction: float = 0.05, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ndvi = rng.uniform(-0.2, 0.9, size=(size, size)).astype(np.float32)
+    ndvi[rng.random((size, size), dtype=np.float32) < nan_fraction] = np.nan
+    mask = (ndvi >= 0.4).astype(np.uint8)
+    return ndvi, mask
+
+
+def measure(func, *args, repeat: int = 3):
+    """Best wall time over `repeat` runs and peak extra memory of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10_000, help="raster side in pixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ndvi, mask = make_inputs(args.size)
+    pixels = ndvi.size
+    print(f"raster {args.size}x{args.size} ({pixels / 1e6:.0f} Mpx), best of {args.repeat}")
+
+    legacy_t, legacy_mem, (legacy_mean, legacy_pct) = measure(
+        legacy_compute_percent_and_mean, ndvi, mask, repeat=args.repeat)
+    full_t, full_mem, _ = measure(legacy_with_histogram, ndvi, mask, repeat=args.repeat)
+    fused_t, fused_mem, stats = measure(reduce_ndvi, ndvi, mask, repeat=args.repeat)
+    lean_t, lean_mem, _ = measure(lambda n, m: reduce_ndvi(n, m, histogram=False), ndvi, mask, repeat=args.repeat)
+
+    rows = [
+        ("legacy compute_percent_and_mean", legacy_t, legacy_mem),
+        ("legacy + np.histogram/percentile", full_t, full_mem),
+        ("reduce_ndvi (with histogram)", fused_t, fused_mem),
+        ("reduce_ndvi (no histogram)", lean_t, lean_mem),
+    ]
+    for name, t, mem in rows:
+        print(f"  {name:34s} {t * 1e3:9.1f} ms  {pixels / t / 1e6:8.0f} Mpx/s  peak {mem / 2**20:8.1f} MiB")
+    print(f"  speedup, mean/percent only: {legacy_t / lean_t:.1f}x; with histogram: {full_t / fused_t:.1f}x")
+    print(f"  mean {stats.mean:.6f} vs {legacy_mean:.6f}, percent {stats.percent:.6f} vs {legacy_pct:.6f}")
+    print("  percentiles " + ", ".join(f"p{q}={v:.3f}" for q, v in stats.percentiles().items()))
+
+
+if __name__ == "__main__":
+    main()
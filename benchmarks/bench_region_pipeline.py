@@ -0,0 +1,246 @@
+"""End-to-end region pipeline benchmark against offline stand-ins.
+
+SentinelHub is replaced by `FakeSentinelHub`, which answers Process API
+requests with synthetic NDVI/mask rasters of a configurable size after a
+configurable latency; Slack and Jira are served by the local
+`MockActionServer`. Everything else - tiling, the download pool, the NDVI
+reducer, the analyzer, the executor's batching HTTP client - is the real
+code, so changes to the ingestor, analyzer or executor show up here.
+
+Each scenario (region count x raster size) runs in a fresh process, so peak
+RSS is per scenario. With --check the results are compared against
+benchmarks/region_pipeline_thresholds.json and the exit status is non-zero on
+a regression.
+
+    python -m benchmarks.bench_region_pipeline
+    python -m benchmarks.bench_region_pipeline --regions 1 100 --sizes 256 --check
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "region_pipeline_thresholds.json")
+
+
+class FakeProcessRequest:
+    """Stands in for SentinelHubRequest: get_data() sleeps, then returns a decoded TAR-style dict."""
+
+    def __init__(self, ndvi: np.ndarray, mask: np.ndarray, latency: float):
+        self.ndvi, self.mask, self.latency = ndvi, mask, latency
+
+    def get_data(self) -> List[Dict[str, np.ndarray]]:
+        if self.latency:
+            time.sleep(self.latency)
+        # Copies stand in for the arrays a real response decode allocates.
+        return [{"ndvi.tif": self.ndvi.copy(), "mask.tif": self.mask.copy()}]
+
+
+class FakeSentinelHub:
+    """Synthetic Process API: every window gets a `raster_px` square NDVI raster.
+
+    A handful of raster variants is generated up front, each with a different
+    vegetation shift; a window picks one from a hash of its bbox and time
+    range, so the two windows of a region usually differ and a share of the
+    regions comes out anomalous.
+    """
+
+    def __init__(self, raster_px: int = 256, latency: float = 0.05, variants: int = 8,
+                 nan_fraction: float = 0.05, seed: int = 0):
+        self.raster_px = raster_px
+        self.latency = latency
+        self.requests = 0
+        rng = np.random.default_rng(seed)
+        self._rasters = []
+        for shift in np.linspace(-0.08, 0.02, variants):
+            ndvi = (rng.uniform(-0.2, 0.9, size=(raster_px, raster_px)) + shift).astype(np.float32)
+            ndvi[rng.random((raster_px, raster_px)) < nan_fraction] = np.nan
+            self._rasters.append((ndvi, (ndvi >= 0.4).astype(np.uint8)))
+
+    def build_request(self, bbox, time_range, size=None) -> FakeProcessRequest:
+        self.requests += 1
+        variant = zlib.crc32(repr((tuple(bbox), tuple(time_range))).encode()) % len(self._rasters)
+        return FakeProcessRequest(*self._rasters[variant], self.latency)
+
+    def download_batch(self, requests: List[FakeProcessRequest]) -> List[Any]:
+        """One multi-threaded client call: requests overlap SH_MAX_THREADS at a time."""
+        from agents_system import data_ingestor
+        rounds = -(-len(requests) // data_ingestor.SH_MAX_THREADS)
+        time.sleep(self.latency * rounds)
+        return [FakeProcessRequest(r.ndvi, r.mask, 0.0).get_data()[0] for r in requests]
+
+    @contextmanager
+    def installed(self):
+        """Route the data ingestor's SentinelHub calls here (tile cache and catalog pre-check off) for the block."""
+        from agents_system import data_ingestor
+        saved = (data_ingestor._build_request, data_ingestor._download_batch, data_ingestor.get_tile_cache,
+                 data_ingestor._catalog)
+        data_ingestor._build_request = self.build_request
+        data_ingestor._download_batch = self.download_batch
+        data_ingestor.get_tile_cache = lambda: None
+        data_ingestor._catalog = None
+        try:
+            yield self
+        finally:
+            (data_ingestor._build_request, data_ingestor._download_batch, data_ingestor.get_tile_cache,
+             data_ingestor._catalog) = saved
+
+
+def make_regions(n: int, span: float = 0.01) -> List[Dict[str, Any]]:
+    """`n` small single-tile regions on a grid."""
+    side = max(1, int(np.ceil(np.sqrt(n))))
+    regions = []
+    for i in range(n):
+        lon, lat = 70.0 + (i % side) * span * 2, 10.0 + (i // side) * span * 2
+        regions.append({"name": f"region-{i:04d}", "bbox": (lon, lat, lon + span, lat + span)})
+    return regions
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_scenario(regions: int, raster_px: int, sh_latency: float = 0.05, action_latency: float = 0.01,
+                       concurrency: int = 32) -> Dict[str, Any]:
+    """Run the region pipeline for `regions` regions offline; returns timings and counts."""
+    from agents_system import orchestrator, tools
+    from agents_system.mock_server import MockActionServer
+    from core import metrics
+
+    server = MockActionServer(latency=action_latency)
+    url = await server.start()
+    client = tools.ActionClient(slack_webhook_url=f"{url}/slack", jira_base_url=url,
+                                http=tools.HttpClient(rate_per_destination=1000, burst=1000),
+                                max_batch=50, max_delay=0.05)
+    latencies: List[float] = []
+    run_one = orchestrator.run_for_region
+
+    async def timed_run(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await run_one(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    saved_client, tools._client = tools._client, client
+    orchestrator.run_for_region = timed_run
+    errors = []
+    try:
+        with FakeSentinelHub(raster_px, sh_latency).installed() as sentinelhub:
+            start = time.perf_counter()
+            async for out in orchestrator.run_for_regions(make_regions(regions), concurrency=concurrency):
+                if "error" in out:
+                    errors.append(out["error"])
+            elapsed = time.perf_counter() - start
+    finally:
+        orchestrator.run_for_region = run_one
+        tools._client = saved_client
+        await client.close()
+        await server.stop()
+
+    stages = metrics.histogram("region_stage_seconds")
+    stage_ms = {}
+    for stage in ("fetch", "analyze", "plan", "execute", "report"):
+        count = stages.count(stage=stage)
+        stage_ms[stage] = round(1000 * stages.sum(stage=stage) / count, 2) if count else None
+    return {
+        "regions": regions,
+        "raster_px": raster_px,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(regions / elapsed, 2),
+        "p50_ms": round(1000 * _percentile(latencies, 0.50), 1),
+        "p99_ms": round(1000 * _percentile(latencies, 0.99), 1),
+        "stage_mean_ms": stage_ms,
+        "sentinelhub_requests": sentinelhub.requests,
+        "jira_calls": len(server.jira_calls()),
+        "slack_posts": len(server.slack_messages()),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _run_in_process(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return asyncio.run(run_scenario(**kwargs))
+
+
+def scenario_key(regions: int, raster_px: int) -> str:
+    return f"regions={regions},px={raster_px}"
+
+
+def check(result: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """Threshold violations for one scenario result (empty when within limits or unlisted)."""
+    limits = thresholds.get(scenario_key(result["regions"], result["raster_px"]))
+    if not limits:
+        return []
+    problems = []
+    if result["errors"]:
+        problems.append(f"{result['errors']} regions failed, e.g. {result['first_error']}")
+    if result["throughput"] < limits.get("min_throughput", 0):
+        problems.append(f"throughput {result['throughput']}/s < {limits['min_throughput']}/s")
+    if result["p99_ms"] > limits.get("max_p99_ms", float("inf")):
+        problems.append(f"p99 {result['p99_ms']} ms > {limits['max_p99_ms']} ms")
+    if result["peak_rss_mb"] > limits.get("max_rss_mb", float("inf")):
+        problems.append(f"peak RSS {result['peak_rss_mb']} MB > {limits['max_rss_mb']} MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024], help="raster side in pixels")
+    parser.add_argument("--sh-latency", type=float, default=0.05, help="seconds per SentinelHub request")
+    parser.add_argument("--action-latency", type=float, default=0.01, help="seconds per Slack/Jira call")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--check", action="store_true", help="fail on threshold regressions")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    args = parser.parse_args()
+
+    thresholds = {}
+    if args.check:
+        with open(THRESHOLDS_PATH) as f:
+            thresholds = json.load(f)
+
+    print(f"SentinelHub latency {args.sh_latency * 1000:.0f} ms/request, Slack/Jira {args.action_latency * 1000:.0f} ms, "
+          f"concurrency {args.concurrency}")
+    results, failures = [], []
+    for size in args.sizes:
+        for regions in args.regions:
+            kwargs = dict(regions=regions, raster_px=size, sh_latency=args.sh_latency,
+                          action_latency=args.action_latency, concurrency=args.concurrency)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                r = pool.submit(_run_in_process, kwargs).result()
+            results.append(r)
+            problems = check(r, thresholds)
+            failures.extend(f"{scenario_key(regions, size)}: {p}" for p in problems)
+            stages = " ".join(f"{k} {v}" for k, v in r["stage_mean_ms"].items())
+            print(f"  {regions:5d} regions {size:5d}px  {r['throughput']:8.1f} regions/s  "
+                  f"p50 {r['p50_ms']:8.1f} ms  p99 {r['p99_ms']:8.1f} ms  RSS {r['peak_rss_mb']:7.1f} MB  "
+                  f"errors {r['errors']}  {'REGRESSION' if problems else ''}")
+            print(f"        stage mean ms: {stages}  (jira calls {r['jira_calls']}, slack posts {r['slack_posts']})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if failures:
+        print("\nthreshold violations:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
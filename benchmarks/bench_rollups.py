@@ -0,0 +1,44 @@
+"""Range-query latency vs. history length: rollups keep it flat.
+
+    python -m benchmarks.bench_rollups --sensors 20
+"""
+import argparse
+import gc
+import time
+
+from core.rollups import DAY, RollupEngine
+
+METRICS = ["temperature", "humidity", "aqi", "co2"]
+
+
+def _timed(fn, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sensors", type=int, default=20)
+    parser.add_argument("--interval", type=int, default=300, help="seconds between readings per sensor")
+    args = parser.parse_args()
+    engine = RollupEngine()
+    t, day = 1735689600, 0
+    print(f"{args.sensors} sensors, one reading each per {args.interval}s")
+    for days in (1, 7, 30, 90):
+        while day < days:
+            engine.ingest({"ts": t + s, "sensor_id": f"sensor_{n}",
+                           "measurements": {m: float((s + n) % 97) for m in METRICS}}
+                          for s in range(0, DAY, args.interval) for n in range(args.sensors))
+            t += DAY
+            day += 1
+        now = t
+        gc.collect()  # don't bill the ingest's garbage to the first query
+        row = "  ".join(f"{label} {_timed(lambda: engine.query(METRICS, now - span, now)):6.2f} ms"
+                        for label, span in (("24h", DAY), ("7d", 7 * DAY), ("30d", 30 * DAY)))
+        print(f"  history {days:3d}d ({engine.ingested:>9,} readings): {row}")
+
+
+if __name__ == "__main__":
+    main()
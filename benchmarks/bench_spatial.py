@@ -0,0 +1,64 @@
+"""Viewport and point-in-region lookups at 100k entities: grid index vs. scan.
+
+    python -m benchmarks.bench_spatial --entities 100000
+"""
+import argparse
+import random
+import time
+
+from core.spatial import ALERT, REGION, SENSOR, SpatialIndex, intersects
+
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--cell-size", type=float, default=0.25)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    index = SpatialIndex(cell_size=args.cell_size)
+    entities = []
+    start = time.perf_counter()
+    for i in range(args.entities):
+        # Clustered like real deployments: most entities around a few hundred cities.
+        cx, cy = rng.uniform(-170, 170), rng.uniform(-60, 70)
+        if i % 10 == 0:
+            size = rng.uniform(0.1, 2.0)
+            bbox, kind = (cx, cy, cx + size, cy + size), REGION
+        else:
+            x, y = cx + rng.gauss(0, 0.5), cy + rng.gauss(0, 0.5)
+            bbox, kind = (x, y, x, y), (SENSOR if i % 10 < 7 else ALERT)
+        index.insert(f"e{i}", kind, bbox)
+        entities.append((bbox, kind))
+    build = time.perf_counter() - start
+
+    viewports = []
+    for _ in range(200):
+        x, y = rng.uniform(-170, 160), rng.uniform(-60, 60)
+        viewports.append((x, y, x + 5, y + 3))
+    points = [(rng.uniform(-170, 170), rng.uniform(-60, 70)) for _ in range(1000)]
+    vp, pt = iter(viewports * 100), iter(points * 100)
+
+    def scan_viewport():
+        v = next(vp)
+        return [b for b, k in entities if k == ALERT and intersects(b, v)]
+
+    def scan_point():
+        x, y = next(pt)
+        return [b for b, k in entities if k == REGION and intersects(b, (x, y, x, y))]
+
+    print(f"{args.entities:,} entities, cell {args.cell_size} deg (index built in {build:.2f}s)")
+    print(f"  alerts in 5x3 deg viewport  index {_timed(lambda: index.query(next(vp), ALERT), 200):8.3f} ms"
+          f"   scan {_timed(scan_viewport, 20):8.3f} ms")
+    print(f"  regions containing a point  index {_timed(lambda: index.containing(*next(pt)), 1000):8.3f} ms"
+          f"   scan {_timed(scan_point, 20):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
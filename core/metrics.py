@@ -1 +1,286 @@
-# Placeholder for metrics.py
+"""In-process counters, gauges and histograms with a Prometheus text exporter.
+
+Instruments are created on first use from the module-level `registry` and are
+safe to update from worker threads (the SentinelHub download pool) as well as
+from the event loop. `span(name, **labels)` times a block into the histogram
+``<name>_seconds``, counts failures in ``<name>_errors_total`` and hands a
+trace record to every registered trace hook, e.g. a `JsonlTraceWriter`:
+
+    with span("region_stage", stage="fetch"):
+        ...
+
+`render()` produces the Prometheus 0.0.4 text format served at /metrics.
+"""
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; covers cache hits (ms) up to large multi-tile downloads (minutes).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, LabelKey, Optional[Tuple[str, str]], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = []
+        if self.help:
+            lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(_key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(_key(labels), 0.0)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, counts in self._counts.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets + (math.inf,), counts):
+                    cumulative += n
+                    out.append((f"{self.name}_bucket", key, ("le", _format_value(bound)), cumulative))
+                out.append((f"{self.name}_sum", key, None, self._sums[key]))
+                out.append((f"{self.name}_count", key, None, cumulative))
+        return out
+
+
+class Registry:
+    """Named instruments, created on first use; asking again returns the same one."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._trace_hooks: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _get(self, cls, name: str, help: str, **kwargs) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, **kwargs)
+        if not isinstance(metric, cls):
+            raise TypeError(f"metric {name!r} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    # ---- tracing ----
+
+    def add_trace_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        self._trace_hooks.append(hook)
+
+    def remove_trace_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        if hook in self._trace_hooks:
+            self._trace_hooks.remove(hook)
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Time the block into `<name>_seconds` and emit a trace record to the hooks."""
+        start_wall = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = type(exc).__name__
+            self.counter(f"{name}_errors_total", f"Failed {name} spans").inc(**labels, error=error)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.histogram(f"{name}_seconds", f"Duration of {name} spans").observe(duration, **labels)
+            if self._trace_hooks:
+                record = {"name": name, "labels": labels, "start": start_wall,
+                          "duration": duration, "error": error}
+                for hook in list(self._trace_hooks):
+                    try:
+                        hook(record)
+                    except Exception:
+                        pass  # a broken trace sink must not fail the traced work
+
+    # ---- export ----
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+class JsonlTraceWriter:
+    """Trace hook appending one JSON line per span to `path`.
+
+    The file stays open, line-buffered, until `close()` (or the end of a
+    ``with`` block); records arriving after that are dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1)
+
+    def __call__(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "JsonlTraceWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+span = registry.span
+add_trace_hook = registry.add_trace_hook
+remove_trace_hook = registry.remove_trace_hook
+render = registry.render
@@ -0,0 +1,203 @@
+"""Incrementally maintained time-bucket rollups for sensor readings.
+
+Every reading updates min/max/sum/count buckets at 1-minute, 1-hour and 1-day
+resolution, for its own sensor and for the all-sensors series ("*"). Range
+queries read only the buckets of the coarsest resolution that still resolves
+the range (at most `max_buckets` of them) and thin them to the requested point
+count with LTTB, so their cost depends on the range, not on how much history
+has been ingested.
+
+Buckets older than a resolution's retention are dropped as time advances.
+"""
+import bisect
+import math
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+RESOLUTION_LABELS = {MINUTE: "1m", HOUR: "1h", DAY: "1d"}
+# Seconds of history kept per resolution (None = forever).
+DEFAULT_RETENTION = {MINUTE: 2 * DAY, HOUR: 90 * DAY, DAY: None}
+ALL_SENSORS = "*"
+
+_RANGE_RE = re.compile(r"^(\d+)([mhdw])$")
+_UNITS = {"m": MINUTE, "h": HOUR, "d": DAY, "w": 7 * DAY}
+
+
+def parse_range(value: str) -> int:
+    """'15m', '24h', '7d', '2w' -> seconds."""
+    match = _RANGE_RE.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid range {value!r}; expected e.g. 15m, 24h, 7d")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def lttb(x: Sequence[float], y: Sequence[float], n_out: int) -> "np.ndarray":
+    """Indices of the Largest-Triangle-Three-Buckets downsample of (x, y) to `n_out` points."""
+    import numpy as np  # only needed once a query has more buckets than points
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+class _Series:
+    """Sorted bucket starts with [min, max, sum, count] per bucket."""
+
+    __slots__ = ("starts", "aggs")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.aggs: Dict[int, List[float]] = {}
+
+    def add(self, start: int, value: float):
+        agg = self.aggs.get(start)
+        if agg is not None:
+            if value < agg[0]:
+                agg[0] = value
+            if value > agg[1]:
+                agg[1] = value
+            agg[2] += value
+            agg[3] += 1
+            return
+        self.aggs[start] = [value, value, value, 1]
+        if not self.starts or start > self.starts[-1]:
+            self.starts.append(start)
+        else:
+            bisect.insort(self.starts, start)
+
+    def evict_before(self, cutoff: int):
+        cut = bisect.bisect_left(self.starts, cutoff)
+        if cut:
+            for start in self.starts[:cut]:
+                del self.aggs[start]
+            del self.starts[:cut]
+
+    def window(self, start: float, end: float) -> List[int]:
+        return self.starts[bisect.bisect_left(self.starts, start):bisect.bisect_left(self.starts, end)]
+
+
+class RollupEngine:
+    def __init__(self, resolutions: Iterable[int] = RESOLUTIONS,
+                 retention: Optional[Dict[int, Optional[int]]] = None, max_buckets: int = 2000):
+        self.resolutions = tuple(sorted(resolutions))
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.max_buckets = max_buckets
+        # (resolution, sensor_id, metric) -> series
+        self._series: Dict[Tuple[int, str, str], _Series] = {}
+        self._latest = 0.0
+        self._next_eviction = 0.0
+        self.ingested = 0
+
+    def _get(self, resolution: int, sensor_id: str, metric: str) -> _Series:
+        key = (resolution, sensor_id, metric)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        return series
+
+    def ingest(self, records: Iterable[Dict[str, Any]]):
+        """Fold readings ({"ts", "sensor_id", "measurements"}) into every resolution."""
+        for record in records:
+            ts = float(record["ts"])
+            sensor_id = record["sensor_id"]
+            for metric, value in record.get("measurements", {}).items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool) or math.isnan(value):
+                    continue
+                for resolution in self.resolutions:
+                    start = int(ts // resolution) * resolution
+                    self._get(resolution, sensor_id, metric).add(start, value)
+                    self._get(resolution, ALL_SENSORS, metric).add(start, value)
+            self.ingested += 1
+            if ts > self._latest:
+                self._latest = ts
+        if self._latest >= self._next_eviction:
+            self._evict()
+
+    async def write_batch(self, records: List[Dict[str, Any]]):
+        """DataPipeline sink interface."""
+        self.ingest(records)
+
+    def _evict(self):
+        for (resolution, _, _), series in self._series.items():
+            keep = self.retention.get(resolution)
+            if keep is not None:
+                series.evict_before(int(self._latest - keep))
+        self._next_eviction = self._latest + MINUTE
+
+    def resolution_for(self, span: float) -> int:
+        """Finest resolution whose bucket count over `span` stays within max_buckets."""
+        for resolution in self.resolutions:
+            keep = self.retention.get(resolution)
+            if span / resolution <= self.max_buckets and (keep is None or span <= keep):
+                return resolution
+        return self.resolutions[-1]
+
+    def _aggs(self, resolution: int, sensor_ids: Sequence[str], metric: str, start: float,
+              end: float) -> Dict[int, List[float]]:
+        """Bucket -> [min, max, sum, count] over [start, end), merged across `sensor_ids`."""
+        if len(sensor_ids) == 1:
+            series = self._series.get((resolution, sensor_ids[0], metric))
+            return {b: series.aggs[b] for b in series.window(start, end)} if series else {}
+        merged: Dict[int, List[float]] = {}
+        for sensor in sensor_ids:
+            series = self._series.get((resolution, sensor, metric))
+            if series is None:
+                continue
+            for bucket in series.window(start, end):
+                agg = series.aggs[bucket]
+                into = merged.get(bucket)
+                if into is None:
+                    merged[bucket] = list(agg)
+                else:
+                    into[0] = min(into[0], agg[0])
+                    into[1] = max(into[1], agg[1])
+                    into[2] += agg[2]
+                    into[3] += agg[3]
+        return merged
+
+    def query(self, metrics: Sequence[str], start: float, end: float, sensor_id: Optional[str] = None,
+              max_points: int = 500, sensor_ids: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Aggregated points for `metrics` over [start, end).
+
+        `sensor_ids` merges several sensors (e.g. those inside a map bbox);
+        otherwise `sensor_id` or the all-sensors series is used. The time axis
+        is the primary (first) metric's buckets, thinned with LTTB on its
+        means; the other metrics are reported at the same buckets.
+        """
+        resolution = self.resolution_for(end - start)
+        sensors = list(sensor_ids) if sensor_ids is not None else [sensor_id or ALL_SENSORS]
+        by_metric = {metric: self._aggs(resolution, sensors, metric, start, end) for metric in metrics}
+        primary = by_metric[metrics[0]]
+        starts = sorted(primary)
+        if len(starts) > max_points:
+            means = [primary[s][2] / primary[s][3] for s in starts]
+            starts = [starts[i] for i in lttb(starts, means, max_points)]
+        points = []
+        for bucket in starts:
+            point: Dict[str, Any] = {"t": bucket}
+            for metric in metrics:
+                agg = by_metric[metric].get(bucket)
+                point[metric] = None if agg is None else {
+                    "min": agg[0], "max": agg[1], "mean": agg[2] / agg[3], "count": agg[3]}
+            points.append(point)
+        return {"resolution": resolution, "points": points}
@@ -0,0 +1,185 @@
+"""In-memory spatial index over monitored regions, sensors and alerts.
+
+A uniform lon/lat grid (`cell_size` degrees, geohash-style) per entity kind.
+Every entity has a bbox ``(min_lon, min_lat, max_lon, max_lat)`` - a point is
+a zero-size bbox - and is listed in each grid cell it touches. Viewport
+queries and point-in-region lookups visit only the cells they overlap instead
+of scanning every entity. Entities spanning more than `max_cells` cells (a
+continent-sized region) are kept aside and checked directly.
+
+`attach(broker)` keeps sensor positions and alerts in sync with agent
+traffic; regions are registered with `insert(..., kind="region")`. Recent
+alerts without a location are kept too (`recent_alerts`), just not indexed.
+"""
+import asyncio
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+BBox = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+REGION, SENSOR, ALERT = "region", "sensor", "alert"
+
+
+def parse_bbox(value: str) -> BBox:
+    """'min_lon,min_lat,max_lon,max_lat' -> tuple (raises ValueError)."""
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+        raise ValueError(f"invalid bbox {value!r}; expected min_lon,min_lat,max_lon,max_lat")
+    return tuple(parts)
+
+
+def intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def location_of(payload: Dict[str, Any]) -> Optional[BBox]:
+    """Point bbox from a payload with lon/lat (top level or under "location"), if any."""
+    source = payload.get("location") if isinstance(payload.get("location"), dict) else payload
+    lon, lat = source.get("lon"), source.get("lat")
+    if isinstance(lon, (int, float)) and isinstance(lat, (int, float)):
+        return (lon, lat, lon, lat)
+    return None
+
+
+@dataclass
+class Entity:
+    id: str
+    kind: str
+    bbox: BBox
+    data: Any = None
+    cells: List[Cell] = field(default_factory=list, repr=False)
+
+
+class SpatialIndex:
+    def __init__(self, cell_size: float = 0.25, max_cells: int = 4096):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._entities: Dict[str, Entity] = {}
+        self._grids: Dict[str, Dict[Cell, Set[str]]] = {}
+        self._large: Dict[str, Set[str]] = {}
+        self._alerts: Deque[Dict[str, Any]] = deque()  # oldest first
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def _cell_span(self, bbox: BBox) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (math.floor(bbox[0] / size), math.floor(bbox[1] / size),
+                math.floor(bbox[2] / size), math.floor(bbox[3] / size))
+
+    def get(self, entity_id: str) -> Optional[Entity]:
+        return self._entities.get(entity_id)
+
+    def insert(self, entity_id: str, kind: str, bbox: BBox, data: Any = None) -> Entity:
+        """Add or move an entity; re-inserting with the same bbox only replaces its data."""
+        bbox = tuple(float(v) for v in bbox)
+        current = self._entities.get(entity_id)
+        if current is not None and current.kind == kind and current.bbox == bbox:
+            current.data = data
+            return current
+        if current is not None:
+            self.remove(entity_id)
+        entity = Entity(entity_id, kind, bbox, data)
+        x0, y0, x1, y1 = self._cell_span(bbox)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self._large.setdefault(kind, set()).add(entity_id)
+        else:
+            grid = self._grids.setdefault(kind, {})
+            entity.cells = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+            for cell in entity.cells:
+                grid.setdefault(cell, set()).add(entity_id)
+        self._entities[entity_id] = entity
+        return entity
+
+    def remove(self, entity_id: str) -> Optional[Entity]:
+        entity = self._entities.pop(entity_id, None)
+        if entity is None:
+            return None
+        grid = self._grids.get(entity.kind, {})
+        for cell in entity.cells:
+            members = grid.get(cell)
+            if members is not None:
+                members.discard(entity_id)
+                if not members:
+                    del grid[cell]
+        self._large.get(entity.kind, set()).discard(entity_id)
+        return entity
+
+    def _candidates(self, kind: str, bbox: BBox) -> Set[str]:
+        grid = self._grids.get(kind, {})
+        x0, y0, x1, y1 = self._cell_span(bbox)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(grid):
+            # Viewport covers more cells than are occupied: walk the occupied ones.
+            found = set().union(*(ids for (x, y), ids in grid.items() if x0 <= x <= x1 and y0 <= y <= y1))
+        else:
+            found = set()
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    ids = grid.get((x, y))
+                    if ids:
+                        found |= ids
+        return found | self._large.get(kind, set())
+
+    def query(self, bbox: BBox, kind: Optional[str] = None) -> List[Entity]:
+        """Entities (of `kind`, or all kinds) whose bbox intersects `bbox`."""
+        kinds = [kind] if kind is not None else list(set(self._grids) | set(self._large))
+        results = []
+        for k in kinds:
+            for entity_id in self._candidates(k, bbox):
+                entity = self._entities[entity_id]
+                if intersects(entity.bbox, bbox):
+                    results.append(entity)
+        return results
+
+    def containing(self, lon: float, lat: float, kind: str = REGION) -> List[Entity]:
+        """Entities of `kind` whose bbox contains the point (e.g. regions around a sensor)."""
+        return self.query((lon, lat, lon, lat), kind)
+
+    # ---- agent traffic ----
+
+    def recent_alerts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The newest alerts first, located or not."""
+        alerts = list(reversed(self._alerts))
+        return alerts if limit is None else alerts[:limit]
+
+    @property
+    def alert_count(self) -> int:
+        return len(self._alerts)
+
+    def index_message(self, topic: str, payload: Dict[str, Any], message_id: str, max_alerts: int = 10_000):
+        location = location_of(payload)
+        if topic == "sensor_data" and payload.get("sensor_id") and location is not None:
+            self.insert(payload["sensor_id"], SENSOR, location, {"sensor_id": payload["sensor_id"]})
+        elif topic == "alerts":
+            regions = [e.id for e in self.containing(location[0], location[1])] if location is not None else []
+            alert = {**payload, "id": message_id, "regions": regions}
+            if location is not None:
+                self.insert(message_id, ALERT, location, alert)
+            self._alerts.append(alert)
+            while len(self._alerts) > max_alerts:
+                self.remove(self._alerts.popleft()["id"])
+
+    def attach(self, broker, topics: Iterable[str] = ("sensor_data", "alerts"), agent_id: str = "spatial_index",
+               max_alerts: int = 10_000, on_update: Optional[Callable[[Set[str]], None]] = None) -> asyncio.Task:
+        """Track sensor positions and recent alerts (the newest `max_alerts`) from broker topics.
+
+        `on_update(topics)` is called after each received batch is indexed, e.g.
+        `ResponseCache.invalidate_topics`, so a cache is only invalidated once
+        the index already holds the new data.
+        """
+        for topic in topics:
+            broker.subscribe(agent_id, topic)
+
+        async def listen():
+            while True:
+                batch = await broker.receive_batch(agent_id, 1000, None)
+                for message in batch:
+                    if isinstance(message.payload, dict):
+                        self.index_message(message.topic, message.payload, message.id, max_alerts)
+                if on_update is not None and batch:
+                    on_update({m.topic for m in batch})
+
+        return asyncio.create_task(listen())
@@ -0,0 +1,366 @@
+"""Bulk persistence for sensor readings.
+
+`open_storage(database_url)` picks the backend from the URL:
+
+* ``postgresql://...`` - pooled psycopg2 connections; readings are loaded
+  with COPY into a range-partitioned table (one partition per month, created
+  on demand).
+* ``sqlite:///path`` - the local stand-in used in development and tests; one
+  table per month (``sensor_readings_YYYYMM``), rows inserted with
+  executemany inside a single transaction, WAL journal.
+
+`WriteBehindBuffer` sits in front of either backend: the data pipeline and
+agents hand it rows and return immediately; it writes them in bulk from a
+worker thread when `max_rows` accumulate or every `flush_interval` seconds.
+
+Per-region forest metrics are not stored here; they live in
+agents_system.timeseries.MetricsStore with the anomaly baselines.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+READINGS = "sensor_readings"
+READING_FIELDS = ("temperature", "humidity", "aqi", "pm25", "co2")
+
+
+# ======== ROW HELPERS ========
+
+def _timestamp(record: Dict[str, Any]) -> float:
+    if record.get("ts") is not None:
+        return float(record["ts"])
+    parsed = datetime.fromisoformat(str(record["timestamp"]))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def month_key(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m")
+
+
+def _month_bounds(key: str) -> Tuple[str, str]:
+    """UTC start and end of a `month_key` month as timestamptz literals.
+
+    The offset is explicit so Postgres does not read the bounds in the
+    session time zone while rows are bucketed by UTC month.
+    """
+    year, month = int(key[:4]), int(key[4:])
+    upper = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01 00:00:00+00", f"{upper[0]:04d}-{upper[1]:02d}-01 00:00:00+00"
+
+
+def reading_row(record: Dict[str, Any]) -> tuple:
+    """(ts, sensor_id, *READING_FIELDS, extra_json) for one pipeline record."""
+    measurements = record.get("measurements", {})
+    extra = {k: v for k, v in measurements.items() if k not in READING_FIELDS}
+    return (_timestamp(record), record["sensor_id"], *(measurements.get(f) for f in READING_FIELDS),
+            json.dumps(extra) if extra else None)
+
+
+def _by_month(rows: Iterable[tuple], ts_of) -> Dict[str, List[tuple]]:
+    groups: Dict[str, List[tuple]] = {}
+    for row in rows:
+        groups.setdefault(month_key(ts_of(row)), []).append(row)
+    return groups
+
+
+def copy_csv(rows: Iterable[tuple]) -> io.StringIO:
+    """CSV buffer for COPY ... FROM STDIN WITH (FORMAT csv); None becomes NULL."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow("" if v is None else v for v in row)
+    buf.seek(0)
+    return buf
+
+
+# ======== BACKENDS ========
+
+class Storage:
+    """Common interface; rows are written in bulk and grouped by month partition."""
+
+    def write_readings(self, records: List[Dict[str, Any]]) -> int:
+        raise NotImplementedError
+
+    def query_readings(self, sensor_id: Optional[str] = None, start: Optional[float] = None,
+                       end: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def partitions(self, table: str = READINGS) -> List[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # DataPipeline sink interface (blocking; the pipeline runs it in a thread).
+    def write_batch(self, records: List[Dict[str, Any]]) -> int:
+        return self.write_readings(records)
+
+    @staticmethod
+    def _reading_dict(row: tuple) -> Dict[str, Any]:
+        ts, sensor_id, *values, extra = row
+        measurements = {f: v for f, v in zip(READING_FIELDS, values) if v is not None}
+        if extra:
+            measurements.update(json.loads(extra) if isinstance(extra, str) else extra)
+        if isinstance(ts, datetime):
+            ts = ts.timestamp()
+        return {"ts": ts, "sensor_id": sensor_id, "measurements": measurements}
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._known: set = set(self.partitions(READINGS))
+
+    def close(self):
+        self._conn.close()
+
+    def _ensure(self, table: str, key: str) -> str:
+        name = f"{table}_{key}"
+        if name in self._known:
+            return name
+        columns = ", ".join(f"{f} REAL" for f in READING_FIELDS)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (ts REAL NOT NULL, sensor_id TEXT NOT NULL, "
+                           f"{columns}, extra TEXT)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_sensor_ts ON {name} (sensor_id, ts)")
+        self._known.add(name)
+        return name
+
+    def write_readings(self, records: List[Dict[str, Any]]) -> int:
+        groups = _by_month((reading_row(r) for r in records), lambda row: row[0])
+        placeholders = ", ".join("?" * (len(READING_FIELDS) + 3))
+        with self._lock, self._conn:
+            for key, rows in groups.items():
+                self._conn.executemany(f"INSERT INTO {self._ensure(READINGS, key)} VALUES ({placeholders})", rows)
+        return len(records)
+
+    def partitions(self, table: str = READINGS) -> List[str]:
+        rows = self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+                                  (f"{table}_[0-9][0-9][0-9][0-9][0-9][0-9]",)).fetchall()
+        return sorted(name for (name,) in rows)
+
+    def query_readings(self, sensor_id: Optional[str] = None, start: Optional[float] = None,
+                       end: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Readings ordered by time; only partitions overlapping [start, end) are scanned."""
+        lo = month_key(start) if start is not None else "000000"
+        hi = month_key(end) if end is not None else "999999"
+        tables = [t for t in self.partitions(READINGS) if lo <= t[-6:] <= hi]
+        if not tables:
+            return []
+        where, params = [], []
+        if sensor_id is not None:
+            where.append("sensor_id = ?")
+            params.append(sensor_id)
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("ts < ?")
+            params.append(end)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        query = " UNION ALL ".join(f"SELECT * FROM {t}{clause}" for t in tables) + " ORDER BY ts"
+        params = params * len(tables)
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._reading_dict(row) for row in rows]
+
+
+class PostgresStorage(Storage):
+    def __init__(self, database_url: str, minconn: int = 1, maxconn: int = 4):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError as exc:  # optional dependency
+            raise ImportError("PostgresStorage needs psycopg2 (pip install psycopg2-binary)") from exc
+        self._pool = ThreadedConnectionPool(minconn, maxconn, database_url)
+        self._known: set = set()
+        self._ddl_lock = threading.Lock()
+        columns = ", ".join(f"{f} DOUBLE PRECISION" for f in READING_FIELDS)
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {READINGS} (ts TIMESTAMPTZ NOT NULL, sensor_id TEXT NOT NULL, "
+            f"{columns}, extra JSONB) PARTITION BY RANGE (ts);"
+            f"CREATE INDEX IF NOT EXISTS {READINGS}_sensor_ts ON {READINGS} (sensor_id, ts);"
+        )
+
+    def close(self):
+        self._pool.closeall()
+
+    def _execute(self, sql: str, params: tuple = ()):
+        conn = self._pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(sql, params)
+        finally:
+            self._pool.putconn(conn)
+
+    def _ensure(self, table: str, keys: Iterable[str]):
+        missing = [k for k in keys if f"{table}_{k}" not in self._known]
+        if not missing:
+            return
+        with self._ddl_lock:
+            for key in missing:
+                lower, upper = _month_bounds(key)
+                self._execute(f"CREATE TABLE IF NOT EXISTS {table}_{key} PARTITION OF {table} "
+                              f"FOR VALUES FROM ('{lower}') TO ('{upper}')")
+                self._known.add(f"{table}_{key}")
+
+    def write_readings(self, records: List[Dict[str, Any]]) -> int:
+        rows = [reading_row(r) for r in records]
+        self._ensure(READINGS, {month_key(row[0]) for row in rows})
+        buf = copy_csv((datetime.fromtimestamp(row[0], timezone.utc).isoformat(), *row[1:]) for row in rows)
+        columns = ", ".join(("ts", "sensor_id") + READING_FIELDS + ("extra",))
+        conn = self._pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.copy_expert(f"COPY {READINGS} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            self._pool.putconn(conn)
+        return len(rows)
+
+    def partitions(self, table: str = READINGS) -> List[str]:
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s", (table,))
+                return sorted(name for (name,) in cur.fetchall())
+        finally:
+            self._pool.putconn(conn)
+
+    def query_readings(self, sensor_id: Optional[str] = None, start: Optional[float] = None,
+                       end: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        where, params = [], []
+        if sensor_id is not None:
+            where.append("sensor_id = %s")
+            params.append(sensor_id)
+        if start is not None:
+            where.append("ts >= to_timestamp(%s)")
+            params.append(start)
+        if end is not None:
+            where.append("ts < to_timestamp(%s)")
+            params.append(end)
+        query = f"SELECT * FROM {READINGS}" + (f" WHERE {' AND '.join(where)}" if where else "") + " ORDER BY ts"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        conn = self._pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return [self._reading_dict(row) for row in cur.fetchall()]
+        finally:
+            self._pool.putconn(conn)
+
+
+def open_storage(database_url: Optional[str] = None, pool_size: int = 4) -> Storage:
+    if not database_url:
+        # Same default as the CLI (settings.database_url), so both use one database.
+        from agents_system.config import get_settings
+        database_url = get_settings().database_url
+    if database_url.startswith(("postgresql://", "postgres://")):
+        return PostgresStorage(database_url, maxconn=pool_size)
+    if database_url in (":memory:", "sqlite://"):
+        return SQLiteStorage(":memory:")
+    if database_url.startswith("sqlite:///"):
+        return SQLiteStorage(database_url[len("sqlite:///"):] or ":memory:")
+    raise ValueError(f"unsupported database_url {database_url!r}")
+
+
+# ======== WRITE-BEHIND ========
+
+class WriteBehindBuffer:
+    """Collects rows in memory and writes them to `storage` in bulk.
+
+    Callers never wait for the database unless `max_pending` rows are already
+    buffered, in which case `add_readings` flushes first (backpressure). If
+    that flush fails, the error is raised and the new rows are not taken, so
+    the buffer stays bounded and the caller (DataPipeline's retry/backoff)
+    still owns them; they are counted in stats["rejected"]. Rows already
+    buffered are kept and retried on the next flush.
+    """
+
+    def __init__(self, storage: Storage, max_rows: int = 5000, flush_interval: float = 1.0,
+                 max_pending: int = 200_000):
+        self.storage = storage
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.stats = {"flushes": 0, "rows_written": 0, "write_errors": 0, "rejected": 0}
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def add_readings(self, rows: List[Dict[str, Any]]):
+        if self._pending and len(self._pending) + len(rows) > self.max_pending:
+            try:
+                await self.flush()
+            except Exception:
+                self.stats["rejected"] += len(rows)
+                raise
+        self._pending.extend(rows)
+        if len(self._pending) >= self.max_rows:
+            self._wake.set()
+
+    async def write_batch(self, records: List[Dict[str, Any]]):
+        """DataPipeline sink interface."""
+        await self.add_readings(records)
+
+    async def flush(self):
+        """Write everything buffered so far; on failure the rows stay buffered and the error is raised."""
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                try:
+                    await asyncio.to_thread(self.storage.write_readings, rows)
+                except Exception:
+                    self.stats["write_errors"] += 1
+                    self._pending[:0] = rows
+                    raise
+                self.stats["rows_written"] += len(rows)
+            self.stats["flushes"] += 1
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("write-behind flush failed; %d rows kept for retry", self.pending)
+
+    def start(self) -> asyncio.Task:
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
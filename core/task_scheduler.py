@@ -1 +1,279 @@
-# Placeholder for task_scheduler.py
+"""Adaptive revisit scheduler for monitored regions.
+
+Regions sit in a heap ordered by their next run time. After every run the
+`RevisitPolicy` picks the next interval as a whole number of Sentinel-2
+revisits (new imagery only arrives that often): one revisit after an anomaly
+or while recent changes are volatile, growing (x`backoff`) up to
+`max_revisits` while a region stays stable. Failed runs retry sooner, with
+exponential backoff. A little jitter spreads regions that would otherwise
+fall due together.
+
+`due(now)` hands out the regions to run, never one that is still in flight,
+and respects the global `concurrency` and the `quota` of runs per
+`quota_window`; `complete()` records the outcome and reschedules. `run()`
+drives that loop against the region pipeline:
+
+    python -m core.task_scheduler --manifest regions.yaml --concurrency 4 --quota 500
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+HOUR, DAY = 3600.0, 86400.0
+# Sentinel-2A/2B combined revisit at the equator; mid-latitudes see 2-3 days.
+SENTINEL2_REVISIT = 5 * DAY
+
+
+@dataclass
+class RevisitPolicy:
+    revisit: float = SENTINEL2_REVISIT
+    # A stable region is still looked at every 20 days, inside the 30-day lag of
+    # the previous comparison window, so a clearing cannot slip between runs.
+    max_revisits: int = 4
+    backoff: float = 2.0
+    variance_threshold: float = 3.0  # stdev of recent percent changes that counts as volatile
+    history: int = 4  # recent percent changes considered
+    retry_interval: float = HOUR
+    max_retry_interval: float = DAY
+    jitter: float = 0.05  # +/- fraction of the interval
+
+    def next_interval(self, state: "RegionState") -> float:
+        """Seconds until the region's next run, before jitter."""
+        if state.failures:
+            return min(self.retry_interval * 2 ** (state.failures - 1), self.max_retry_interval)
+        limit = state.max_revisits or self.max_revisits
+        changes = list(state.changes)
+        if state.last_anomaly or (len(changes) >= 2 and statistics.pstdev(changes) >= self.variance_threshold):
+            revisits = 1
+        else:
+            revisits = min(limit, max(1, math.ceil(state.revisits * self.backoff)))
+        state.revisits = revisits
+        return revisits * self.revisit
+
+
+@dataclass
+class RegionState:
+    name: str
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    max_revisits: Optional[int] = None  # per-region cap, e.g. 1 for regions that always matter
+    next_run: float = 0.0
+    revisits: int = 1
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[float] = None
+    last_anomaly: bool = False
+    last_error: Optional[str] = None
+    changes: Deque[float] = field(default_factory=lambda: deque(maxlen=4))
+
+
+class RegionScheduler:
+    def __init__(self, policy: Optional[RevisitPolicy] = None, concurrency: int = 8,
+                 quota: Optional[int] = None, quota_window: float = DAY,
+                 clock: Callable[[], float] = time.time, seed: Optional[int] = None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        if quota is not None and quota < 1:
+            raise ValueError("quota must be >= 1")
+        self.policy = policy or RevisitPolicy()
+        self.concurrency = concurrency
+        self.quota = quota
+        self.quota_window = quota_window
+        self.clock = clock
+        self._rng = random.Random(seed)
+        self._regions: Dict[str, RegionState] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._in_flight: Dict[str, float] = {}
+        self._started: Deque[float] = deque()  # run start times inside the quota window
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {"runs": 0, "anomalies": 0, "errors": 0, "deduplicated": 0, "quota_deferred": 0}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def get(self, name: str) -> Optional[RegionState]:
+        return self._regions.get(name)
+
+    def _push(self, state: RegionState, when: float):
+        state.next_run = when
+        heapq.heappush(self._heap, (when, next(self._seq), state.name))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def add(self, name: str, bbox=None, first_run: Optional[float] = None,
+            max_revisits: Optional[int] = None) -> RegionState:
+        """Register a region; it is due at `first_run` (default now). Re-adding updates bbox/cap only."""
+        state = self._regions.get(name)
+        if state is not None:
+            state.bbox, state.max_revisits = bbox, max_revisits
+            return state
+        state = self._regions[name] = RegionState(name, bbox, max_revisits)
+        state.changes = deque(maxlen=self.policy.history)
+        self._push(state, self.clock() if first_run is None else first_run)
+        return state
+
+    def remove(self, name: str) -> Optional[RegionState]:
+        # Its heap entries are skipped lazily in due().
+        return self._regions.pop(name, None)
+
+    def trigger(self, name: str):
+        """Run a region as soon as possible (e.g. after an external alert)."""
+        state = self._regions[name]
+        if name in self._in_flight:
+            self.stats["deduplicated"] += 1
+        elif state.next_run > self.clock():
+            self._push(state, self.clock())
+
+    def next_due(self) -> Optional[float]:
+        """Earliest scheduled run time (ignoring in-flight and stale entries), if any."""
+        while self._heap:
+            when, _, name = self._heap[0]
+            state = self._regions.get(name)
+            if state is not None and state.next_run == when and name not in self._in_flight:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+    def _quota_left(self, now: float) -> Optional[int]:
+        while self._started and self._started[0] <= now - self.quota_window:
+            self._started.popleft()
+        return None if self.quota is None else self.quota - len(self._started)
+
+    def due(self, now: Optional[float] = None) -> List[RegionState]:
+        """Pop the regions due by `now` that fit the free concurrency slots and quota; marks them in flight."""
+        now = self.clock() if now is None else now
+        slots = self.concurrency - len(self._in_flight)
+        quota = self._quota_left(now)
+        if quota is not None:
+            slots = min(slots, quota)
+        ready = []
+        while slots > 0 and self.next_due() is not None and self._heap[0][0] <= now:
+            _, _, name = heapq.heappop(self._heap)
+            state = self._regions[name]
+            self._in_flight[name] = now
+            self._started.append(now)
+            ready.append(state)
+            slots -= 1
+        next_due = self.next_due()
+        if quota is not None and quota <= 0 and next_due is not None and next_due <= now:
+            self.stats["quota_deferred"] += 1
+        return ready
+
+    def complete(self, name: str, result: Optional[Dict[str, Any]] = None, error: Optional[BaseException] = None,
+                 now: Optional[float] = None) -> Optional[float]:
+        """Record a finished run and schedule the next one; returns its time (None if the region was removed)."""
+        now = self.clock() if now is None else now
+        self._in_flight.pop(name, None)
+        state = self._regions.get(name)
+        if state is None:
+            return None
+        state.runs += 1
+        state.last_run = now
+        self.stats["runs"] += 1
+        if error is not None or (result is not None and "error" in result):
+            state.failures += 1
+            state.last_error = str(error if error is not None else result["error"])
+            self.stats["errors"] += 1
+        else:
+            state.failures = 0
+            state.last_error = None
+            analysis = (result or {}).get("analysis", {})
+            state.last_anomaly = bool(analysis.get("is_anomaly"))
+            self.stats["anomalies"] += state.last_anomaly
+            change = analysis.get("percent_change")
+            if isinstance(change, (int, float)) and math.isfinite(change):
+                state.changes.append(float(change))
+        interval = self.policy.next_interval(state)
+        jitter = self.policy.jitter * interval
+        when = now + interval + self._rng.uniform(-jitter, jitter)
+        self._push(state, when)
+        return when
+
+    # ---- service loop ----
+
+    async def run(self, runner: Optional[Callable[[RegionState], Awaitable[Dict[str, Any]]]] = None,
+                  stop: Optional[asyncio.Event] = None, max_sleep: float = 60.0):
+        """Run due regions with `runner` (default: the orchestrator's region pipeline) until `stop` is set."""
+        runner = runner or _pipeline_runner()
+        stop = stop or asyncio.Event()
+        self._wakeup = asyncio.Event()
+        tasks = set()
+
+        async def run_one(state: RegionState):
+            try:
+                result = await runner(state)
+            except Exception as exc:
+                self.complete(state.name, error=exc)
+            else:
+                self.complete(state.name, result)
+
+        try:
+            while not stop.is_set():
+                for state in self.due():
+                    task = asyncio.create_task(run_one(state))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    task.add_done_callback(lambda _: self._wakeup.set())
+                # Sleep until the next region is due, or (quota spent) until the
+                # oldest run leaves the quota window; completions wake us early.
+                now = self.clock()
+                wait = max_sleep
+                next_due = self.next_due()
+                quota = self._quota_left(now)
+                if quota is not None and quota <= 0:
+                    wait = min(wait, self._started[0] + self.quota_window - now)
+                elif next_due is not None and len(self._in_flight) < self.concurrency:
+                    wait = min(wait, max(0.0, next_due - now))
+                self._wakeup.clear()
+                stopper = asyncio.ensure_future(stop.wait())
+                waker = asyncio.ensure_future(self._wakeup.wait())
+                await asyncio.wait({stopper, waker}, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                stopper.cancel()
+                waker.cancel()
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._wakeup = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats, regions=len(self._regions), in_flight=len(self._in_flight),
+                    next_due=self.next_due())
+
+
+def _pipeline_runner(**kwargs) -> Callable[[RegionState], Awaitable[Dict[str, Any]]]:
+    """Runner calling agents_system.orchestrator.run_for_region (kwargs: store, outbox, stage_timeout, ...)."""
+    async def run(state: RegionState) -> Dict[str, Any]:
+        from agents_system.orchestrator import run_for_region
+        return await run_for_region(state.name, bbox=state.bbox, **kwargs)
+    return run
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", required=True, help="JSON/YAML region manifest (see agents_system.orchestrator)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--quota", type=int, default=None, help="max region runs per --quota-window")
+    parser.add_argument("--quota-window", type=float, default=DAY, help="seconds")
+    parser.add_argument("--history", action="store_true", help="fetch only the new window once a region has a baseline")
+    args = parser.parse_args()
+
+    from agents_system.orchestrator import load_region_manifest
+    try:
+        scheduler = RegionScheduler(concurrency=args.concurrency, quota=args.quota, quota_window=args.quota_window)
+    except ValueError as e:
+        parser.error(str(e))
+    for spec in load_region_manifest(args.manifest):
+        scheduler.add(spec["name"], spec["bbox"])
+    store = None
+    if args.history:
+        from agents_system.timeseries import MetricsStore
+        store = MetricsStore()
+    asyncio.run(scheduler.run(_pipeline_runner(store=store)))
@@ -1,32 +1,46 @@
 import asyncio
-import uvicorn
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-import yaml
+import os
 
-from src.api.main import app
-from src.agents.agent_manager import AgentManager
-from src.pipelines.data_pipeline import DataPipeline
+from src.api.routes import app, hub, response_cache, rollups, spatial
+
+# Agents, pipeline, storage and the server are imported where they are first
+# needed, so `import main` (the uvicorn worker's app lookup) stays cheap.
+
+CONFIG_PATH = os.environ.get(
+    'ECOVERSE_CONFIG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'agent_config.yaml')
+)
 
 # Global instances
 agent_manager = None
 data_pipeline = None
+write_buffer = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global agent_manager, data_pipeline
+    global agent_manager, data_pipeline, write_buffer
+    import yaml
+    from agents.agent_manager import AgentManager
+    from pipelines.data_pipeline import DataPipeline, FanoutSink
+    from core.storage import WriteBehindBuffer, open_storage
     
     # Load configuration
-    with open('config/config.yaml', 'r') as f:
+    with open(CONFIG_PATH, 'r') as f:
         config = yaml.safe_load(f)
     
     # Initialize components
     print("Starting EcoVerse...")
     
-    # Start data pipeline
+    # Start data pipeline, persisting through the write-behind buffer and
+    # keeping the API's rollups current
+    storage = open_storage(os.environ.get('DATABASE_URL'))
+    write_buffer = WriteBehindBuffer(storage)
+    write_buffer.start()
     data_pipeline = DataPipeline(
-        batch_size=config['data_pipeline']['batch_size']
+        batch_size=config['data_pipeline']['batch_size'],
+        sink=FanoutSink(write_buffer, rollups)
     )
     pipeline_task = asyncio.create_task(data_pipeline.start_processing())
     
@@ -34,6 +48,14 @@ async def lifespan(app: FastAPI):
     agent_manager = AgentManager(config)
     await agent_manager.initialize_agents()
     agent_tasks = await agent_manager.start_all_agents()
+    data_pipeline.attach(agent_manager.broker)
+    # Alerts are indexed before their cache entries are invalidated, by one
+    # subscriber, so a read right after an invalidation sees the new alert.
+    cache_task = response_cache.attach(agent_manager.broker, topics=('status',))
+    for region in config.get('regions', []):
+        spatial.insert(region['name'], 'region', tuple(region['bbox']), region)
+    spatial_task = spatial.attach(agent_manager.broker, on_update=response_cache.invalidate_topics)
+    hub_task = hub.attach(agent_manager.broker, spatial=spatial)
     
     print("EcoVerse system started successfully!")
     
@@ -43,8 +65,13 @@ async def lifespan(app: FastAPI):
     print("Shutting down EcoVerse...")
     await data_pipeline.stop_processing()
     await agent_manager.stop_all_agents()
+    await write_buffer.stop()
+    storage.close()
     
     pipeline_task.cancel()
+    hub_task.cancel()
+    cache_task.cancel()
+    spatial_task.cancel()
     for task in agent_tasks:
         task.cancel()
     
@@ -53,6 +80,7 @@ async def lifespan(app: FastAPI):
 app.router.lifespan_context = lifespan
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -1 +1,276 @@
-# Placeholder for ml_model.py
+"""CPU models for sensor readings, and the registry that serves them.
+
+A model is any object with a `name`, the ordered `features` it reads and
+``predict(X) -> [dict]`` taking a float32 (n, len(features)) array and
+returning one result dict per row. Per-call overhead is paid once per batch,
+so callers should send many rows at a time (see pipelines.model_pipeline).
+
+- `ZScoreAnomaly`: per-feature mean/std fitted on normal readings; the score is
+  the largest absolute z-score of a row, anomalous at `threshold`.
+- `MLPClassifier`: dense ReLU layers and a softmax head (no hidden layers is
+  logistic regression), inputs standardized with the fitted mean/scale.
+- `SklearnModel` / `OnnxModel`: adapters for fitted scikit-learn estimators
+  (joblib files) and ONNX graphs; scikit-learn/joblib and onnxruntime are
+  imported only when such a model is loaded.
+
+The native models are saved as a directory of ``meta.json`` plus one ``.npy``
+per array, and loaded with ``mmap_mode="r"``: weights are paged in from the
+OS page cache and shared by every process serving the same files. Missing
+features are NaN; both native models ignore them (an absent feature never
+raises the anomaly score, and is imputed with its mean by the classifier).
+
+`ModelRegistry` maps names to models or loaders and loads each model once,
+on first use, whichever thread or task asks first.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Measurement keys of SensingAgent readings, in model feature order.
+SENSOR_FEATURES = ("temperature", "humidity", "aqi", "pm25", "co2")
+
+
+def feature_matrix(rows: Iterable[Any], features: Sequence[str]) -> np.ndarray:
+    """float32 (n, len(features)) array from feature mappings (e.g. reading["measurements"]) or sequences;
+    missing or non-numeric values become NaN."""
+    out = []
+    for row in rows:
+        if isinstance(row, Mapping):
+            values = [row.get(name) for name in features]
+            out.append([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values])
+        else:
+            out.append(row)
+    matrix = np.asarray(out, dtype=np.float32).reshape(len(out), -1)
+    if matrix.shape[1] != len(features):
+        raise ValueError(f"expected {len(features)} features, got {matrix.shape[1]}")
+    return matrix
+
+
+def _save_arrays(path: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    os.makedirs(path, exist_ok=True)
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(dict(meta, arrays=sorted(arrays)), f, indent=2)
+
+
+def _load_arrays(path: str, mmap: bool = True):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r" if mmap else None)
+              for key in meta["arrays"]}
+    return meta, arrays
+
+
+class ZScoreAnomaly:
+    kind = "anomaly"
+
+    def __init__(self, mean, std, threshold: float = 4.0, features: Sequence[str] = SENSOR_FEATURES,
+                 name: str = "sensor-anomaly"):
+        self.mean = mean
+        self.std = std
+        self.threshold = threshold
+        self.features = tuple(features)
+        self.name = name
+
+    @classmethod
+    def fit(cls, X, threshold: float = 4.0, **kwargs) -> "ZScoreAnomaly":
+        X = np.asarray(X, dtype=np.float64)
+        std = np.nanstd(X, axis=0)
+        return cls(np.nanmean(X, axis=0).astype(np.float32), np.where(std > 0, std, 1.0).astype(np.float32),
+                   threshold, **kwargs)
+
+    def scores(self, X: np.ndarray) -> np.ndarray:
+        z = np.abs((X - self.mean) / self.std)
+        np.nan_to_num(z, copy=False, nan=0.0)
+        return z.max(axis=1) if z.shape[1] else np.zeros(len(z), dtype=np.float32)
+
+    def predict(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        scores = self.scores(X)
+        flagged = scores >= self.threshold
+        return [{"score": s, "is_anomaly": a, "threshold": self.threshold}
+                for s, a in zip(scores.tolist(), flagged.tolist())]
+
+    def save(self, path: str):
+        _save_arrays(path, {"type": "zscore", "name": self.name, "features": self.features,
+                            "threshold": self.threshold}, {"mean": self.mean, "std": self.std})
+
+    @classmethod
+    def from_arrays(cls, meta, arrays) -> "ZScoreAnomaly":
+        return cls(arrays["mean"], arrays["std"], meta["threshold"], meta["features"], meta["name"])
+
+
+class MLPClassifier:
+    kind = "classifier"
+
+    def __init__(self, weights: Sequence[np.ndarray], biases: Sequence[np.ndarray], classes: Sequence[str],
+                 mean=None, scale=None, features: Sequence[str] = SENSOR_FEATURES, name: str = "sensor-classifier"):
+        if len(weights) != len(biases) or weights[-1].shape[1] != len(classes):
+            raise ValueError("weights, biases and classes do not match")
+        self.weights = list(weights)
+        self.biases = list(biases)
+        self.classes = list(classes)
+        self.features = tuple(features)
+        self.mean = mean if mean is not None else np.zeros(len(self.features), dtype=np.float32)
+        self.scale = scale if scale is not None else np.ones(len(self.features), dtype=np.float32)
+        self.name = name
+
+    def probabilities(self, X: np.ndarray) -> np.ndarray:
+        h = (X - self.mean) / self.scale
+        np.nan_to_num(h, copy=False, nan=0.0)  # a missing feature sits at its mean
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w + b
+            if i < len(self.weights) - 1:
+                np.maximum(h, 0.0, out=h)
+        h -= h.max(axis=1, keepdims=True)
+        np.exp(h, out=h)
+        h /= h.sum(axis=1, keepdims=True)
+        return h
+
+    def predict(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        proba = self.probabilities(X)
+        best = proba.argmax(axis=1)
+        return [{"label": self.classes[k], "probability": p}
+                for k, p in zip(best.tolist(), proba[np.arange(len(best)), best].tolist())]
+
+    def save(self, path: str):
+        arrays = {"mean": self.mean, "scale": self.scale}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"w{i}"], arrays[f"b{i}"] = w, b
+        _save_arrays(path, {"type": "mlp", "name": self.name, "features": self.features,
+                            "classes": self.classes, "layers": len(self.weights)}, arrays)
+
+    @classmethod
+    def from_arrays(cls, meta, arrays) -> "MLPClassifier":
+        layers = range(meta["layers"])
+        return cls([arrays[f"w{i}"] for i in layers], [arrays[f"b{i}"] for i in layers], meta["classes"],
+                   arrays["mean"], arrays["scale"], meta["features"], meta["name"])
+
+
+class SklearnModel:
+    """A fitted scikit-learn estimator: predict_proba for classifiers, decision_function for
+    outlier detectors (IsolationForest & co.: negative = anomaly), else predict."""
+
+    def __init__(self, estimator, features: Sequence[str] = SENSOR_FEATURES, name: str = "sklearn"):
+        self.estimator = estimator
+        self.features = tuple(features)
+        self.name = name
+        self.kind = "classifier" if hasattr(estimator, "predict_proba") else "anomaly"
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "SklearnModel":
+        """Load a joblib file with its numpy arrays memory-mapped."""
+        try:
+            import joblib
+        except ImportError as exc:
+            raise RuntimeError("scikit-learn (joblib) is required for sklearn models") from exc
+        return cls(joblib.load(path, mmap_mode="r"), **kwargs)
+
+    def predict(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        X = np.nan_to_num(X)
+        if self.kind == "classifier":
+            proba = self.estimator.predict_proba(X)
+            best = proba.argmax(axis=1)
+            return [{"label": str(self.estimator.classes_[k]), "probability": float(proba[i, k])}
+                    for i, k in enumerate(best.tolist())]
+        if hasattr(self.estimator, "decision_function"):
+            scores = -np.asarray(self.estimator.decision_function(X), dtype=np.float64)
+            return [{"score": s, "is_anomaly": s > 0, "threshold": 0.0} for s in scores.tolist()]
+        return [{"label": str(y)} for y in self.estimator.predict(X).tolist()]
+
+
+class OnnxModel:
+    """An ONNX graph with one float32 (n, features) input; the first output is returned per row."""
+
+    kind = "onnx"
+
+    def __init__(self, path: str, features: Sequence[str] = SENSOR_FEATURES, name: str = "onnx",
+                 threads: int = 1):
+        try:
+            import onnxruntime
+        except ImportError as exc:
+            raise RuntimeError("onnxruntime is required for ONNX models") from exc
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input = self.session.get_inputs()[0].name
+        self.features = tuple(features)
+        self.name = name
+
+    def predict(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        output = self.session.run(None, {self.input: np.ascontiguousarray(X, dtype=np.float32)})[0]
+        return [{"output": row} for row in np.asarray(output).tolist()]
+
+
+_NATIVE = {"zscore": ZScoreAnomaly, "mlp": MLPClassifier}
+
+
+def load_model(path: str, mmap: bool = True):
+    """Load a saved native model directory (weights memory-mapped), a .joblib/.pkl estimator or an .onnx graph."""
+    if path.endswith(".onnx"):
+        return OnnxModel(path, name=os.path.splitext(os.path.basename(path))[0])
+    if path.endswith((".joblib", ".pkl")):
+        return SklearnModel.load(path, name=os.path.splitext(os.path.basename(path))[0])
+    meta, arrays = _load_arrays(path, mmap)
+    return _NATIVE[meta["type"]].from_arrays(meta, arrays)
+
+
+class ModelRegistry:
+    """Named models, each loaded once on first `get` (thread-safe)."""
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0}
+
+    def register(self, name: str, model=None, loader: Optional[Callable[[], Any]] = None):
+        """Register a loaded model, or a `loader` called on first use."""
+        if (model is None) == (loader is None):
+            raise ValueError("pass exactly one of model or loader")
+        with self._lock:
+            self._models.pop(name, None)
+            self._loaders.pop(name, None)
+            if model is not None:
+                self._models[name] = model
+            else:
+                self._loaders[name] = loader
+
+    def register_path(self, name: str, path: str):
+        self.register(name, loader=lambda: load_model(path))
+
+    def discover(self, root: str) -> List[str]:
+        """Register every model under `root` (saved directories, .joblib/.pkl, .onnx) by file name."""
+        names = []
+        for entry in sorted(os.listdir(root)):
+            path = os.path.join(root, entry)
+            name, ext = os.path.splitext(entry)
+            if os.path.isfile(os.path.join(path, "meta.json")) or ext in (".joblib", ".pkl", ".onnx"):
+                self.register_path(name, path)
+                names.append(name)
+        return names
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                if name not in self._loaders:
+                    raise KeyError(f"unknown model {name!r}")
+                model = self._models[name] = self._loaders.pop(name)()
+                self.stats["loads"] += 1
+        return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def names(self) -> List[str]:
+        return sorted(set(self._models) | set(self._loaders))
+
+
+registry = ModelRegistry()
@@ -1 +1,32 @@
-# Placeholder for vision_model.py
+"""Raster-derived model inputs: shape features of forest-loss patches.
+
+The ingestor's loss patches (see agents_system.data_ingestor.patches) are
+described by a few scale-free shape features, so any registry classifier
+built with ``features=PATCH_FEATURES`` (e.g. an `MLPClassifier` separating
+clearings from roads, rivers or cloud-edge artefacts) can score them through
+the same batched inference path as sensor readings.
+"""
+import math
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+PATCH_FEATURES = ("log_area_ha", "fill", "elongation")
+
+_M_PER_DEG = 111_320.0
+
+
+def patch_features(patches: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """float32 (n, 3) array: log10 area, share of the bbox the patch fills, bbox long/short side ratio."""
+    rows = []
+    for patch in patches:
+        minx, miny, maxx, maxy = patch["bbox"]
+        lat = math.radians((miny + maxy) / 2)
+        width = (maxx - minx) * _M_PER_DEG * math.cos(lat)
+        height = (maxy - miny) * _M_PER_DEG
+        box_ha = width * height / 10_000.0
+        area = patch["area_ha"]
+        rows.append((math.log10(max(area, 1e-3)),
+                     min(1.0, area / box_ha) if box_ha > 0 else 1.0,
+                     max(width, height) / min(width, height) if min(width, height) > 0 else 1.0))
+    return np.asarray(rows, dtype=np.float32).reshape(len(rows), len(PATCH_FEATURES))
@@ -1 +1,244 @@
-# Placeholder for data_pipeline.py
+"""Streaming sensor-data pipeline: ingest -> validate -> enrich -> persist.
+
+Records are submitted into a bounded queue (backpressure under bursts) and flow
+through a chain of async generators. Stages pass lists of records; when
+nothing arrives the ingest stage yields an empty list as a clock tick so the
+batcher can flush on time. A batch is written when it reaches `batch_size` or
+when its oldest record has waited `max_latency` seconds.
+
+`batch_size` adapts to the sink (AIMD): it grows by a step while writes finish
+under `target_write_latency` and halves when they are slower, trading
+throughput against the ingest-to-store latency of the records behind it.
+
+`stop_processing` stops intake and waits until every accepted record has been
+written (or, after `max_retries`, parked in `failed_batches`).
+"""
+import asyncio
+import inspect
+import logging
+import math
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.agents.implementations import SENSOR_TOPIC
+
+logger = logging.getLogger(__name__)
+
+# (monotonic ingest time, record)
+Item = Tuple[float, Dict[str, Any]]
+
+
+class MemorySink:
+    """Default sink: keeps the most recent `maxlen` records in memory."""
+
+    def __init__(self, maxlen: int = 10_000):
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+
+    async def write_batch(self, records: List[Dict[str, Any]]):
+        self.records.extend(records)
+
+
+class FanoutSink:
+    """Writes every batch to several sinks, in order (e.g. storage and rollups).
+
+    Sinks run on the event loop, so they should be async or cheap.
+    """
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    async def write_batch(self, records: List[Dict[str, Any]]):
+        for sink in self.sinks:
+            result = getattr(sink, "write_batch", sink)(records)
+            if inspect.isawaitable(result):
+                await result
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q / 100 * len(ordered))) - 1)]
+
+
+class DataPipeline:
+    def __init__(self, batch_size: int = 100, sink: Any = None, max_latency: float = 0.5,
+                 min_batch_size: Optional[int] = None, max_batch_size: Optional[int] = None,
+                 target_write_latency: float = 0.05, max_pending: int = 10_000,
+                 max_retries: int = 5, retry_backoff: float = 0.1):
+        """
+        sink: object with `write_batch(records)` or a callable taking the list;
+        either may be async. Blocking sinks run in a worker thread.
+        """
+        self.sink = sink if sink is not None else MemorySink()
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size or max(1, batch_size // 10)
+        self.max_batch_size = max_batch_size or batch_size * 10
+        self.max_latency = max_latency
+        self.target_write_latency = target_write_latency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.failed_batches: List[List[Dict[str, Any]]] = []
+        self.stats = {"ingested": 0, "invalid": 0, "persisted": 0, "batches": 0, "write_errors": 0, "failed": 0}
+        self._queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self._latencies: Deque[float] = deque(maxlen=10_000)
+        self._closing = False
+        self._running = False
+        self._done = asyncio.Event()
+        self._consumer: Optional[asyncio.Task] = None
+        self._detaching = False
+
+    # ---- intake ----
+
+    async def submit(self, record: Dict[str, Any]):
+        """Queue one record, waiting for room when the pipeline is saturated."""
+        if self._closing:
+            raise RuntimeError("pipeline is stopping")
+        await self._queue.put((asyncio.get_running_loop().time(), record))
+        self.stats["ingested"] += 1
+
+    def attach(self, broker, topic: str = SENSOR_TOPIC, agent_id: str = "data_pipeline") -> asyncio.Task:
+        """Feed every message published on `topic` into the pipeline."""
+        broker.subscribe(agent_id, topic)
+
+        async def consume():
+            while not self._detaching:
+                for message in await broker.receive_batch(agent_id, 500, self.max_latency):
+                    await self.submit(message.payload)
+            # Detaching: take whatever is still queued in our mailbox.
+            broker.unsubscribe(agent_id, topic)
+            while batch := await broker.receive_batch(agent_id, 500, 0):
+                for message in batch:
+                    await self.submit(message.payload)
+
+        self._consumer = asyncio.create_task(consume())
+        return self._consumer
+
+    # ---- stages ----
+
+    async def _ingest(self) -> AsyncIterator[List[Item]]:
+        poll = self.max_latency / 4
+        while not (self._closing and self._queue.empty()):
+            try:
+                async with asyncio.timeout(poll):
+                    first = await self._queue.get()
+            except TimeoutError:
+                yield []
+                continue
+            chunk = [first]
+            while len(chunk) < self.max_batch_size and not self._queue.empty():
+                chunk.append(self._queue.get_nowait())
+            yield chunk
+
+    @staticmethod
+    def _is_valid(record: Any) -> bool:
+        if not isinstance(record, dict) or not record.get("sensor_id") or not record.get("timestamp"):
+            return False
+        measurements = record.get("measurements")
+        if not isinstance(measurements, dict) or not measurements:
+            return False
+        return all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+                   for v in measurements.values())
+
+    async def _validate(self, chunks: AsyncIterator[List[Item]]) -> AsyncIterator[List[Item]]:
+        async for chunk in chunks:
+            valid = [item for item in chunk if self._is_valid(item[1])]
+            self.stats["invalid"] += len(chunk) - len(valid)
+            yield valid
+
+    async def _enrich(self, chunks: AsyncIterator[List[Item]]) -> AsyncIterator[List[Item]]:
+        async for chunk in chunks:
+            enriched = []
+            for t, record in chunk:
+                try:
+                    when = datetime.fromisoformat(str(record["timestamp"]))
+                except ValueError:
+                    self.stats["invalid"] += 1
+                    continue
+                if when.tzinfo is None:
+                    when = when.replace(tzinfo=timezone.utc)  # naive timestamps are UTC, not host-local
+                enriched.append((t, {**record, "ts": when.timestamp()}))
+            yield enriched
+
+    async def _batches(self, chunks: AsyncIterator[List[Item]]) -> AsyncIterator[List[Item]]:
+        loop = asyncio.get_running_loop()
+        buffer: List[Item] = []
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            while len(buffer) >= self.batch_size:
+                batch, buffer = buffer[:self.batch_size], buffer[self.batch_size:]
+                yield batch
+            if buffer and loop.time() - buffer[0][0] >= self.max_latency:
+                batch, buffer = buffer, []
+                yield batch
+        if buffer:
+            yield buffer
+
+    # ---- persist ----
+
+    async def _write(self, records: List[Dict[str, Any]]):
+        write: Callable = getattr(self.sink, "write_batch", self.sink)
+        if inspect.iscoroutinefunction(write):
+            await write(records)
+        else:
+            result = await asyncio.to_thread(write, records)
+            if inspect.isawaitable(result):
+                await result
+
+    def _adapt(self, write_latency: float):
+        if write_latency > self.target_write_latency:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        else:
+            self.batch_size = min(self.max_batch_size, self.batch_size + self.min_batch_size)
+
+    async def _persist(self, batch: List[Item]):
+        loop = asyncio.get_running_loop()
+        records = [record for _, record in batch]
+        for attempt in range(self.max_retries + 1):
+            started = loop.time()
+            try:
+                await self._write(records)
+                break
+            except Exception:
+                self.stats["write_errors"] += 1
+                if attempt == self.max_retries:
+                    logger.exception("dropping batch of %d records after %d attempts", len(records), attempt + 1)
+                    self.failed_batches.append(records)
+                    self.stats["failed"] += len(records)
+                    return
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        now = loop.time()
+        self._adapt(now - started)
+        self._latencies.extend(now - t for t, _ in batch)
+        self.stats["persisted"] += len(records)
+        self.stats["batches"] += 1
+
+    # ---- lifecycle ----
+
+    async def start_processing(self):
+        """Run the pipeline until `stop_processing` has drained it."""
+        self._running = True
+        self._done.clear()
+        try:
+            async for batch in self._batches(self._enrich(self._validate(self._ingest()))):
+                await self._persist(batch)
+        finally:
+            self._running = False
+            self._done.set()
+
+    async def stop_processing(self):
+        """Stop intake and wait until everything already accepted is persisted."""
+        if self._consumer is not None:
+            # Let the consumer hand over what it already took off the broker.
+            self._detaching = True
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+        self._closing = True
+        if self._running:
+            await self._done.wait()
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        return dict(self.stats, batch_size=self.batch_size, pending=self._queue.qsize(),
+                    p50_latency=_percentile(latencies, 50), p99_latency=_percentile(latencies, 99))
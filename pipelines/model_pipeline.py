@@ -1 +1,155 @@
-# Placeholder for model_pipeline.py
+"""Async model inference with dynamic request batching.
+
+Callers await ``predict(model, features)`` one row at a time, e.g. one per
+sensor reading from each AnalysisAgent. Requests for the same model queue up
+and a batcher task per model groups them. A batch is run when it reaches
+`max_batch_size`, or once no more requests are ready and it has at least
+`min_batch_size` rows, or when its oldest request has waited `max_latency`
+seconds. While a batch runs (in a worker thread, off the event loop) the next
+one fills, so under load batches grow by themselves and the per-call cost of
+the model is shared by many requests, while a lone request is not held back
+(with the default `min_batch_size` of 1). A larger `min_batch_size` trades
+up to `max_latency` of waiting for bigger batches.
+
+Models come from a `models.ml_model.ModelRegistry` and are loaded once, on
+the first request that names them.
+"""
+import asyncio
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import metrics as instrumentation
+from models.ml_model import ModelRegistry, feature_matrix, registry as default_registry
+
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# (enqueue time, feature row, future)
+Request = Tuple[float, np.ndarray, asyncio.Future]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q / 100 * len(ordered))) - 1)]
+
+
+class ModelPipeline:
+    def __init__(self, registry: Optional[ModelRegistry] = None, max_batch_size: int = 256,
+                 max_latency: float = 0.005, min_batch_size: int = 1, workers: int = 1):
+        """
+        workers: threads running model batches; each model has at most one batch
+        in flight, so more workers only help when several models are served.
+        """
+        self.registry = registry or default_registry
+        self.max_batch_size = max_batch_size
+        self.min_batch_size = min(min_batch_size, max_batch_size)
+        self.max_latency = max_latency
+        self.stats = {"requests": 0, "batches": 0, "errors": 0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._batchers: Dict[str, asyncio.Task] = {}
+        self._latencies: Deque[float] = deque(maxlen=10_000)
+        self._batch_sizes: Deque[int] = deque(maxlen=10_000)
+        self._closing = False
+
+    async def _model(self, name: str):
+        if self.registry.is_loaded(name):
+            return self.registry.get(name)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.registry.get, name)
+
+    async def predict(self, model: str, features) -> Dict[str, Any]:
+        """Result dict for one row: a feature mapping (by the model's feature names) or sequence."""
+        if self._closing:
+            raise RuntimeError("model pipeline is stopping")
+        loaded = await self._model(model)
+        row = feature_matrix([features], loaded.features)[0]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = asyncio.Queue()
+            self._batchers[model] = asyncio.create_task(self._batcher(model, loaded, queue))
+        queue.put_nowait((loop.time(), row, future))
+        self.stats["requests"] += 1
+        return await future
+
+    async def predict_many(self, model: str, rows: Sequence[Any]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.predict(model, row) for row in rows)))
+
+    async def _batcher(self, name: str, model, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Request] = [await queue.get()]
+            deadline = batch[0][0] + self.max_latency
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                if len(batch) >= self.min_batch_size:
+                    await asyncio.sleep(0)  # let callers that are already runnable enqueue
+                    if queue.empty():
+                        break
+                    continue
+                wait = deadline - loop.time()
+                if wait <= 0:
+                    break
+                try:
+                    async with asyncio.timeout(wait):
+                        batch.append(await queue.get())
+                except TimeoutError:
+                    break
+            await self._run(name, model, batch)
+            for _ in batch:
+                queue.task_done()
+
+    def _infer(self, name: str, model, X: np.ndarray) -> List[Dict[str, Any]]:
+        with instrumentation.span("model_inference", model=name):
+            return model.predict(X)
+
+    async def _run(self, name: str, model, batch: List[Request]):
+        loop = asyncio.get_running_loop()
+        X = np.stack([row for _, row, _ in batch])
+        try:
+            results = await loop.run_in_executor(self._executor, self._infer, name, model, X)
+            if len(results) != len(batch):
+                raise RuntimeError(f"model {name!r} returned {len(results)} results for {len(batch)} rows")
+        except Exception as exc:
+            self.stats["errors"] += len(batch)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        now = loop.time()
+        for (started, _, future), result in zip(batch, results):
+            if not future.done():  # the caller may have been cancelled
+                future.set_result(result)
+            self._latencies.append(now - started)
+        self.stats["batches"] += 1
+        self._batch_sizes.append(len(batch))
+        instrumentation.histogram("inference_batch_size", "Rows per model batch",
+                                  buckets=BATCH_BUCKETS).observe(len(batch), model=name)
+
+    async def stop(self):
+        """Stop intake, finish every queued request, then stop the batchers."""
+        self._closing = True
+        for queue in self._queues.values():
+            await queue.join()
+        for task in self._batchers.values():
+            task.cancel()
+        await asyncio.gather(*self._batchers.values(), return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        sizes = list(self._batch_sizes)
+        return dict(self.stats, models=sorted(self._queues),
+                    pending=sum(q.qsize() for q in self._queues.values()),
+                    mean_batch_size=sum(sizes) / len(sizes) if sizes else None,
+                    p50_latency=_percentile(latencies, 50), p99_latency=_percentile(latencies, 99))
+
@@ -0,0 +1,194 @@
+"""EcoVerse agents: sensing -> analysis -> alert, plus coordination.
+
+Agents talk only through the MessageBroker. Sensing agents publish readings on
+the SENSOR_TOPIC topic, the analysis agent publishes threshold breaches on
+ALERT_TOPIC, and every agent answers on its own mailbox.
+"""
+import asyncio
+import logging
+import random
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.core.agent_communication import Message, MessageBroker, MessagePriority, MessageType
+
+logger = logging.getLogger(__name__)
+
+SENSOR_TOPIC = "sensor_data"
+ALERT_TOPIC = "alerts"
+STATUS_TOPIC = "status"
+
+# Readings at or above these values raise an alert.
+THRESHOLDS = {"temperature": 40.0, "aqi": 150.0, "pm25": 55.0, "co2": 1000.0}
+
+
+class BaseAgent:
+    def __init__(self, agent_id: str, broker: MessageBroker):
+        self.agent_id = agent_id
+        self.broker = broker
+        self.running = False
+        self.stats = {"messages_sent": 0, "messages_received": 0, "errors": 0}
+        broker.register_agent(agent_id)
+
+    async def start(self):
+        self.running = True
+        try:
+            await self.run()
+        finally:
+            self.running = False
+
+    async def stop(self):
+        self.running = False
+
+    async def run(self):
+        raise NotImplementedError
+
+    def message(self, receiver: str, type: MessageType, payload: Dict[str, Any],
+                priority: MessagePriority = MessagePriority.NORMAL) -> Message:
+        return Message.create(self.agent_id, receiver, type, payload, priority)
+
+    async def publish(self, topic: str, type: MessageType, payload: Dict[str, Any],
+                      priority: MessagePriority = MessagePriority.NORMAL) -> int:
+        delivered = await self.broker.publish(topic, self.message("", type, payload, priority))
+        self.stats["messages_sent"] += 1
+        return delivered
+
+    async def receive(self, max_messages: int = 100, timeout: float = 1.0) -> List[Message]:
+        batch = await self.broker.receive_batch(self.agent_id, max_messages, timeout)
+        self.stats["messages_received"] += len(batch)
+        return batch
+
+
+class SensingAgent(BaseAgent):
+    """Reads its sensors every `interval` seconds and publishes the readings."""
+
+    def __init__(self, agent_id: str, broker: MessageBroker, sensor_ids: List[str], interval: float = 1.0,
+                 locations: Optional[Dict[str, Tuple[float, float]]] = None):
+        super().__init__(agent_id, broker)
+        self.sensor_ids = list(sensor_ids)
+        self.interval = interval
+        self.locations = locations or {}  # sensor_id -> (lon, lat)
+        self._next_sensor = 0
+
+    async def collect_data(self, sensor_id: Optional[str] = None) -> Dict[str, Any]:
+        """One reading from `sensor_id` (round-robin over this agent's sensors by default).
+
+        Readings are simulated until real sensor drivers are wired in.
+        """
+        if sensor_id is None:
+            sensor_id = self.sensor_ids[self._next_sensor % len(self.sensor_ids)]
+            self._next_sensor += 1
+        reading = {
+            "timestamp": datetime.now().isoformat(),
+            "sensor_id": sensor_id,
+            "agent_id": self.agent_id,
+            "measurements": {
+                "temperature": round(random.gauss(25.0, 5.0), 2),
+                "humidity": round(random.uniform(30.0, 90.0), 1),
+                "aqi": round(random.gauss(60.0, 25.0), 1),
+                "pm25": round(abs(random.gauss(20.0, 12.0)), 1),
+                "co2": round(random.gauss(415.0, 30.0), 1),
+            },
+        }
+        if sensor_id in self.locations:
+            lon, lat = self.locations[sensor_id]
+            reading["location"] = {"lon": lon, "lat": lat}
+        return reading
+
+    async def run(self):
+        while self.running:
+            for sensor_id in self.sensor_ids:
+                data = await self.collect_data(sensor_id)
+                await self.publish(SENSOR_TOPIC, MessageType.DATA, data)
+            await asyncio.sleep(self.interval)
+
+
+class AnalysisAgent(BaseAgent):
+    """Checks incoming readings against THRESHOLDS and publishes alerts.
+
+    With an inference `engine` (pipelines.model_pipeline.ModelPipeline) every
+    reading is also scored by the anomaly `model`; the engine batches the
+    requests of all agents sharing it. Flagged readings raise a
+    "model:<name>" alert. Readings the model fails on are counted in
+    stats["errors"] and skipped; threshold alerts are published regardless.
+    """
+
+    def __init__(self, agent_id: str, broker: MessageBroker, thresholds: Optional[Dict[str, float]] = None,
+                 engine=None, model: str = "sensor-anomaly"):
+        super().__init__(agent_id, broker)
+        self.thresholds = thresholds or THRESHOLDS
+        self.engine = engine
+        self.model = model
+        broker.subscribe(agent_id, SENSOR_TOPIC)
+
+    def analyze(self, reading: Dict[str, Any]) -> List[Dict[str, Any]]:
+        breaches = []
+        for metric, limit in self.thresholds.items():
+            value = reading.get("measurements", {}).get(metric)
+            if value is not None and value >= limit:
+                breach = {"sensor_id": reading.get("sensor_id"), "metric": metric, "value": value,
+                          "threshold": limit, "timestamp": reading.get("timestamp")}
+                if "location" in reading:
+                    breach["location"] = reading["location"]
+                breaches.append(breach)
+        return breaches
+
+    async def score(self, readings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Model alerts for `readings`, scored concurrently through the inference engine."""
+        results = await asyncio.gather(*(self.engine.predict(self.model, r.get("measurements", {}))
+                                         for r in readings), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            self.stats["errors"] += len(failed)
+            logger.warning("model %r failed on %d of %d readings: %r", self.model, len(failed), len(readings),
+                           failed[0])
+        alerts = []
+        for reading, result in zip(readings, results):
+            if not isinstance(result, Exception) and result.get("is_anomaly"):
+                alert = {"sensor_id": reading.get("sensor_id"), "metric": f"model:{self.model}",
+                         "value": result.get("score"), "threshold": result.get("threshold"),
+                         "timestamp": reading.get("timestamp")}
+                if "location" in reading:
+                    alert["location"] = reading["location"]
+                alerts.append(alert)
+        return alerts
+
+    async def run(self):
+        while self.running:
+            readings = [m.payload for m in await self.receive(timeout=0.5) if m.type == MessageType.DATA]
+            breaches = [breach for reading in readings for breach in self.analyze(reading)]
+            if self.engine is not None and readings:
+                breaches += await self.score(readings)
+            for breach in breaches:
+                await self.publish(ALERT_TOPIC, MessageType.ALERT, breach, MessagePriority.HIGH)
+
+
+class AlertAgent(BaseAgent):
+    """Keeps the most recent alerts for the API/dashboard."""
+
+    def __init__(self, agent_id: str, broker: MessageBroker, history: int = 1000):
+        super().__init__(agent_id, broker)
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=history)
+        broker.subscribe(agent_id, ALERT_TOPIC)
+
+    async def run(self):
+        while self.running:
+            for message in await self.receive(timeout=0.5):
+                if message.type == MessageType.ALERT:
+                    self.alerts.append(message.payload)
+
+
+class CoordinationAgent(BaseAgent):
+    """Periodically publishes a system status snapshot built from broker metrics."""
+
+    def __init__(self, agent_id: str, broker: MessageBroker, interval: float = 5.0):
+        super().__init__(agent_id, broker)
+        self.interval = interval
+        self.last_status: Dict[str, Any] = {}
+
+    async def run(self):
+        while self.running:
+            await self.receive(timeout=self.interval)
+            self.last_status = {"timestamp": datetime.now().isoformat(), **self.broker.get_metrics()["totals"]}
+            await self.publish(STATUS_TOPIC, MessageType.STATUS, self.last_status, MessagePriority.LOW)
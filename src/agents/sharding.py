@@ -0,0 +1,181 @@
+"""Sensing agents sharded across worker processes.
+
+Each shard is a process with its own event loop and a local MessageBroker. Its
+SensingAgents publish to that local broker exactly as they would in-process;
+an uplink mailbox subscribed to SENSOR_TOPIC collects the readings and ships
+them to the parent in batches over the shard's multiprocessing queue. In the
+parent, `ShardedSensing` pumps those batches into the central broker, so
+AnalysisAgent and friends see the same topic traffic either way.
+
+The supervisor restarts shards that die (up to `max_restarts` each). A
+restarted shard gets a fresh queue: a killed writer can leave the old one's
+lock held.
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+from typing import Any, Dict, List, Optional
+
+from src.core.agent_communication import MessageBroker
+from src.agents.implementations import SENSOR_TOPIC, SensingAgent
+
+logger = logging.getLogger(__name__)
+
+UPLINK = "__uplink__"
+
+
+def partition(items: List[Any], parts: int) -> List[List[Any]]:
+    """Round-robin split into at most `parts` non-empty lists."""
+    return [chunk for chunk in (items[i::parts] for i in range(max(1, parts))) if chunk]
+
+
+# ======== WORKER PROCESS ========
+
+async def _run_shard(shard_id: int, sensor_ids: List[str], agents_per_shard: int, uplink, stop_event,
+                     batch_size: int, flush_interval: float, interval: float, locations: Dict[str, Any]):
+    broker = MessageBroker()
+    broker.subscribe(UPLINK, SENSOR_TOPIC)
+    agents = [SensingAgent(f"sensing_shard{shard_id}_{i}", broker, part, interval, locations)
+              for i, part in enumerate(partition(sensor_ids, agents_per_shard))]
+    tasks = [asyncio.create_task(agent.start()) for agent in agents]
+    loop = asyncio.get_running_loop()
+    try:
+        while not stop_event.is_set():
+            batch = await broker.receive_batch(UPLINK, batch_size, flush_interval)
+            if batch:
+                # Queue.put can block when the parent falls behind; keep the loop free.
+                await loop.run_in_executor(None, uplink.put, batch)
+    finally:
+        for agent in agents:
+            await agent.stop()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        leftover = await broker.receive_batch(UPLINK, broker.max_queue_size, 0)
+        if leftover:
+            uplink.put(leftover)
+
+
+def _shard_main(shard_id: int, sensor_ids: List[str], agents_per_shard: int, uplink, stop_event,
+                batch_size: int, flush_interval: float, interval: float, locations: Dict[str, Any]):
+    try:
+        asyncio.run(_run_shard(shard_id, sensor_ids, agents_per_shard, uplink, stop_event,
+                               batch_size, flush_interval, interval, locations))
+    except KeyboardInterrupt:
+        pass
+
+
+# ======== PARENT SIDE ========
+
+class ShardedSensing:
+    """Runs `shards` sensing worker processes and forwards their readings to `broker`."""
+
+    def __init__(self, broker: MessageBroker, sensor_ids: List[str], shards: int, agents_per_shard: int = 1,
+                 interval: float = 1.0, batch_size: int = 256, flush_interval: float = 0.05,
+                 queue_size: int = 1024, max_restarts: int = 5, supervise_interval: float = 1.0,
+                 start_method: str = "spawn", locations: Optional[Dict[str, Any]] = None):
+        self.broker = broker
+        self.assignments = partition(list(sensor_ids), shards)
+        self.locations = locations or {}
+        self.agents_per_shard = agents_per_shard
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.max_restarts = max_restarts
+        self.supervise_interval = supervise_interval
+        self._ctx = mp.get_context(start_method)
+        self._uplinks: List[Any] = [None] * len(self.assignments)
+        self._stop_event = None
+        self._processes: List[Optional[mp.process.BaseProcess]] = [None] * len(self.assignments)
+        self._restarts = [0] * len(self.assignments)
+        self._tasks: List[asyncio.Task] = []
+        self._pumping = False
+        self.forwarded = 0
+
+    def _spawn(self, shard_id: int):
+        self._uplinks[shard_id] = self._ctx.Queue(self.queue_size)
+        process = self._ctx.Process(
+            target=_shard_main, name=f"sensing-shard-{shard_id}", daemon=True,
+            args=(shard_id, self.assignments[shard_id], self.agents_per_shard, self._uplinks[shard_id], self._stop_event,
+                  self.batch_size, self.flush_interval, self.interval,
+                  {s: self.locations[s] for s in self.assignments[shard_id] if s in self.locations}),
+        )
+        process.start()
+        self._processes[shard_id] = process
+
+    async def start(self) -> List[asyncio.Task]:
+        self._stop_event = self._ctx.Event()
+        self._pumping = True
+        for shard_id in range(len(self.assignments)):
+            self._spawn(shard_id)
+        self._tasks = [asyncio.create_task(self._pump(i)) for i in range(len(self.assignments))]
+        self._tasks.append(asyncio.create_task(self._supervise()))
+        return self._tasks
+
+    @staticmethod
+    def _get(uplink, timeout: float):
+        try:
+            return uplink.get(timeout=timeout)
+        except (queue.Empty, EOFError, OSError, ValueError):
+            return None
+
+    async def _forward(self, batch):
+        for message in batch:
+            await self.broker.publish(message.topic or SENSOR_TOPIC, message)
+        self.forwarded += len(batch)
+
+    async def _pump(self, shard_id: int):
+        while self._pumping:
+            batch = await asyncio.to_thread(self._get, self._uplinks[shard_id], 0.2)
+            if batch:
+                await self._forward(batch)
+
+    async def _supervise(self):
+        while not self._stop_event.is_set():
+            await asyncio.sleep(self.supervise_interval)
+            for shard_id, process in enumerate(self._processes):
+                if process is None or process.is_alive() or self._stop_event.is_set():
+                    continue
+                if self._restarts[shard_id] >= self.max_restarts:
+                    if process.exitcode is not None:
+                        logger.error("sensing shard %d exited (%s); restart limit reached", shard_id, process.exitcode)
+                        self._processes[shard_id] = None
+                    continue
+                self._restarts[shard_id] += 1
+                logger.warning("sensing shard %d exited (%s); restarting", shard_id, process.exitcode)
+                self._spawn(shard_id)
+
+    async def stop(self, timeout: float = 5.0):
+        """Ask shards to flush and exit, forward what they sent, then shut down."""
+        if self._stop_event is None:
+            return
+        self._stop_event.set()
+        # Keep pumping while the shards exit: a worker cannot finish until its
+        # queued batches have been read.
+        for process in self._processes:
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+                await asyncio.to_thread(process.join, 1.0)
+        self._pumping = False
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for uplink in self._uplinks:
+            while (batch := self._get(uplink, 0.05)) is not None:
+                await self._forward(batch)
+            uplink.close()
+        self._tasks = []
+        self._stop_event = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "shards": [
+                {"shard": i, "sensors": len(sensors), "alive": bool(p and p.is_alive()),
+                 "pid": p.pid if p else None, "restarts": self._restarts[i]}
+                for i, (sensors, p) in enumerate(zip(self.assignments, self._processes))
+            ],
+            "forwarded": self.forwarded,
+        }
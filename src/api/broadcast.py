@@ -0,0 +1,146 @@
+"""Fan-out hub for the /ws endpoint.
+
+Agents (via `attach`) or any other producer call `publish` once per update.
+The hub wraps it in the envelope the dashboard expects and serializes it once;
+the same encoded text is queued for every matching subscription. Each
+WebSocket connection owns a bounded queue and its own sender task, so a slow
+client only ever loses its own oldest updates and never delays the others.
+
+Subscriptions can be limited to topics and/or regions; a region filter only
+passes updates tagged with one of those regions. `attach` tags broker
+traffic with the regions of the payload: its "regions"/"region" fields, or,
+given a `core.spatial.SpatialIndex`, the regions containing its location (as
+SensingAgent readings and AnalysisAgent alerts carry).
+"""
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Union
+
+from core.spatial import location_of
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:  # optional speedup
+    import json
+
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=str, separators=(",", ":"))
+
+# Broker topic -> message type the dashboard switches on
+MESSAGE_TYPES = {"sensor_data": "environmental_update", "alerts": "alert", "status": "agent_status"}
+
+
+def regions_of(payload: Any, spatial=None) -> List[str]:
+    """Region names of an update: its "regions" tag or "region" field, else the `spatial`
+    index regions containing its location."""
+    if not isinstance(payload, dict):
+        return []
+    if payload.get("regions"):
+        return list(payload["regions"])
+    if payload.get("region"):
+        return [payload["region"]]
+    location = location_of(payload)
+    if spatial is None or location is None:
+        return []
+    return [e.id for e in spatial.containing(location[0], location[1])]
+
+
+class Subscription:
+    def __init__(self, topics: Optional[Set[str]] = None, regions: Optional[Set[str]] = None, max_queue: int = 256):
+        self.topics = topics or None
+        self.regions = regions or None
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[str] = deque()
+        self._ready = asyncio.Event()
+
+    def matches(self, topic: str, regions: Iterable[str] = ()) -> bool:
+        return (self.topics is None or topic in self.topics) and (
+            self.regions is None or not self.regions.isdisjoint(regions))
+
+    def offer(self, payload: str):
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(payload)
+        self._ready.set()
+
+    async def get(self) -> Optional[str]:
+        """Next encoded update, or None once the subscription is closed."""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class BroadcastHub:
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._by_topic: Dict[str, Set[Subscription]] = {}
+        self._all_topics: Set[Subscription] = set()
+        self.stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, regions: Optional[Iterable[str]] = None,
+                  max_queue: Optional[int] = None) -> Subscription:
+        subscription = Subscription(set(topics or ()), set(regions or ()), max_queue or self.max_queue)
+        if subscription.topics is None:
+            self._all_topics.add(subscription)
+        else:
+            for topic in subscription.topics:
+                self._by_topic.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        self._all_topics.discard(subscription)
+        for topic in subscription.topics or ():
+            self._by_topic.get(topic, set()).discard(subscription)
+
+    def publish(self, topic: str, data: Any, regions: Union[str, Iterable[str], None] = None) -> int:
+        """Encode one update tagged with `regions` (one name or several) and queue it for every
+        matching subscriber; returns the fan-out."""
+        regions = [regions] if isinstance(regions, str) else list(regions or ())
+        payload = _dumps({"type": MESSAGE_TYPES.get(topic, topic), "topic": topic, "regions": regions,
+                          "data": data, "timestamp": datetime.now().isoformat()})
+        delivered = 0
+        for group in (self._all_topics, self._by_topic.get(topic, ())):
+            for subscription in group:
+                if subscription.regions is None or not subscription.regions.isdisjoint(regions):
+                    subscription.offer(payload)
+                    delivered += 1
+        self.stats["published"] += 1
+        self.stats["delivered"] += delivered
+        return delivered
+
+    def attach(self, broker, topics: Iterable[str] = tuple(MESSAGE_TYPES), agent_id: str = "ws_hub",
+               spatial=None) -> asyncio.Task:
+        """Re-publish broker topic traffic (sensor data, alerts, status) to WebSocket clients,
+        tagged with `regions_of` each payload."""
+        for topic in topics:
+            broker.subscribe(agent_id, topic)
+
+        async def pump():
+            while True:
+                for message in await broker.receive_batch(agent_id, 500, None):
+                    self.publish(message.topic, message.payload, regions_of(message.payload, spatial))
+
+        return asyncio.create_task(pump())
+
+    def metrics(self) -> Dict[str, Any]:
+        subscriptions = self._all_topics.union(*self._by_topic.values())
+        return dict(self.stats, subscribers=len(subscriptions),
+                    queued=sum(len(s) for s in subscriptions), dropped=sum(s.dropped for s in subscriptions))
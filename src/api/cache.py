@@ -0,0 +1,142 @@
+"""Response cache for the read-only dashboard endpoints.
+
+A route hands `ResponseCache.respond` its request and a builder. The first
+request for a path + query builds the data, serializes it once (orjson when
+available), gzips it if it is worth it and computes an ETag. Until the entry
+expires or one of its tags is invalidated, later requests are answered from
+those bytes: 304 when If-None-Match matches, otherwise the gzip or plain body.
+Concurrent misses for the same key share one build.
+
+`attach(broker)` invalidates by tag when agents publish on the alert or
+status topics, so the TTL is only a backstop. Data that a subscriber first
+has to index (alerts, see `SpatialIndex.attach`) should be invalidated by that
+subscriber through `invalidate_topics` once indexed, not here.
+"""
+import asyncio
+import gzip
+import hashlib
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str)
+except ImportError:  # optional speedup
+    import json
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+GZIP_MIN_BYTES = 512
+
+# Broker topic -> cache tag it invalidates
+TOPIC_TAGS = {"alerts": "alerts", "status": "agents"}
+
+
+@dataclass
+class CachedBody:
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    expires: float
+    tags: Tuple[str, ...]
+
+
+class ResponseCache:
+    def __init__(self, default_ttl: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries: Dict[str, CachedBody] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self._generation = 0  # bumped by invalidate(); builds that straddle one aren't stored
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(request: Request) -> str:
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def _encode(self, data: Any, ttl: float, tags: Tuple[str, ...]) -> CachedBody:
+        body = _dumps(data)
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        return CachedBody(body, gzipped, etag, self.clock() + ttl, tags)
+
+    async def _get_or_build(self, key: str, build: Callable[[], Any], ttl: float, tags: Tuple[str, ...]) -> CachedBody:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > self.clock():
+            self.stats["hits"] += 1
+            return entry
+        pending = self._building.get(key)
+        if pending is not None:
+            self.stats["hits"] += 1
+            return await asyncio.shield(pending)
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._building[key] = future
+        generation = self._generation
+        try:
+            data = build()
+            if inspect.isawaitable(data):
+                data = await data
+            entry = self._encode(data, ttl, tags)
+            if generation == self._generation:
+                self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved here so waiters-less failures aren't logged
+            raise
+        finally:
+            del self._building[key]
+
+    async def respond(self, request: Request, build: Callable[[], Any], tags: Iterable[str] = (),
+                      ttl: Optional[float] = None) -> Response:
+        entry = await self._get_or_build(self.key(request), build, self.default_ttl if ttl is None else ttl,
+                                         tuple(tags))
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if entry.etag in request.headers.get("if-none-match", ""):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        if entry.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.gzipped, media_type="application/json", headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, tag: Optional[str] = None):
+        """Drop entries carrying `tag` (all entries when tag is None)."""
+        stale = [k for k, e in self._entries.items() if tag is None or tag in e.tags]
+        for key in stale:
+            del self._entries[key]
+        self._generation += 1
+        self.stats["invalidations"] += len(stale)
+
+    def invalidate_topics(self, topics: Iterable[str]):
+        """Invalidate the tags of the broker `topics` (see TOPIC_TAGS)."""
+        for topic in set(topics):
+            if topic in TOPIC_TAGS:
+                self.invalidate(TOPIC_TAGS[topic])
+
+    def attach(self, broker, agent_id: str = "response_cache",
+               topics: Iterable[str] = tuple(TOPIC_TAGS)) -> asyncio.Task:
+        """Invalidate alert/agent entries whenever agents publish on `topics`."""
+        for topic in topics:
+            broker.subscribe(agent_id, topic)
+
+        async def listen():
+            while True:
+                self.invalidate_topics(m.topic for m in await broker.receive_batch(agent_id, 1000, None))
+
+        return asyncio.create_task(listen())
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return dict(self.stats, entries=len(self._entries),
+                    hit_ratio=round(self.stats["hits"] / lookups, 4) if lookups else None)
@@ -1,11 +1,35 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import json
+import time
+
+from core import metrics
+from core.rollups import RESOLUTION_LABELS, RollupEngine, parse_range
+from core.spatial import ALERT, REGION, SENSOR, SpatialIndex, parse_bbox
+from src.api.broadcast import BroadcastHub
+from src.api.cache import ResponseCache
 
 app = FastAPI(title="EcoVerse API")
 
+# Fed by the data pipeline (see main.py); answers range queries from rollups
+rollups = RollupEngine()
+
+# Real-time updates for /ws; agents publish into it (see main.py)
+hub = BroadcastHub()
+
+# Regions, sensor positions and recent alerts for bbox filters (see main.py)
+spatial = SpatialIndex()
+
+# Polled read-only endpoints; invalidated by agent/alert events (see main.py)
+response_cache = ResponseCache(default_ttl=5.0)
+
+# Rollup metric -> key used by the dashboard
+METRIC_KEYS = {"temperature": "temp", "humidity": "humidity", "aqi": "aqi", "co2": "co2"}
+MAX_POINTS = 5000
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -16,22 +40,35 @@ app.add_middleware(
 )
 
 @app.get("/api/v1/environmental-data")
-async def get_environmental_data(range: str = "24h"):
-    """Get environmental data for specified time range"""
-    # TODO: Connect to your database/agents
-    # This is a placeholder - replace with actual data fetching
+async def get_environmental_data(range: str = "24h", sensor_id: Optional[str] = None, max_points: int = 500,
+                                 bbox: Optional[str] = None):
+    """Get environmental data for specified time range (e.g. 1h, 24h, 7d, 30d),
+    optionally only from sensors inside bbox=min_lon,min_lat,max_lon,max_lat"""
+    try:
+        span = parse_range(range)
+        area = parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    sensor_ids = [e.id for e in spatial.query(area, SENSOR)] if area else None
+    end = time.time()
+    result = rollups.query(list(METRIC_KEYS), end - span, end, sensor_id, max(3, min(max_points, MAX_POINTS)),
+                           sensor_ids=sensor_ids)
+    data = [
+        {
+            "time": datetime.fromtimestamp(point["t"]).isoformat(),
+            **{key: round(point[metric]["mean"], 2) if point[metric] else None
+               for metric, key in METRIC_KEYS.items()},
+        }
+        for point in result["points"]
+    ]
     return {
-        "data": [
-            {"time": "00:00", "temp": 22, "humidity": 65, "aqi": 45, "co2": 410},
-            # ... more data points
-        ],
+        "data": data,
         "range": range,
+        "resolution": RESOLUTION_LABELS[result["resolution"]],
         "timestamp": datetime.now().isoformat()
     }
 
-@app.get("/api/v1/agents/status")
-async def get_agent_status():
-    """Get status of all agents"""
+def _agent_status():
     # TODO: Query your agent orchestrator
     return {
         "agents": [
@@ -42,27 +79,31 @@ async def get_agent_status():
         ]
     }
 
+@app.get("/api/v1/agents/status")
+async def get_agent_status(request: Request):
+    """Get status of all agents"""
+    return await response_cache.respond(request, _agent_status, tags=("agents",))
+
+def _alerts(limit: int):
+    return {"alerts": spatial.recent_alerts(limit), "total": spatial.alert_count}
+
+def _alerts_in(area, limit: int):
+    alerts = sorted((e.data for e in spatial.query(area, ALERT)),
+                    key=lambda a: a.get("timestamp") or "", reverse=True)
+    return {"alerts": alerts[:limit], "total": len(alerts)}
+
 @app.get("/api/v1/alerts")
-async def get_alerts(limit: int = 10):
-    """Get recent alerts"""
-    # TODO: Query your alert agent/database
-    return {
-        "alerts": [
-            {
-                "id": 1,
-                "type": "warning",
-                "message": "High PM2.5 detected in Zone A",
-                "location": "Mumbai",
-                "time": "2 min ago",
-                "severity": "high"
-            }
-        ],
-        "total": 1
-    }
+async def get_alerts(request: Request, limit: int = 10, bbox: Optional[str] = None):
+    """Get recent alerts, optionally only inside bbox=min_lon,min_lat,max_lon,max_lat"""
+    if bbox:
+        try:
+            area = parse_bbox(bbox)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await response_cache.respond(request, lambda: _alerts_in(area, limit), tags=("alerts",))
+    return await response_cache.respond(request, lambda: _alerts(limit), tags=("alerts",))
 
-@app.get("/api/v1/pollution/distribution")
-async def get_pollution_distribution():
-    """Get pollution type distribution"""
+def _pollution_distribution():
     return {
         "distribution": [
             {"name": "CO2", "value": 42, "color": "#10b981"},
@@ -72,25 +113,65 @@ async def get_pollution_distribution():
         ]
     }
 
+@app.get("/api/v1/pollution/distribution")
+async def get_pollution_distribution(request: Request):
+    """Get pollution type distribution"""
+    return await response_cache.respond(request, _pollution_distribution, tags=("pollution",), ttl=60.0)
+
+@app.get("/api/v1/regions")
+async def get_regions(bbox: Optional[str] = None, lon: Optional[float] = None, lat: Optional[float] = None):
+    """Monitored regions intersecting bbox, or containing the point lon/lat"""
+    try:
+        if lon is not None and lat is not None:
+            found = spatial.containing(lon, lat, REGION)
+        else:
+            found = spatial.query(parse_bbox(bbox) if bbox else (-180.0, -90.0, 180.0, 90.0), REGION)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"regions": [{"name": e.id, "bbox": list(e.bbox)} for e in found]}
+
+@app.get("/api/v1/cache/metrics")
+async def get_cache_metrics():
+    """Response cache hit/miss/304 counters"""
+    return response_cache.metrics()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint: pipeline stage timings plus API component gauges"""
+    components = {"response_cache": response_cache.metrics(), "broadcast": hub.metrics(),
+                  "rollups": {"ingested": rollups.ingested}, "spatial": {"entities": len(spatial)}}
+    gauge = metrics.gauge("api_component_stat", "Counters and sizes reported by API components")
+    for component, stats in components.items():
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauge.set(value, component=component, stat=stat)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def _csv_param(value: Optional[str]):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
+async def websocket_endpoint(websocket: WebSocket, topics: Optional[str] = None, regions: Optional[str] = None):
+    """WebSocket endpoint for real-time updates (?topics=alerts,status&regions=Mumbai)"""
     await websocket.accept()
+    subscription = hub.subscribe(_csv_param(topics), _csv_param(regions))
+
+    async def watch_disconnect():
+        # Drain client frames so a close is noticed even while no updates flow
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
     try:
-        while True:
-            # TODO: Stream real-time data from your agents
-            data = {
-                "type": "environmental_update",
-                "data": {
-                    "temp": 25,
-                    "humidity": 60,
-                    "aqi": 50,
-                    "timestamp": datetime.now().isoformat()
-                }
-            }
-            await websocket.send_json(data)
-            await asyncio.sleep(5)  # Send updates every 5 seconds
+        while (payload := await subscription.get()) is not None:
+            await websocket.send_text(payload)
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        await websocket.close()
+        hub.unsubscribe(subscription)
+        watcher.cancel()
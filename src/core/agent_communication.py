@@ -0,0 +1,265 @@
+"""In-process message broker for the EcoVerse agents.
+
+Every registered agent owns a bounded mailbox. Messages are delivered highest
+`MessagePriority` first and FIFO within a priority. When a mailbox is full,
+`send_message` applies backpressure (waits for room, up to `send_timeout`) or
+sheds load according to the broker's overflow policy; every drop is counted.
+Senders and receivers can move messages in batches, and topics fan one
+published message out to all subscribers.
+"""
+import asyncio
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from enum import Enum, IntEnum
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+
+class MessageType(Enum):
+    DATA = "data"
+    ANALYSIS = "analysis"
+    ALERT = "alert"
+    COMMAND = "command"
+    STATUS = "status"
+    HEARTBEAT = "heartbeat"
+
+
+class MessagePriority(IntEnum):
+    """Higher value = delivered first."""
+    LOW = 1
+    NORMAL = 2
+    HIGH = 3
+    CRITICAL = 4
+
+
+@dataclass
+class Message:
+    id: str
+    sender: str
+    receiver: str
+    type: MessageType
+    priority: MessagePriority = MessagePriority.NORMAL
+    payload: Dict[str, Any] = field(default_factory=dict)
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    topic: Optional[str] = None
+
+    @classmethod
+    def create(cls, sender: str, receiver: str, type: MessageType, payload: Dict[str, Any],
+               priority: MessagePriority = MessagePriority.NORMAL, topic: Optional[str] = None) -> "Message":
+        return cls(id=uuid.uuid4().hex, sender=sender, receiver=receiver, type=type,
+                   priority=priority, payload=payload, topic=topic)
+
+
+# Overflow policies for a full mailbox.
+BLOCK = "block"              # wait for room (backpressure), fail after send_timeout
+DROP_NEW = "drop_new"        # reject the incoming message
+DROP_OLDEST = "drop_oldest"  # evict the oldest message of the lowest queued priority
+
+_PRIORITIES = sorted(MessagePriority, reverse=True)
+
+
+class Mailbox:
+    """Bounded multi-priority queue with asyncio waiters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._queues: Dict[MessagePriority, Deque[Message]] = {p: deque() for p in _PRIORITIES}
+        self._size = 0
+        self._getters: Deque[asyncio.Future] = deque()
+        self._putters: Deque[asyncio.Future] = deque()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self.maxsize
+
+    @staticmethod
+    def _wake(waiters: Deque[asyncio.Future]):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def put_nowait(self, message: Message):
+        self._queues[message.priority].append(message)
+        self._size += 1
+        self._wake(self._getters)
+
+    def drop_oldest(self) -> Optional[Message]:
+        for priority in reversed(_PRIORITIES):
+            if self._queues[priority]:
+                self._size -= 1
+                return self._queues[priority].popleft()
+        return None
+
+    async def wait_for_room(self):
+        while self.full():
+            waiter = asyncio.get_running_loop().create_future()
+            self._putters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                if not self.full():
+                    self._wake(self._putters)
+                raise
+
+    def get_nowait(self) -> Optional[Message]:
+        for priority in _PRIORITIES:
+            queue = self._queues[priority]
+            if queue:
+                self._size -= 1
+                self._wake(self._putters)
+                return queue.popleft()
+        return None
+
+    def get_batch_nowait(self, max_messages: int) -> List[Message]:
+        batch: List[Message] = []
+        for priority in _PRIORITIES:
+            queue = self._queues[priority]
+            while queue and len(batch) < max_messages:
+                batch.append(queue.popleft())
+            if len(batch) >= max_messages:
+                break
+        if batch:
+            self._size -= len(batch)
+            for _ in range(min(len(batch), len(self._putters))):
+                self._wake(self._putters)
+        return batch
+
+    async def wait_for_message(self):
+        while not self._size:
+            waiter = asyncio.get_running_loop().create_future()
+            self._getters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                if self._size:
+                    self._wake(self._getters)
+                raise
+
+
+class MessageBroker:
+    def __init__(self, max_queue_size: int = 10_000, overflow: str = BLOCK, send_timeout: Optional[float] = 1.0):
+        if overflow not in (BLOCK, DROP_NEW, DROP_OLDEST):
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.send_timeout = send_timeout
+        self._mailboxes: Dict[str, Mailbox] = {}
+        self._topics: Dict[str, Set[str]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    # ---- registration / topics ----
+
+    def register_agent(self, agent_id: str, max_queue_size: Optional[int] = None):
+        if agent_id not in self._mailboxes:
+            self._mailboxes[agent_id] = Mailbox(max_queue_size or self.max_queue_size)
+            self._stats[agent_id] = {"received": 0, "delivered": 0, "dropped": 0, "overflow": 0}
+
+    def unregister_agent(self, agent_id: str):
+        self._mailboxes.pop(agent_id, None)
+        for subscribers in self._topics.values():
+            subscribers.discard(agent_id)
+
+    def subscribe(self, agent_id: str, topic: str):
+        self.register_agent(agent_id)
+        self._topics.setdefault(topic, set()).add(agent_id)
+
+    def unsubscribe(self, agent_id: str, topic: str):
+        self._topics.get(topic, set()).discard(agent_id)
+
+    # ---- sending ----
+
+    async def send_message(self, message: Message, timeout: Optional[float] = None) -> bool:
+        """Deliver `message` to its receiver's mailbox.
+
+        Returns False if the receiver is unknown, or the mailbox stayed full
+        (BLOCK, after `timeout`/send_timeout seconds) or rejected it (DROP_NEW).
+        """
+        mailbox = self._mailboxes.get(message.receiver)
+        if mailbox is None:
+            return False
+        stats = self._stats[message.receiver]
+        if mailbox.full():
+            stats["overflow"] += 1
+            if self.overflow == DROP_NEW:
+                stats["dropped"] += 1
+                return False
+            if self.overflow == DROP_OLDEST:
+                mailbox.drop_oldest()
+                stats["dropped"] += 1
+            else:
+                try:
+                    async with asyncio.timeout(self.send_timeout if timeout is None else timeout):
+                        await mailbox.wait_for_room()
+                except TimeoutError:
+                    stats["dropped"] += 1
+                    return False
+        mailbox.put_nowait(message)
+        stats["received"] += 1
+        return True
+
+    async def send_batch(self, messages: Iterable[Message], timeout: Optional[float] = None) -> int:
+        """Send several messages; returns how many were accepted."""
+        accepted = 0
+        for message in messages:
+            mailbox = self._mailboxes.get(message.receiver)
+            if mailbox is not None and not mailbox.full():
+                # Fast path: no await per message while there is room.
+                mailbox.put_nowait(message)
+                self._stats[message.receiver]["received"] += 1
+                accepted += 1
+            elif await self.send_message(message, timeout):
+                accepted += 1
+        return accepted
+
+    async def publish(self, topic: str, message: Message) -> int:
+        """Fan `message` out to every subscriber of `topic`; returns deliveries."""
+        subscribers = [a for a in self._topics.get(topic, ()) if a != message.sender]
+        copies = [replace(message, receiver=agent_id, topic=topic) for agent_id in subscribers]
+        return await self.send_batch(copies)
+
+    async def broadcast(self, message: Message) -> int:
+        """Send `message` to every registered agent except its sender."""
+        copies = [replace(message, receiver=agent_id) for agent_id in self._mailboxes if agent_id != message.sender]
+        return await self.send_batch(copies)
+
+    # ---- receiving ----
+
+    async def receive_message(self, agent_id: str, timeout: Optional[float] = None) -> Optional[Message]:
+        """Next message for `agent_id` (highest priority first), or None on timeout."""
+        batch = await self.receive_batch(agent_id, 1, timeout)
+        return batch[0] if batch else None
+
+    async def receive_batch(self, agent_id: str, max_messages: int = 100,
+                            timeout: Optional[float] = None) -> List[Message]:
+        """Up to `max_messages` queued messages; waits up to `timeout` for the first one."""
+        mailbox = self._mailboxes.get(agent_id)
+        if mailbox is None:
+            return []
+        if not len(mailbox):
+            try:
+                async with asyncio.timeout(timeout):
+                    await mailbox.wait_for_message()
+            except TimeoutError:
+                return []
+        batch = mailbox.get_batch_nowait(max_messages)
+        self._stats[agent_id]["delivered"] += len(batch)
+        return batch
+
+    # ---- introspection ----
+
+    def queue_size(self, agent_id: str) -> int:
+        mailbox = self._mailboxes.get(agent_id)
+        return len(mailbox) if mailbox is not None else 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-agent received/delivered/dropped/overflow counters and queue depth."""
+        agents = {agent_id: dict(stats, queued=self.queue_size(agent_id)) for agent_id, stats in self._stats.items()}
+        totals = {key: sum(s[key] for s in agents.values()) for key in ("received", "delivered", "dropped", "overflow")}
+        return {"agents": agents, "totals": totals, "topics": {t: len(s) for t, s in self._topics.items()}}
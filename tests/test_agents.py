@@ -2,7 +2,8 @@
 import pytest
 import asyncio
 from src.core.agent_communication import MessageBroker, Message, MessageType, MessagePriority
-from src.agents.implementations import SensingAgent, AnalysisAgent
+from src.agents.implementations import SensingAgent, AnalysisAgent, AlertAgent
+from agents.agent_manager import AgentManager
 
 @pytest.mark.asyncio
 async def test_agent_communication():
@@ -77,3 +78,78 @@ async def test_full_pipeline():
     
     for task in tasks:
         task.cancel()
+
+
+def _sharded_config(processes, sensors):
+    return {"agents": {
+        "sensing": {"enabled": True, "count": processes, "processes": processes, "interval": 0.05,
+                    "sensor_ids": [f"sensor_{i:03d}" for i in range(sensors)], "max_restarts": 2},
+        "analysis": {"enabled": True},
+        "alert": {"enabled": False},
+        "coordination": {"enabled": False},
+    }}
+
+
+async def _wait_for(predicate, timeout=20.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate() and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    return predicate()
+
+
+@pytest.mark.asyncio
+async def test_sharded_sensing_partitions_sensors_across_processes():
+    manager = AgentManager(_sharded_config(processes=2, sensors=6))
+    await manager.initialize_agents()
+    assert "sensing_agent_0" not in manager.agents
+    assert sorted(sum(manager.sensing_shards.assignments, [])) == [f"sensor_{i:03d}" for i in range(6)]
+
+    seen = set()
+    analysis = manager.agents["analysis_agent"]
+    manager.broker.subscribe("probe", "sensor_data")
+    tasks = await manager.start_all_agents()
+    try:
+        def collect():
+            for message in manager.broker._mailboxes["probe"].get_batch_nowait(1000):
+                seen.add((message.sender.split("_")[1], message.payload["sensor_id"]))
+            return len({sensor for _, sensor in seen}) == 6
+        assert await _wait_for(collect)
+        pids = {s["pid"] for s in manager.get_status()["sensing_shards"]["shards"]}
+    finally:
+        await manager.stop_all_agents()
+        for task in tasks:
+            task.cancel()
+
+    assert len({sensor for _, sensor in seen}) == 6
+    shards_by_sensor = {}
+    for shard, sensor in seen:
+        shards_by_sensor.setdefault(sensor, set()).add(shard)
+    assert all(len(shards) == 1 for shards in shards_by_sensor.values())
+    assert len(pids) == 2
+    assert analysis.stats["messages_received"] > 0
+    assert manager.sensing_shards.forwarded > 0
+
+
+@pytest.mark.asyncio
+async def test_sharded_sensing_restarts_dead_workers():
+    manager = AgentManager(_sharded_config(processes=1, sensors=2))
+    await manager.initialize_agents()
+    manager.sensing_shards.supervise_interval = 0.1
+    tasks = await manager.start_all_agents()
+    try:
+        first = manager.sensing_shards._processes[0]
+        assert await _wait_for(lambda: manager.sensing_shards.forwarded > 0)
+        first.kill()
+        assert await _wait_for(lambda: manager.sensing_shards._processes[0] is not first
+                               and manager.sensing_shards._processes[0].is_alive())
+        forwarded = manager.sensing_shards.forwarded
+        assert await _wait_for(lambda: manager.sensing_shards.forwarded > forwarded)
+        status = manager.get_status()["sensing_shards"]["shards"][0]
+    finally:
+        await manager.stop_all_agents()
+        for task in tasks:
+            task.cancel()
+    assert status["restarts"] == 1 and status["alive"]
+    assert not manager.sensing_shards._processes[0].is_alive()
+
@@ -0,0 +1,102 @@
+import pytest
+from agents_system.analyzer import detect_anomaly, detect_anomaly_incremental
+from agents_system.timeseries import MetricsStore
+
+
+def _metrics(date, forest, previous=None, region="r1"):
+    m = {"region": region, "date": date, "forest_percent": forest, "ndvi_mean": 0.5}
+    if previous is not None:
+        m["previous_forest_percent"] = previous
+    return m
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'greenmind.db'}"
+
+
+@pytest.fixture
+def store(db_url):
+    s = MetricsStore(db_url)
+    yield s
+    s.close()
+
+
+@pytest.mark.asyncio
+async def test_first_run_seeds_from_previous_window(store):
+    first = await detect_anomaly_incremental(_metrics("2025-01-10", 40.0, previous=50.0), store)
+    legacy = await detect_anomaly(_metrics("2025-01-10", 40.0, previous=50.0))
+    assert first["is_anomaly"] is legacy["is_anomaly"] is True
+    assert first["percent_change"] == pytest.approx(legacy["percent_change"])
+    assert store.history("r1")[0]["forest_percent"] == 40.0
+
+
+@pytest.mark.asyncio
+async def test_ewma_baseline_and_idempotent_reruns(store, db_url):
+    for day, value in enumerate([50.0, 50.5, 49.5, 50.2, 49.8], start=1):
+        out = await detect_anomaly_incremental(_metrics(f"2025-01-{day:02d}", value), store)
+    assert out["is_anomaly"] is False
+    state = dict(store.get_baseline("r1"))
+
+    drop = await detect_anomaly_incremental(_metrics("2025-01-06", 44.0), store)
+    assert drop["is_anomaly"] is True and drop["z_score"] < -3
+    rerun = await detect_anomaly_incremental(_metrics("2025-01-06", 44.0), store)
+    assert rerun == drop
+    assert store.get_baseline("r1")["count"] == state["count"] + 1
+
+    # The baseline survives a restart.
+    reopened = MetricsStore(db_url)
+    assert reopened.get_baseline("r1") == store.get_baseline("r1")
+    assert [m["date"] for m in reopened.history("r1", limit=2)] == ["2025-01-05", "2025-01-06"]
+
+
+@pytest.mark.asyncio
+async def test_seasonal_median_baseline(store):
+    for year, value in [(2022, 70.0), (2023, 71.0), (2024, 69.0)]:
+        store.record(_metrics(f"{year}-06-01", value))
+    for date in ("2023-07-01", "2024-05-01", "2025-05-30"):  # other seasons, and this year
+        store.record(_metrics(date, 10.0))
+    store.save_baseline("r1", {"ewma": 40.0, "ewvar": 1.0, "count": 10, "last_date": "2025-05-01"})
+    out = await detect_anomaly_incremental(_metrics("2025-06-05", 70.5), store, z_threshold=1e9)
+    assert out["baseline_method"] == "seasonal_median"
+    assert out["baseline"] == 70.0
+    assert out["is_anomaly"] is False
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_per_region():
+    import numpy as np
+    from agents_system.analyzer import detect_anomalies_batch, score_anomalies
+
+    rng = np.random.default_rng(1)
+    n = 2000
+    current = rng.uniform(0, 100, n)
+    previous = current * rng.normal(1.0, 0.06, n)
+    previous[:5] = [0.0, np.nan, 40.0, 40.0, 40.0]
+    current[:5] = [30.0, 30.0, 0.0, np.nan, 42.0]
+    patch_area = np.where(rng.random(n) < 0.2, rng.uniform(0, 10, n), np.nan)
+    patch_area[:2] = 8.0  # large patches on regions with missing data
+    regions = [f"r{i}" for i in range(n)]
+
+    scores = score_anomalies(current, previous, patch_area_ha=patch_area)
+    assert (scores["is_anomaly"] & (np.abs(np.nan_to_num(scores["percent_change"])) < 5.0)).any()
+    for i in range(n):
+        cur = None if np.isnan(current[i]) else float(current[i])
+        prev = None if np.isnan(previous[i]) else float(previous[i])
+        metrics = {"forest_percent": cur, "previous_forest_percent": prev}
+        if not np.isnan(patch_area[i]):
+            metrics["loss_patches"] = [{"area_ha": float(patch_area[i])}]
+        single = await detect_anomaly(metrics)
+        assert bool(scores["is_anomaly"][i]) is single["is_anomaly"]
+        if "percent_change" in single:
+            assert scores["percent_change"][i] == pytest.approx(single["percent_change"])
+        else:
+            assert np.isnan(scores["percent_change"][i])
+
+    assert not detect_anomalies_batch(regions[:2], current[:2], previous[:2], patch_area_ha=patch_area[:2])
+    ranked = detect_anomalies_batch(regions, current, previous, patch_area_ha=patch_area)
+    assert len(ranked) == int(scores["is_anomaly"].sum())
+    severities = [abs(r["percent_change"]) for r in ranked]
+    assert severities == sorted(severities, reverse=True)
+    assert ranked[0]["rank"] == 1
+    assert len(detect_anomalies_batch(regions, current, previous, limit=3)) == 3
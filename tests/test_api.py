@@ -1 +1,27 @@
-# Placeholder for test_api.py
+import time
+
+import yaml
+from fastapi.testclient import TestClient
+
+import main
+from core.storage import open_storage
+from src.api import routes
+
+
+def test_app_starts_and_stops_with_the_shipped_config(monkeypatch, tmp_path):
+    with open(main.CONFIG_PATH) as f:
+        config = yaml.safe_load(f)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/api.db")
+    with TestClient(main.app) as client:
+        assert main.agent_manager is not None and main.write_buffer is not None
+        assert set(main.agent_manager.agents) >= {"analysis_agent", "alert_agent"}
+        names = {r["name"] for r in client.get("/api/v1/regions").json()["regions"]}
+        assert names == {r["name"] for r in config["regions"]}
+        deadline = time.monotonic() + 5
+        while routes.rollups.ingested == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert routes.rollups.ingested > 0  # sensing -> data pipeline -> rollups
+    assert main.data_pipeline._running is False
+    storage = open_storage(f"sqlite:///{tmp_path}/api.db")
+    assert storage.query_readings()  # flushed through the write-behind buffer on shutdown
+    storage.close()
@@ -0,0 +1,134 @@
+import asyncio
+import gzip
+import json
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from src.api import routes
+from core.spatial import SpatialIndex
+from src.api.cache import ResponseCache
+from src.core.agent_communication import Message, MessageBroker, MessageType
+
+
+def _app(cache, build):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request, limit: int = 10):
+        return await cache.respond(request, lambda: build(limit), tags=("alerts",))
+
+    return TestClient(app)
+
+
+def test_repeat_requests_are_served_from_cache_with_etag_and_304():
+    builds = []
+    cache = ResponseCache(default_ttl=60)
+    client = _app(cache, lambda limit: builds.append(limit) or {"alerts": list(range(limit))})
+
+    first = client.get("/items")
+    assert first.json() == {"alerts": list(range(10))}
+    etag = first.headers["etag"]
+    assert client.get("/items").headers["etag"] == etag
+    revalidated = client.get("/items", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    client.get("/items", params={"limit": 3})  # different query -> its own entry
+    assert builds == [10, 3]
+    assert cache.metrics() == {**cache.metrics(), "hits": 2, "misses": 2, "not_modified": 1, "entries": 2}
+
+
+def test_large_bodies_are_pre_gzipped():
+    cache = ResponseCache()
+    client = _app(cache, lambda limit: {"alerts": ["High PM2.5 detected in Zone A"] * 200})
+    response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    entry = next(iter(cache._entries.values()))
+    assert len(entry.gzipped) < len(entry.body) / 10
+    assert json.loads(gzip.decompress(entry.gzipped)) == response.json()
+    assert "content-encoding" not in client.get("/items", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_ttl_expiry_and_tag_invalidation():
+    now = [0.0]
+    builds = []
+    cache = ResponseCache(default_ttl=5, clock=lambda: now[0])
+    client = _app(cache, lambda limit: builds.append(now[0]) or {"n": len(builds)})
+    client.get("/items")
+    now[0] = 4.0
+    client.get("/items")
+    now[0] = 6.0
+    client.get("/items")
+    assert len(builds) == 2
+    cache.invalidate("agents")
+    client.get("/items")
+    assert len(builds) == 2
+    cache.invalidate("alerts")
+    assert client.get("/items").json() == {"n": 3}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_build():
+    cache = ResponseCache()
+    builds = []
+
+    async def slow_build():
+        builds.append(1)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    entries = await asyncio.gather(*(cache._get_or_build("k", slow_build, 5, ()) for _ in range(50)))
+    assert len(builds) == 1 and all(e is entries[0] for e in entries)
+
+
+@pytest.mark.asyncio
+async def test_agent_events_invalidate_cached_alerts():
+    broker = MessageBroker()
+    cache = ResponseCache(default_ttl=60)
+    await cache._get_or_build("/api/v1/alerts?", lambda: {"alerts": []}, 60, ("alerts",))
+    await cache._get_or_build("/api/v1/pollution/distribution?", lambda: {}, 60, ("pollution",))
+    task = cache.attach(broker)
+    await broker.publish("alerts", Message.create("analysis_agent", "", MessageType.ALERT, {"metric": "aqi"}))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    task.cancel()
+    assert list(cache._entries) == ["/api/v1/pollution/distribution?"]
+
+
+def test_dashboard_routes_use_the_cache(monkeypatch):
+    cache = ResponseCache()
+    index = SpatialIndex()
+    index.index_message("alerts", {"metric": "aqi", "value": 180.0}, "m1")
+    monkeypatch.setattr(routes, "response_cache", cache)
+    monkeypatch.setattr(routes, "spatial", index)
+    client = TestClient(routes.app)
+    for path in ("/api/v1/agents/status", "/api/v1/alerts", "/api/v1/pollution/distribution"):
+        etag = client.get(path).headers["etag"]
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/v1/alerts").json() == {
+        "alerts": [{"metric": "aqi", "value": 180.0, "id": "m1", "regions": []}], "total": 1}
+    assert client.get("/api/v1/cache/metrics").json()["not_modified"] == 3
+
+
+@pytest.mark.asyncio
+async def test_alerts_are_indexed_before_the_cache_is_invalidated(monkeypatch):
+    broker = MessageBroker()
+    cache = ResponseCache(default_ttl=60)
+    index = SpatialIndex()
+    monkeypatch.setattr(routes, "spatial", index)
+    await cache._get_or_build("/api/v1/alerts?", lambda: routes._alerts(10), 60, ("alerts",))
+    invalidated_with = []
+
+    def invalidate_topics(topics):
+        invalidated_with.append(index.alert_count)
+        cache.invalidate_topics(topics)
+
+    cache_task = cache.attach(broker, topics=("status",))
+    spatial_task = index.attach(broker, on_update=invalidate_topics)
+    await broker.publish("alerts", Message.create("analysis_agent", "", MessageType.ALERT,
+                                                  {"metric": "aqi", "location": {"lon": 72.8, "lat": 19.0}}))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    cache_task.cancel()
+    spatial_task.cancel()
+    assert invalidated_with == [1] and not cache._entries
+    entry = await cache._get_or_build("/api/v1/alerts?", lambda: routes._alerts(10), 60, ("alerts",))
+    assert json.loads(entry.body)["total"] == 1
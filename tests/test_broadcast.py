@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.api import broadcast, routes
+from src.api.broadcast import BroadcastHub
+from core.spatial import REGION, SpatialIndex
+from src.agents.implementations import ALERT_TOPIC, SENSOR_TOPIC, AnalysisAgent, SensingAgent
+from src.core.agent_communication import Message, MessageBroker, MessagePriority, MessageType
+
+
+def test_each_update_is_serialized_once_for_all_subscribers(monkeypatch):
+    calls = []
+    real_dumps = broadcast._dumps
+    monkeypatch.setattr(broadcast, "_dumps", lambda obj: calls.append(obj) or real_dumps(obj))
+    hub = BroadcastHub()
+    subscriptions = [hub.subscribe() for _ in range(5000)]
+    assert hub.publish("sensor_data", {"sensor_id": "s1", "measurements": {"aqi": 42}}) == 5000
+    assert len(calls) == 1
+    assert subscriptions[0]._queue[0] is subscriptions[-1]._queue[0]
+    assert json.loads(subscriptions[0]._queue[0])["type"] == "environmental_update"
+
+
+@pytest.mark.asyncio
+async def test_slow_client_drops_its_oldest_updates_only():
+    hub = BroadcastHub(max_queue=3)
+    slow, fast = hub.subscribe(), hub.subscribe()
+    received = []
+    for i in range(10):
+        hub.publish("alerts", {"n": i})
+        received.append(json.loads(await fast.get())["data"]["n"])
+    assert received == list(range(10))
+    assert [json.loads(await slow.get())["data"]["n"] for _ in range(3)] == [7, 8, 9]
+    assert slow.dropped == 7 and fast.dropped == 0
+    assert hub.metrics()["dropped"] == 7
+
+
+def test_topic_and_region_filters():
+    hub = BroadcastHub()
+    alerts = hub.subscribe(topics=["alerts"])
+    mumbai = hub.subscribe(regions=["Mumbai"])
+    everything = hub.subscribe()
+    hub.publish("alerts", {"id": 1}, regions="Delhi")
+    hub.publish("sensor_data", {"id": 2}, regions=["Mumbai"])
+    hub.publish("sensor_data", {"id": 3})
+    hub.publish("alerts", {"id": 4}, regions=["Delhi", "Mumbai"])
+    assert [json.loads(p)["data"]["id"] for p in alerts._queue] == [1, 4]
+    assert [json.loads(p)["data"]["id"] for p in mumbai._queue] == [2, 4]
+    assert len(everything) == 4
+    hub.unsubscribe(alerts)
+    assert hub.publish("alerts", {"id": 5}) == 1
+
+
+@pytest.mark.asyncio
+async def test_attach_forwards_broker_topics():
+    broker = MessageBroker()
+    hub = BroadcastHub()
+    subscription = hub.subscribe(topics=["alerts"])
+    task = hub.attach(broker)
+    await broker.publish("alerts", Message.create("analysis_agent", "", MessageType.ALERT,
+                                                  {"metric": "aqi", "value": 180, "region": "Pune"}))
+    update = json.loads(await asyncio.wait_for(subscription.get(), 1))
+    task.cancel()
+    assert update["type"] == "alert" and update["regions"] == ["Pune"] and update["data"]["value"] == 180
+
+
+@pytest.mark.asyncio
+async def test_agent_updates_reach_region_subscribers_by_location():
+    spatial = SpatialIndex()
+    spatial.insert("Mumbai", REGION, (72.77, 18.89, 72.99, 19.27))
+    spatial.insert("Delhi", REGION, (76.84, 28.40, 77.35, 28.88))
+    broker = MessageBroker()
+    sensing = SensingAgent("sensing_agent", broker, ["s_mumbai", "s_delhi", "s_nowhere"],
+                           locations={"s_mumbai": (72.8777, 19.0760), "s_delhi": (77.2090, 28.6139)})
+    analysis = AnalysisAgent("analysis_agent", broker, thresholds={"co2": 0.0})
+    hub = BroadcastHub()
+    mumbai = hub.subscribe(regions=["Mumbai"])
+    task = hub.attach(broker, spatial=spatial)
+    for sensor_id in sensing.sensor_ids:
+        reading = await sensing.collect_data(sensor_id)
+        await sensing.publish(SENSOR_TOPIC, MessageType.DATA, reading)
+        for breach in analysis.analyze(reading):
+            await analysis.publish(ALERT_TOPIC, MessageType.ALERT, breach, MessagePriority.HIGH)
+    updates = [json.loads(await asyncio.wait_for(mumbai.get(), 1)) for _ in range(2)]
+    task.cancel()
+    assert sorted(u["topic"] for u in updates) == ["alerts", "sensor_data"]
+    assert all(u["regions"] == ["Mumbai"] and u["data"]["sensor_id"] == "s_mumbai" for u in updates)
+    assert len(mumbai) == 0
+
+
+def test_websocket_streams_filtered_updates(monkeypatch):
+    hub = BroadcastHub()
+    monkeypatch.setattr(routes, "hub", hub)
+    client = TestClient(routes.app)
+    with client.websocket_connect("/ws?topics=alerts") as ws:
+        deadline = time.time() + 5
+        while hub.metrics()["subscribers"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        ws.portal.call(hub.publish, "sensor_data", {"skip": True})
+        ws.portal.call(hub.publish, "alerts", {"message": "High PM2.5"})
+        assert ws.receive_json()["data"] == {"message": "High PM2.5"}
+    deadline = time.time() + 5
+    while hub.metrics()["subscribers"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert hub.metrics()["subscribers"] == 0
@@ -0,0 +1,79 @@
+import pytest
+from agents_system import orchestrator
+from agents_system.agents import Coordinator, ModelCache, StubModel, cache_key
+
+
+def _patch_stages(monkeypatch, forest):
+    async def fake_fetch(region, bbox=None, include_previous=True):
+        cur, prev = forest[region]
+        return {"region": region, "forest_percent": cur, "previous_forest_percent": prev, "ndvi_mean": 0.51234}
+
+    async def fake_execute(plan):
+        return {"ticket": None, "slack": None}
+
+    monkeypatch.setattr(orchestrator, "fetch_forest_cover", fake_fetch)
+    monkeypatch.setattr(orchestrator, "execute_actions", fake_execute)
+
+
+@pytest.mark.asyncio
+async def test_only_anomalous_regions_reach_the_model(monkeypatch):
+    _patch_stages(monkeypatch, {"steady": (50.0, 50.2), "cleared": (40.0, 50.0)})
+    model = StubModel('{"summary": "likely logging", "severity": "high", "steps": ["Check permits"]}')
+    coordinator = Coordinator(model)
+
+    steady = await coordinator.run("steady")
+    cleared = await coordinator.run("cleared")
+
+    assert len(model.calls) == 1
+    assert "review" not in steady["analysis"]
+    assert cleared["analysis"]["review"]["summary"] == "likely logging"
+    assert {"step": "Check permits", "eta": "tbd"} in cleared["plan"]["steps"]
+    assert "likely logging" in cleared["report"]
+    assert coordinator.stats == {"reviewed": 1, "skipped": 1, "model_calls": 1, "cache_hits": 0}
+
+
+@pytest.mark.asyncio
+async def test_reviews_are_cached_across_runs_by_normalized_inputs(monkeypatch, tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    forest = {"cleared": (40.0, 50.0)}
+    _patch_stages(monkeypatch, forest)
+
+    first = Coordinator(StubModel(), ModelCache(url))
+    await first.run("cleared")
+    assert first.stats["model_calls"] == 1
+
+    forest["cleared"] = (40.001, 50.0)  # noise below the normalization precision
+    second_model = StubModel()
+    second = Coordinator(second_model, ModelCache(url))
+    out = await second.run("cleared")
+
+    assert second_model.calls == []
+    assert second.stats["cache_hits"] == 1
+    assert out["analysis"]["review"]["severity"] == "high"
+    assert cache_key("stub", "x", {"a": 1.001}) == cache_key("stub", "x", {"a": 1.0})
+    assert cache_key("stub", "x", {"a": 1.0}) != cache_key("other", "x", {"a": 1.0})
+
+
+def test_sdk_is_found_behind_the_repos_own_agents_package(monkeypatch, tmp_path):
+    import os
+    import sys
+    import agents as repo_agents
+    from agents_system import agents as coordinator_module
+
+    site = tmp_path / "site-packages" / "agents"
+    site.mkdir(parents=True)
+    (site / "__init__.py").write_text("from .run import Runner\nclass Agent: pass\ndef function_tool(f): return f\n")
+    (site / "run.py").write_text("class Runner: pass\n")
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setattr(sys, "path", [repo, str(site.parent)])
+    monkeypatch.delitem(sys.modules, coordinator_module._SDK_MODULE, raising=False)
+
+    Agent, Runner, function_tool = coordinator_module._sdk()
+    assert Runner.__module__ == f"{coordinator_module._SDK_MODULE}.run"
+    assert sys.modules["agents"] is repo_agents  # the repo package is left in place
+    sys.modules.pop(coordinator_module._SDK_MODULE)
+    sys.modules.pop(f"{coordinator_module._SDK_MODULE}.run")
+
+    monkeypatch.setattr(sys, "path", [repo])
+    with pytest.raises(RuntimeError):
+        coordinator_module._sdk()
@@ -1 +1,73 @@
-# Placeholder for test_core.py
+import asyncio
+import pytest
+from src.core.agent_communication import (
+    DROP_NEW, DROP_OLDEST, Message, MessageBroker, MessagePriority, MessageType,
+)
+
+
+def _msg(i, receiver="analysis", priority=MessagePriority.NORMAL, sender="sensing"):
+    return Message(id=f"m{i}", sender=sender, receiver=receiver, type=MessageType.DATA,
+                   priority=priority, payload={"i": i}, timestamp="2025-01-01T00:00:00")
+
+
+@pytest.mark.asyncio
+async def test_priority_order_and_fifo_within_priority():
+    broker = MessageBroker()
+    broker.register_agent("analysis")
+    for i, p in enumerate([MessagePriority.LOW, MessagePriority.HIGH, MessagePriority.NORMAL,
+                           MessagePriority.HIGH, MessagePriority.CRITICAL]):
+        assert await broker.send_message(_msg(i, priority=p)) is True
+    batch = await broker.receive_batch("analysis", max_messages=10, timeout=0.1)
+    assert [m.id for m in batch] == ["m4", "m1", "m3", "m2", "m0"]
+    assert await broker.receive_message("analysis", timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_backpressure_blocks_sender_until_consumer_catches_up():
+    broker = MessageBroker(max_queue_size=2, send_timeout=1.0)
+    broker.register_agent("analysis")
+    await broker.send_batch([_msg(0), _msg(1)])
+    blocked = asyncio.create_task(broker.send_message(_msg(2)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert (await broker.receive_message("analysis", timeout=0.1)).id == "m0"
+    assert await blocked is True
+    assert broker.get_metrics()["agents"]["analysis"]["overflow"] == 1
+
+    # With nobody consuming, a blocked send gives up after the timeout and counts a drop.
+    assert await broker.send_message(_msg(3), timeout=0.01) is False
+    assert broker.get_metrics()["totals"]["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    new = MessageBroker(max_queue_size=2, overflow=DROP_NEW)
+    old = MessageBroker(max_queue_size=2, overflow=DROP_OLDEST)
+    for broker in (new, old):
+        broker.register_agent("analysis")
+        await broker.send_message(_msg(0, priority=MessagePriority.HIGH))
+        await broker.send_message(_msg(1, priority=MessagePriority.LOW))
+    assert await new.send_message(_msg(2)) is False
+    assert await old.send_message(_msg(2)) is True
+    assert [m.id for m in await old.receive_batch("analysis", timeout=0.1)] == ["m0", "m2"]
+    assert new.get_metrics()["totals"]["dropped"] == old.get_metrics()["totals"]["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_topic_fan_out_and_waiting_receiver():
+    broker = MessageBroker()
+    for agent in ("alert", "coordination", "sensing"):
+        broker.subscribe(agent, "anomalies")
+    waiter = asyncio.create_task(broker.receive_message("alert", timeout=1.0))
+    await asyncio.sleep(0)
+    delivered = await broker.publish("anomalies", _msg(0, receiver="", sender="sensing"))
+    assert delivered == 2  # not echoed to the sender
+    got = await waiter
+    assert got.receiver == "alert" and got.topic == "anomalies"
+    assert (await broker.receive_message("coordination", timeout=0.1)).payload == {"i": 0}
+
+
+@pytest.mark.asyncio
+async def test_unknown_receiver_is_rejected():
+    broker = MessageBroker()
+    assert await broker.send_message(_msg(0, receiver="nobody")) is False
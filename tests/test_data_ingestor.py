@@ -0,0 +1,239 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from agents_system import data_ingestor
+from agents_system.data_ingestor.cache import TileCache, cache_key
+
+
+@pytest.fixture(autouse=True)
+def no_tile_cache(monkeypatch):
+    monkeypatch.setattr(data_ingestor, "get_tile_cache", lambda: None)
+    monkeypatch.setattr(data_ingestor, "_catalog", None)  # no catalog pre-check unless a test sets one
+
+
+SMALL_BBOX = (90.0, 26.0, 90.01, 26.01)  # a single Process API tile
+
+
+class FakeRequest:
+    """Stands in for SentinelHubRequest: blocking get_data() returning a TAR-style dict."""
+
+    def __init__(self, bbox, time_range, size=None, delay=0.0):
+        self.bbox = bbox
+        self.time_range = time_range
+        self.delay = delay
+
+    def get_data(self):
+        time.sleep(self.delay)
+        ndvi = np.array([[0.8, 0.2], [np.nan, 0.5]], dtype=np.float32)
+        mask = (ndvi >= 0.4).astype(np.uint8)
+        return [{"ndvi.tif": ndvi, "mask.tif": mask}]
+
+
+@pytest.mark.asyncio
+async def test_fetch_runs_windows_concurrently_off_loop(monkeypatch):
+    monkeypatch.setattr(data_ingestor, "_build_request", lambda bbox, tr, size=None: FakeRequest(bbox, tr, delay=0.3))
+
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    metrics = await data_ingestor.fetch_forest_cover("r1", bbox=SMALL_BBOX)
+    elapsed = time.perf_counter() - start
+    beat.cancel()
+
+    assert elapsed < 0.55  # both 0.3s windows overlap
+    assert ticks > 10  # the event loop kept running during the downloads
+    assert metrics["forest_percent"] == pytest.approx(66.67)
+    assert metrics["ndvi_mean"] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_fetch_batch_matches_single_region(monkeypatch):
+    monkeypatch.setattr(data_ingestor, "_build_request", lambda bbox, tr, size=None: FakeRequest(bbox, tr))
+    monkeypatch.setattr(data_ingestor, "_download_batch", lambda reqs: [r.get_data()[0] for r in reqs])
+
+    regions = [{"name": "a", "bbox": (0.0, 0.0, 0.1, 0.1)}, {"name": "b", "bbox": SMALL_BBOX}]
+    batch = await data_ingestor.fetch_forest_cover_batch(regions)
+    single = await data_ingestor.fetch_forest_cover("b", bbox=SMALL_BBOX)
+
+    assert [m["region"] for m in batch] == ["a", "b"]
+    assert batch[0]["bbox"] == (0.0, 0.0, 0.1, 0.1)
+    assert batch[1] == single
+
+
+def test_tile_cache_roundtrip_and_lru_eviction(tmp_path):
+    ndvi = np.random.rand(64, 64).astype(np.float32)
+    mask = (ndvi >= 0.4).astype(np.uint8)
+    entry_bytes = ndvi.nbytes + mask.nbytes + 256  # two .npy headers
+    cache = TileCache(str(tmp_path), max_bytes=2 * entry_bytes)
+
+    k1, k2, k3 = (cache_key((0, 0, 1, 1), (f"2025-01-0{d}", "2025-01-10"), "script", 10) for d in (1, 2, 3))
+    assert cache.get(k1) is None
+    cache.put(k1, ndvi, mask)
+    cache.put(k2, ndvi, mask)
+    got = cache.get(k1)  # k1 becomes most recently used
+    assert isinstance(got[0], np.memmap)
+    np.testing.assert_array_equal(got[0], ndvi)
+    cache.put(k3, ndvi, mask)  # evicts k2
+
+    assert cache.get(k2) is None
+    assert cache.get(k1) is not None and cache.get(k3) is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["misses"] == 2
+
+    # A fresh instance picks up the entries left on disk.
+    assert TileCache(str(tmp_path), max_bytes=2 * entry_bytes).get(k3) is not None
+
+
+@pytest.mark.asyncio
+async def test_repeat_fetch_served_from_cache(monkeypatch, tmp_path):
+    built = []
+
+    def build(bbox, tr, size=None):
+        built.append(tr)
+        return FakeRequest(bbox, tr)
+
+    cache = TileCache(str(tmp_path), max_bytes=1 << 20)
+    monkeypatch.setattr(data_ingestor, "get_tile_cache", lambda: cache)
+    monkeypatch.setattr(data_ingestor, "_build_request", build)
+
+    first = await data_ingestor.fetch_forest_cover("r1", bbox=SMALL_BBOX)
+    second = await data_ingestor.fetch_forest_cover("r1", bbox=SMALL_BBOX)
+
+    assert first == second
+    assert len(built) == 2  # only the first call went to the network
+    assert cache.stats["hits"] == 2
+
+
+class RasterBackedRequest:
+    """Serves the pixels of one synthetic full-bbox raster that fall inside the requested tile."""
+
+    def __init__(self, full_bbox, ndvi, mask, bbox, size):
+        width, height = size
+        minx, _, _, maxy = full_bbox
+        dx = (full_bbox[2] - minx) / ndvi.shape[1]
+        dy = (maxy - full_bbox[1]) / ndvi.shape[0]
+        self.c0 = round((bbox[0] - minx) / dx)
+        self.r0 = round((maxy - bbox[3]) / dy)
+        self.ndvi, self.mask, self.width, self.height = ndvi, mask, width, height
+
+    def get_data(self):
+        rows = slice(self.r0, self.r0 + self.height)
+        cols = slice(self.c0, self.c0 + self.width)
+        return [{"ndvi.tif": self.ndvi[rows, cols].copy(), "mask.tif": self.mask[rows, cols].copy()}]
+
+
+def test_tile_grid_covers_full_raster_without_overlap():
+    bbox = (90.0, 26.0, 90.1, 26.1)
+    tiles = data_ingestor.tile_grid(bbox, max_px=300)
+    full_w, full_h = data_ingestor.tile_grid(bbox, max_px=10_000)[0][1]
+    assert all(w <= 300 and h <= 300 for _, (w, h) in tiles)
+    assert sum(w * h for _, (w, h) in tiles) == full_w * full_h
+
+
+@pytest.mark.asyncio
+async def test_tiled_fetch_matches_single_shot(monkeypatch):
+    bbox = (90.0, 26.0, 90.1, 26.1)
+    (_, (width, height)), = data_ingestor.tile_grid(bbox, max_px=10_000)
+    rng = np.random.default_rng(0)
+    ndvi = rng.uniform(-0.2, 0.9, size=(height, width)).astype(np.float32)
+    ndvi[rng.random((height, width)) < 0.1] = np.nan
+    mask = (ndvi >= 0.4).astype(np.uint8)
+
+    monkeypatch.setattr(data_ingestor, "MAX_TILE_PX", 256)
+    monkeypatch.setattr(data_ingestor, "_build_request",
+                        lambda tb, tr, size=None: RasterBackedRequest(bbox, ndvi, mask, tb, size))
+    monkeypatch.setattr(data_ingestor, "_download_batch", lambda reqs: [r.get_data()[0] for r in reqs])
+
+    assert len(data_ingestor.tile_grid(bbox)) > 4
+    stats = await data_ingestor._fetch_window(bbox, ("2025-01-01", "2025-01-10"))
+    expected_mean = float(np.nanmean(ndvi.astype(float)))
+    expected_pct = 100.0 * (mask.astype(bool) & ~np.isnan(ndvi)).sum() / (~np.isnan(ndvi)).sum()
+    assert stats.percent == expected_pct
+    assert stats.mean == pytest.approx(expected_mean, rel=1e-12)
+    assert stats.histogram.sum() == stats.valid_count
+
+    single = await data_ingestor.fetch_forest_cover("r", bbox=bbox)
+    batch, = await data_ingestor.fetch_forest_cover_batch([{"name": "r", "bbox": bbox}])
+    assert single == batch
+    assert single["forest_percent"] == round(expected_pct, 2)
+    assert single["ndvi_mean"] == round(expected_mean, 3)
+
+
+@pytest.mark.asyncio
+async def test_catalog_precheck_picks_clear_day_widens_or_skips(monkeypatch):
+    from agents_system.data_ingestor.catalog import Scene, StubCatalog
+
+    built = []
+
+    def build(bbox, tr, size=None):
+        built.append(tr)
+        return FakeRequest(bbox, tr)
+
+    current, previous = data_ingestor._time_windows(10, 40, 10)
+    clear_day = current[1]
+    widened_day = data_ingestor.catalog._shift(previous[0], -3)  # only found after widening
+    scenes = {
+        "clear": [Scene(clear_day, 5.0), Scene(current[0], 2.0), Scene(current[0], 80.0), Scene(widened_day, 10.0)],
+        "cloudy": [Scene(clear_day, 95.0), Scene(previous[1], 90.0)],
+    }
+    catalog = StubCatalog(by_bbox=lambda bbox: scenes["clear" if bbox == SMALL_BBOX else "cloudy"])
+    monkeypatch.setattr(data_ingestor, "_build_request", build)
+    monkeypatch.setattr(data_ingestor, "_catalog", catalog)
+
+    metrics = await data_ingestor.fetch_forest_cover("r1", bbox=SMALL_BBOX)
+    assert sorted(built) == [(widened_day, widened_day), (current[0], current[0])]
+    assert metrics["acquisition"]["current"] == {"date": current[0], "cloud_cover": 2.0, "widened": 0}
+    assert metrics["acquisition"]["previous"]["widened"] == 1
+    assert metrics["forest_percent"] == pytest.approx(66.67)
+
+    built.clear()
+    skipped = await data_ingestor.fetch_forest_cover("r2", bbox=(0.0, 0.0, 0.01, 0.01))
+    assert built == []  # no pixels downloaded for cloud-only windows
+    assert skipped["forest_percent"] is None and "previous_forest_percent" not in skipped
+    assert skipped["acquisition"]["current"] == {"skipped": "all 1 scenes above 30% cloud"}
+
+    monkeypatch.setattr(data_ingestor, "_download_batch", lambda reqs: [r.get_data()[0] for r in reqs])
+    batch = await data_ingestor.fetch_forest_cover_batch([{"name": "r1", "bbox": SMALL_BBOX},
+                                                          {"name": "r2", "bbox": (0.0, 0.0, 0.01, 0.01)}])
+    assert batch == [metrics, skipped]
+
+
+@pytest.mark.asyncio
+async def test_loss_patch_across_tile_borders(monkeypatch):
+    bbox = (90.0, 26.0, 90.1, 26.1)
+    (_, (width, height)), = data_ingestor.tile_grid(bbox, max_px=10_000)
+    rng = np.random.default_rng(1)
+    prev = rng.uniform(0.5, 0.9, size=(height, width)).astype(np.float32)
+    curr = prev.copy()
+    curr[200:300, 240:290] = 0.05  # 50 ha clearing straddling the 256 px tile borders
+    curr[900:903, 900:903] = 0.05  # 9 px, below the listed patch size
+    current, _ = data_ingestor._time_windows(10, 40, 10)
+
+    def build(tile_bbox, tr, size=None):
+        ndvi = curr if tr == current else prev
+        return RasterBackedRequest(bbox, ndvi, (ndvi >= 0.4).astype(np.uint8), tile_bbox, size)
+
+    monkeypatch.setattr(data_ingestor, "MAX_TILE_PX", 256)
+    monkeypatch.setattr(data_ingestor, "_build_request", build)
+    monkeypatch.setattr(data_ingestor, "_download_batch", lambda reqs: [r.get_data()[0] for r in reqs])
+
+    single = await data_ingestor.fetch_forest_cover("r", bbox=bbox)
+    assert single["loss"] == {"pixels": 5009, "area_ha": 50.09, "patches": 1, "largest_ha": 50.0}
+    patch, = single["loss_patches"]
+    dx, dy = (bbox[2] - bbox[0]) / width, (bbox[3] - bbox[1]) / height
+    assert patch["pixels"] == 5000
+    assert patch["bbox"] == pytest.approx([90.0 + 240 * dx, 26.1 - 300 * dy, 90.0 + 290 * dx, 26.1 - 200 * dy])
+    assert patch["centroid"] == pytest.approx([90.0 + 265 * dx, 26.1 - 250 * dy])
+
+    batch, = await data_ingestor.fetch_forest_cover_batch([{"name": "r", "bbox": bbox}])
+    assert batch == single
+    plain = await data_ingestor.fetch_forest_cover("r", bbox=bbox, patches=False)
+    assert "loss" not in plain and plain["forest_percent"] == single["forest_percent"]
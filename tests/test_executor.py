@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from agents_system.executor import execute_actions
+from agents_system.mock_server import MockActionServer
+from agents_system.tools import ActionClient, HttpClient, RateLimiter
+
+
+def _plan(region):
+    return {"region": region, "steps": [{"step": "Create ground survey ticket", "eta": "3 days"}], "effort": "medium"}
+
+
+async def _client(server, **http_kwargs):
+    url = await server.start()
+    http = HttpClient(rate_per_destination=1000, burst=1000, backoff=0.01, **http_kwargs)
+    return ActionClient(slack_webhook_url=f"{url}/slack", jira_base_url=url, http=http, max_batch=20, max_delay=0.05)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_regions_are_batched_over_pooled_connections():
+    server = MockActionServer(latency=0.01)
+    client = await _client(server)
+    try:
+        results = await asyncio.gather(*(execute_actions(_plan(f"region-{i}"), client) for i in range(100)))
+    finally:
+        await client.close()
+        await server.stop()
+
+    ticket_ids = {r["ticket"]["ticket_id"] for r in results}
+    assert len(ticket_ids) == 100 and None not in ticket_ids
+    assert all(r["slack"]["ok"] for r in results)
+    assert len(server.jira_calls()) == 5  # 100 tickets / batches of 20
+    assert len(server.slack_messages()) == 5
+    assert sum(m.count("\n") + 1 for m in server.slack_messages()) == 100
+    assert len(server.connections) <= 10  # max_per_host, not one per region
+
+
+@pytest.mark.asyncio
+async def test_retries_with_backoff_on_server_errors():
+    server = MockActionServer(fail_first=2)
+    client = await _client(server)
+    try:
+        result = await client.post_slack("hello")
+    finally:
+        await client.close()
+        await server.stop()
+    assert result["ok"] is True
+    assert len(server.slack_messages()) == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=50, burst=1)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(6):
+        await limiter.acquire()
+    assert loop.time() - start >= 0.09  # 5 waits of 20ms
+
+
+@pytest.mark.asyncio
+async def test_unconfigured_destinations_do_not_call_out():
+    client = ActionClient()
+    result = await execute_actions(_plan("r1"), client)
+    assert result["ticket"]["status"] == "created"
+    assert result["slack"] == {"ok": False, "error": "no webhook configured"}
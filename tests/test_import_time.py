@@ -0,0 +1,50 @@
+"""Import-time budget for the entry points short-lived jobs and API workers start from.
+
+Each module is imported in a fresh interpreter with -X importtime; its
+cumulative import time must stay under the budget and the heavy dependencies
+that are only needed on first use must not be loaded.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> (budget in ms, modules that must not be imported yet)
+BUDGETS = {
+    "agents_system.orchestrator": (250, ("sentinelhub", "aiohttp", "pydantic", "openai")),  # CLI / run_for_region
+    "agents_system.agents": (150, ("sentinelhub", "aiohttp", "pydantic", "openai")),
+    "agents_system.config": (400, ()),  # pydantic only; settings are read on first use
+    "main": (600, ("uvicorn", "yaml", "sentinelhub", "psycopg2")),  # uvicorn worker app lookup
+}
+
+
+def _import(module: str):
+    code = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          timeout=60, cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    loaded = set(proc.stdout.strip().split(","))
+    cumulative_us = next(int(line.split("|")[1]) for line in proc.stderr.splitlines()
+                         if line.split("|")[-1].strip() == module)
+    return cumulative_us / 1000, loaded
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_budget(module):
+    budget_ms, deferred = BUDGETS[module]
+    elapsed_ms, loaded = _import(module)
+    early = [name for name in deferred if name in loaded]
+    assert not early, f"{module} imports {early} eagerly"
+    assert elapsed_ms < budget_ms, f"{module} took {elapsed_ms:.0f} ms to import (budget {budget_ms} ms)"
+
+
+def test_settings_do_not_require_credentials(monkeypatch, tmp_path):
+    from agents_system import config
+    monkeypatch.chdir(tmp_path)  # no .env here
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(config, "_settings", None)
+    assert config.settings.openai_api_key is None
+    assert config.get_settings() is config.settings
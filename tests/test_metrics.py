@@ -0,0 +1,77 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from agents_system import orchestrator
+from core.metrics import JsonlTraceWriter, Registry
+from core import metrics
+from src.api.routes import app
+
+
+def test_histogram_buckets_and_render():
+    registry = Registry()
+    hist = registry.histogram("stage_seconds", "Stage time", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, stage="fetch")
+    registry.counter("bytes_total").inc(1024, source='a"b')
+
+    text = registry.render()
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="fetch"} 3' in text
+    assert 'bytes_total{source="a\\"b"} 1024' in text
+    with pytest.raises(TypeError):
+        registry.counter("stage_seconds")
+
+
+def test_span_times_errors_and_traces(tmp_path):
+    registry = Registry()
+    records = []
+    registry.add_trace_hook(records.append)
+    trace = JsonlTraceWriter(str(tmp_path / "trace.jsonl"))
+    registry.add_trace_hook(trace)
+
+    with registry.span("work", stage="a"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span("work", stage="b"):
+            raise ValueError("boom")
+
+    assert registry.histogram("work_seconds").count(stage="a") == 1
+    assert registry.counter("work_errors_total").value(stage="b", error="ValueError") == 1
+    assert [(r["labels"]["stage"], r["error"]) for r in records] == [("a", None), ("b", "ValueError")]
+    lines = (tmp_path / "trace.jsonl").read_text().splitlines()  # line-buffered: readable before close
+    assert json.loads(lines[1])["error"] == "ValueError"
+    trace.close()
+    with registry.span("work", stage="c"):
+        pass
+    assert len((tmp_path / "trace.jsonl").read_text().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_region_stages_are_timed(monkeypatch):
+    async def fake_fetch(region, bbox=None, include_previous=True):
+        return {"region": region, "forest_percent": 40.0, "previous_forest_percent": 50.0}
+
+    async def fake_execute(plan):
+        return {"ticket": None, "slack": None}
+
+    monkeypatch.setattr(orchestrator, "fetch_forest_cover", fake_fetch)
+    monkeypatch.setattr(orchestrator, "execute_actions", fake_execute)
+    stages = metrics.histogram("region_stage_seconds")
+    before = {s: stages.count(stage=s) for s in ("fetch", "analyze", "plan", "execute", "report")}
+
+    await orchestrator.run_for_region("r1")
+
+    assert all(stages.count(stage=s) == n + 1 for s, n in before.items())
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    metrics.counter("raster_bytes_total").inc(10, source="network")
+    res = TestClient(app).get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE raster_bytes_total counter" in res.text
+    assert 'api_component_stat{component="response_cache",stat="hits"}' in res.text
@@ -1 +1,183 @@
-# Placeholder for test_models.py
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from models.ml_model import MLPClassifier, ModelRegistry, ZScoreAnomaly, feature_matrix, load_model
+from models.vision_model import PATCH_FEATURES, patch_features
+from pipelines.model_pipeline import ModelPipeline
+from src.agents.implementations import ALERT_TOPIC, SENSOR_TOPIC, AnalysisAgent
+from src.core.agent_communication import Message, MessageBroker, MessageType
+
+
+def normal_readings(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.normal(25, 5, n), rng.uniform(30, 90, n), rng.normal(60, 25, n),
+                            np.abs(rng.normal(20, 12, n)), rng.normal(415, 30, n)])
+
+
+def mlp(seed=0, hidden=16):
+    rng = np.random.default_rng(seed)
+    weights = [rng.normal(size=(5, hidden)).astype(np.float32), rng.normal(size=(hidden, 3)).astype(np.float32)]
+    biases = [np.zeros(hidden, np.float32), np.zeros(3, np.float32)]
+    return MLPClassifier(weights, biases, ["clear", "haze", "smoke"], mean=np.float32([25, 60, 60, 20, 415]),
+                         scale=np.float32([5, 20, 25, 12, 30]))
+
+
+def test_saved_models_load_memory_mapped_and_predict_the_same(tmp_path):
+    anomaly = ZScoreAnomaly.fit(normal_readings(), threshold=4.0)
+    classifier = mlp()
+    anomaly.save(str(tmp_path / "sensor-anomaly"))
+    classifier.save(str(tmp_path / "sensor-classifier"))
+
+    X = feature_matrix([{"temperature": 26.0, "aqi": 400.0}, {"temperature": 24.0, "humidity": 50.0, "aqi": 55.0}],
+                       anomaly.features)
+    assert np.isnan(X[0, 1])  # missing features are NaN
+
+    loaded = load_model(str(tmp_path / "sensor-anomaly"))
+    assert isinstance(loaded.mean, np.memmap)
+    assert loaded.predict(X) == anomaly.predict(X)
+    assert [r["is_anomaly"] for r in loaded.predict(X)] == [True, False]
+
+    loaded = load_model(str(tmp_path / "sensor-classifier"))
+    assert isinstance(loaded.weights[0], np.memmap)
+    batch = loaded.predict(X)
+    assert batch == classifier.predict(X)
+    assert batch == [loaded.predict(X[i:i + 1])[0] for i in range(len(X))]
+
+
+def test_registry_loads_each_model_once(tmp_path):
+    ZScoreAnomaly.fit(normal_readings()).save(str(tmp_path / "sensor-anomaly"))
+    registry = ModelRegistry()
+    assert registry.discover(str(tmp_path)) == ["sensor-anomaly"]
+    calls = []
+    registry.register("slow", loader=lambda: calls.append(1) or mlp())
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("slow"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(m is models[0] for m in models)
+    assert registry.get("sensor-anomaly") is registry.get("sensor-anomaly")
+    assert registry.stats["loads"] == 2
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+class CountingModel:
+    name = "counting"
+    features = ("x",)
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        if self.fail:
+            raise ValueError("bad weights")
+        return [{"double": 2 * float(x)} for x in X[:, 0]]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_concurrent_requests_under_deadline():
+    registry = ModelRegistry()
+    model = CountingModel()
+    registry.register("counting", model)
+    registry.register("broken", CountingModel(fail=True))
+    pipeline = ModelPipeline(registry, max_batch_size=32, max_latency=0.02, min_batch_size=32)
+
+    results = await pipeline.predict_many("counting", [[i] for i in range(100)])
+    assert [r["double"] for r in results] == [2.0 * i for i in range(100)]
+    assert sum(model.batches) == 100 and len(model.batches) <= 5 and max(model.batches) <= 32
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await pipeline.predict("counting", {"x": 3}) == {"double": 6.0}
+    assert loop.time() - started < 0.2  # a lone request waits for the deadline, not a full batch
+
+    outcomes = await asyncio.gather(*(pipeline.predict("broken", [i]) for i in range(3)), return_exceptions=True)
+    assert all(isinstance(o, ValueError) for o in outcomes)
+    with pytest.raises(ValueError):
+        await pipeline.predict("counting", [1, 2])  # wrong feature count fails alone
+
+    metrics = pipeline.metrics()
+    assert metrics["requests"] == 104 and metrics["errors"] == 3
+    assert metrics["mean_batch_size"] > 10 and metrics["p99_latency"] is not None
+    await pipeline.stop()
+    with pytest.raises(RuntimeError):
+        await pipeline.predict("counting", [1])
+
+    # Default min_batch_size=1: no waiting for batch-mates that are not coming,
+    # but requests issued together still share a batch.
+    model.batches.clear()
+    greedy = ModelPipeline(registry, max_batch_size=256, max_latency=5.0)
+    started = loop.time()
+    await greedy.predict("counting", [1])
+    assert loop.time() - started < 1.0
+    await greedy.predict_many("counting", [[i] for i in range(50)])
+    assert model.batches == [1, 50]
+    await greedy.stop()
+
+
+@pytest.mark.asyncio
+async def test_analysis_agent_publishes_model_alerts():
+    registry = ModelRegistry()
+    registry.register("sensor-anomaly", ZScoreAnomaly.fit(normal_readings(), threshold=4.0))
+    pipeline = ModelPipeline(registry, max_latency=0.01)
+    broker = MessageBroker()
+    analysis = AnalysisAgent("analysis", broker, thresholds={"temperature": 100.0}, engine=pipeline)
+    broker.register_agent("watcher")
+    broker.subscribe("watcher", ALERT_TOPIC)
+
+    readings = [{"sensor_id": f"s{i}", "timestamp": "2025-01-01T00:00:00",
+                 "measurements": {"temperature": 25.0, "humidity": 60.0, "aqi": 60.0, "pm25": 20.0, "co2": 415.0}}
+                for i in range(20)]
+    readings[7]["measurements"]["co2"] = 900.0
+    alerts = await analysis.score(readings)
+    assert [(a["sensor_id"], a["metric"]) for a in alerts] == [("s7", "model:sensor-anomaly")]
+
+    task = asyncio.create_task(analysis.start())
+    for reading in readings:
+        await broker.publish(SENSOR_TOPIC, Message.create("sensing", "", MessageType.DATA, reading))
+    received = await broker.receive_batch("watcher", 10, 2.0)
+    await analysis.stop()
+    task.cancel()
+    await pipeline.stop()
+    assert [m.payload["sensor_id"] for m in received] == ["s7"]
+
+
+class FailingEngine:
+    async def predict(self, model, features):
+        raise KeyError(f"unknown model {model!r}")
+
+
+@pytest.mark.asyncio
+async def test_analysis_agent_keeps_threshold_alerts_when_the_model_fails():
+    broker = MessageBroker()
+    analysis = AnalysisAgent("analysis", broker, thresholds={"temperature": 30.0}, engine=FailingEngine())
+    broker.register_agent("watcher")
+    broker.subscribe("watcher", ALERT_TOPIC)
+
+    task = asyncio.create_task(analysis.start())
+    for round_ in range(2):  # the agent keeps running after a failed batch
+        for i, temperature in enumerate((25.0, 35.0)):
+            reading = {"sensor_id": f"s{round_}{i}", "measurements": {"temperature": temperature}}
+            await broker.publish(SENSOR_TOPIC, Message.create("sensing", "", MessageType.DATA, reading))
+        received = await broker.receive_batch("watcher", 10, 2.0)
+        assert [(m.payload["sensor_id"], m.payload["metric"]) for m in received] == [(f"s{round_}1", "temperature")]
+    assert analysis.running and analysis.stats["errors"] == 4
+    await analysis.stop()
+    task.cancel()
+
+
+def test_patch_features():
+    patches = [{"area_ha": 50.0, "bbox": [90.0, 26.0, 90.005, 26.001]},
+               {"area_ha": 1.0, "bbox": [90.0, 26.0, 90.001, 26.001]}]
+    X = patch_features(patches)
+    assert X.shape == (2, len(PATCH_FEATURES))
+    assert X[0, 0] == pytest.approx(np.log10(50.0))
+    assert X[0, 2] > 4 > X[1, 2]  # long and thin vs roughly square
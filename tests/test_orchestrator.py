@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+import pytest
+from agents_system import orchestrator
+
+
+def _patch_stages(monkeypatch, fetch_delays):
+    async def fake_fetch(region, bbox=None, include_previous=True):
+        await asyncio.sleep(fetch_delays.get(region, 0.0))
+        if region == "broken":
+            raise RuntimeError("no imagery")
+        return {"region": region, "bbox": bbox, "forest_percent": 50.0, "previous_forest_percent": 50.0}
+
+    async def fake_execute(plan):
+        return {"ticket": None, "slack": None}
+
+    monkeypatch.setattr(orchestrator, "fetch_forest_cover", fake_fetch)
+    monkeypatch.setattr(orchestrator, "execute_actions", fake_execute)
+
+
+def test_load_region_manifest(tmp_path):
+    path = tmp_path / "regions.json"
+    path.write_text(json.dumps({"regions": [{"name": "assam", "bbox": [90, 26, 91, 27]}, {"name": "default"}]}))
+    regions = orchestrator.load_region_manifest(str(path))
+    assert regions == [{"name": "assam", "bbox": (90.0, 26.0, 91.0, 27.0)}, {"name": "default", "bbox": None}]
+
+
+@pytest.mark.asyncio
+async def test_run_for_regions_concurrent_and_streamed(monkeypatch):
+    delays = {f"r{i}": 0.2 for i in range(10)}
+    delays["fast"] = 0.0
+    _patch_stages(monkeypatch, delays)
+    regions = [{"name": name, "bbox": None} for name in delays]
+
+    start = time.perf_counter()
+    seen = [out["region"] async for out in orchestrator.run_for_regions(regions, concurrency=len(regions))]
+    elapsed = time.perf_counter() - start
+
+    assert seen[0] == "fast"
+    assert sorted(seen) == sorted(delays)
+    # Roughly the slowest region, not the sum (10 x 0.2s).
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_run_for_regions_isolates_failures_and_timeouts(monkeypatch):
+    _patch_stages(monkeypatch, {"slow": 5.0})
+    regions = [{"name": "ok"}, {"name": "broken"}, {"name": "slow"}]
+
+    results = {out["region"]: out async for out in orchestrator.run_for_regions(regions, stage_timeout=0.2)}
+
+    assert "report" in results["ok"]
+    assert "RuntimeError" in results["broken"]["error"]
+    assert "fetch" in results["slow"]["error"]
+
+
+@pytest.mark.asyncio
+async def test_offline_sweep_against_fake_backends():
+    from benchmarks.bench_region_pipeline import check, run_scenario
+
+    result = await run_scenario(regions=20, raster_px=64, sh_latency=0.0, action_latency=0.0, concurrency=8)
+
+    assert result["errors"] == 0
+    assert result["sentinelhub_requests"] == 40  # current + previous window per region
+    assert 0 < result["jira_calls"] < 20  # tickets went out in batches
+    assert result["p50_ms"] <= result["p99_ms"]
+    assert check(result, {"regions=20,px=64": {"min_throughput": 0.001, "max_p99_ms": 60_000}}) == []
+    assert check(dict(result, throughput=0.0), {"regions=20,px=64": {"min_throughput": 1}})
+
+
+@pytest.mark.asyncio
+async def test_single_region_cli_run_sends_at_once_and_closes_the_session(monkeypatch):
+    from agents_system import tools
+    from agents_system.mock_server import MockActionServer
+
+    async def fake_fetch(region, bbox=None, include_previous=True):
+        return {"region": region, "forest_percent": 40.0, "previous_forest_percent": 50.0}
+
+    server = MockActionServer()
+    url = await server.start()
+    clients = []
+
+    def from_settings(**kwargs):
+        clients.append(tools.ActionClient(slack_webhook_url=f"{url}/slack", jira_base_url=url, **kwargs))
+        return clients[-1]
+
+    monkeypatch.setattr(orchestrator, "fetch_forest_cover", fake_fetch)
+    monkeypatch.setattr(tools.ActionClient, "from_settings", staticmethod(from_settings))
+    monkeypatch.setattr(tools, "_client", None)
+    try:
+        start = time.perf_counter()
+        out = await orchestrator._sweep_one("cleared", None)
+        elapsed = time.perf_counter() - start
+    finally:
+        await server.stop()
+
+    assert out["execution"]["slack"]["ok"] is True and len(server.jira_calls()) == 1
+    assert elapsed < 0.5  # no batching delay before the ticket and the Slack post
+    assert tools._client is None and clients[0].http._session is None
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from agents_system.executor import execute_actions
+from agents_system.mock_server import MockActionServer
+from agents_system.outbox import DEAD, DELIVERED, Outbox, OutboxDrainer
+from agents_system.tools import ActionClient, HttpClient
+
+
+def _plan(region):
+    return {"region": region, "steps": [{"step": "Create ground survey ticket", "eta": "3 days"}], "effort": "medium"}
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = Outbox(f"sqlite:///{tmp_path / 'greenmind.db'}", backoff=0.0)
+    yield box
+    box.close()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_is_idempotent_per_region_date_step(outbox):
+    first = await execute_actions(_plan("r1"), outbox=outbox, date="2025-01-10")
+    again = await execute_actions(_plan("r1"), outbox=outbox, date="2025-01-10")
+    other_day = await execute_actions(_plan("r1"), outbox=outbox, date="2025-01-11")
+    assert first["ticket"]["queued"] is True
+    assert again["ticket"]["queued"] is False
+    assert other_day["ticket"]["queued"] is True
+    assert outbox.counts() == {"pending": 2}
+
+
+@pytest.mark.asyncio
+async def test_drainer_delivers_tickets_then_notifications(outbox):
+    server = MockActionServer()
+    url = await server.start()
+    client = ActionClient(slack_webhook_url=f"{url}/slack", jira_base_url=url,
+                          http=HttpClient(rate_per_destination=1000, burst=1000), max_delay=0.01)
+    try:
+        for i in range(30):
+            await execute_actions(_plan(f"r{i}"), outbox=outbox, date="2025-01-10")
+        drainer = OutboxDrainer(outbox, client, concurrency=10, poll_interval=0.01)
+        drainer.start()
+        await asyncio.sleep(0.3)
+        await drainer.stop()
+    finally:
+        await client.close()
+        await server.stop()
+
+    assert outbox.counts() == {DELIVERED: 60}
+    ticket = outbox.get("r7:2025-01-10:Create ground survey ticket")
+    slack = outbox.get("r7:2025-01-10:Create ground survey ticket:slack")
+    assert ticket["result"]["ticket_id"].startswith("GM-")
+    assert slack["status"] == DELIVERED
+    assert sum(m.count("Created ticket GM-") for m in server.slack_messages()) == 30
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_then_dead_lettered(tmp_path):
+    box = Outbox(f"sqlite:///{tmp_path / 'greenmind.db'}", backoff=0.0, max_attempts=2)
+
+    class Failing:
+        async def post_slack(self, message):
+            raise ConnectionError("slack down")
+
+    box.enqueue("slack", {"message": "hi"}, "k1")
+    drainer = OutboxDrainer(box, Failing())
+    assert await drainer.drain_once() == 2  # first attempt + one retry
+    assert box.get("k1")["status"] == DEAD
+    assert "slack down" in box.get("k1")["result"]["error"]
+    box.close()
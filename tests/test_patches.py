@@ -0,0 +1,105 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from agents_system.analyzer import detect_anomaly
+from agents_system.data_ingestor.patches import PatchCollector, label_tile, loss_map
+from agents_system.planner import build_plan
+from agents_system.reporter import make_report
+
+
+def flood_fill(mask, connectivity):
+    """Reference labeling: (pixels, row_min, col_min, row_max, col_max) per component."""
+    height, width = mask.shape
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        steps += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    seen = np.zeros_like(mask, dtype=bool)
+    out = []
+    for r, c in zip(*np.nonzero(mask)):
+        if seen[r, c]:
+            continue
+        seen[r, c] = True
+        queue, pixels = deque([(r, c)]), []
+        while queue:
+            y, x = queue.popleft()
+            pixels.append((y, x))
+            for dy, dx in steps:
+                yy, xx = y + dy, x + dx
+                if 0 <= yy < height and 0 <= xx < width and mask[yy, xx] and not seen[yy, xx]:
+                    seen[yy, xx] = True
+                    queue.append((yy, xx))
+        ys, xs = zip(*pixels)
+        out.append((len(pixels), min(ys), min(xs), max(ys), max(xs)))
+    return sorted(out)
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_label_tile_matches_flood_fill(connectivity):
+    rng = np.random.default_rng(connectivity)
+    for density in (0.2, 0.45, 0.6):
+        mask = rng.random((41, 57)) < density
+        tile = label_tile(mask, connectivity)
+        got = sorted(zip(tile.pixels.tolist(), *tile.bounds.T.tolist()))
+        assert got == flood_fill(mask, connectivity)
+        assert tile.loss_pixels == mask.sum()
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_tiled_patches_match_whole_raster(connectivity):
+    rng = np.random.default_rng(7)
+    mask = rng.random((90, 120)) < 0.4
+    mask[29, 39] = mask[30, 40] = True  # touch diagonally across a tile corner
+    bbox, shape = (90.0, 26.0, 90.012, 26.009), mask.shape
+
+    whole = PatchCollector(bbox, shape, connectivity=connectivity, min_pixels=3)
+    whole.add((0, 0), label_tile(mask, connectivity))
+    tiled = PatchCollector(bbox, shape, connectivity=connectivity, min_pixels=3)
+    for r0, r1 in [(0, 30), (30, 61), (61, 90)]:
+        for c0, c1 in [(0, 40), (40, 77), (77, 120)]:
+            tiled.add((r0, c0), label_tile(mask[r0:r1, c0:c1], connectivity))
+
+    assert tiled.result(limit=None) == whole.result(limit=None)
+    summary, patches = tiled.result(limit=5)
+    assert len(patches) == 5 and summary["largest_ha"] == patches[0]["area_ha"]
+    assert summary["patches"] == sum(1 for p in flood_fill(mask, connectivity) if p[0] >= 3)
+
+
+def test_patch_geometry_and_loss_map():
+    prev = np.full((20, 30), 0.8, dtype=np.float32)
+    curr = prev.copy()
+    curr[4:8, 10:20] = 0.1  # 40 px cleared
+    curr[15, 2] = 0.75  # small NDVI dip, still forest
+    curr[0, 0] = np.nan  # cloud
+    loss = loss_map(prev, prev >= 0.4, curr, curr >= 0.4)
+    assert loss.sum() == 40
+
+    collector = PatchCollector((0.0, 0.0, 0.03, 0.02), loss.shape)  # 0.001 deg pixels
+    collector.add((0, 0), label_tile(loss))
+    summary, (patch,) = collector.result()
+    assert summary == {"pixels": 40, "area_ha": 0.4, "patches": 1, "largest_ha": 0.4}
+    assert patch["centroid"] == pytest.approx([0.015, 0.014])
+    assert patch["bbox"] == pytest.approx([0.01, 0.012, 0.02, 0.016])
+
+
+@pytest.mark.asyncio
+async def test_large_patch_drives_anomaly_plan_and_report():
+    patches = [{"pixels": 1200, "area_ha": 12.0, "centroid": [90.5, 26.5], "bbox": [90.49, 26.49, 90.51, 26.51]},
+               {"pixels": 30, "area_ha": 0.3, "centroid": [90.1, 26.1], "bbox": [90.09, 26.09, 90.11, 26.11]}]
+    metrics = {"region": "r", "date": "2025-01-10", "forest_percent": 70.0, "previous_forest_percent": 70.5,
+               "loss": {"pixels": 1230, "area_ha": 12.3, "patches": 2, "largest_ha": 12.0},
+               "loss_patches": patches}
+
+    analysis = await detect_anomaly(metrics)
+    assert analysis["is_anomaly"] and analysis["reason"] == "loss patch of 12 ha"
+    assert not (await detect_anomaly(metrics, patch_threshold_ha=20.0))["is_anomaly"]
+
+    plan = await build_plan(analysis, "r")
+    survey = next(s for s in plan["steps"] if s["step"] == "Create ground survey ticket")
+    assert [t["centroid"] for t in survey["targets"]] == [[90.5, 26.5], [90.1, 26.1]]
+    assert plan["steps"][0]["step"] == "Validate with higher-res imagery"
+
+    report = await make_report(metrics, analysis, plan, {})
+    assert "12.3 ha lost in 2 patches (largest 12.0 ha)" in report
+    assert "- 12.0 ha at 26.50000, 90.50000" in report
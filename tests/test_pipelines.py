@@ -1 +1,127 @@
-# Placeholder for test_pipelines.py
+import asyncio
+import pytest
+from pipelines.data_pipeline import DataPipeline, MemorySink
+from src.agents.implementations import SENSOR_TOPIC, SensingAgent
+from src.core.agent_communication import MessageBroker, MessageType
+
+
+def _reading(i):
+    return {"sensor_id": f"sensor_{i % 7:03d}", "timestamp": "2025-01-01T00:00:00",
+            "measurements": {"temperature": 20.0 + i % 10, "aqi": 50}}
+
+
+class SlowSink:
+    """Write latency grows with batch size, like a real database round-trip."""
+
+    def __init__(self, per_record=0.0, fixed=0.0, fail_first=0):
+        self.per_record = per_record
+        self.fixed = fixed
+        self.fail_first = fail_first
+        self.batches = []
+
+    async def write_batch(self, records):
+        await asyncio.sleep(self.fixed + self.per_record * len(records))
+        if self.fail_first:
+            self.fail_first -= 1
+            raise ConnectionError("db unavailable")
+        self.batches.append(records)
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_size_and_drains_everything_on_stop():
+    sink = SlowSink()
+    pipeline = DataPipeline(batch_size=50, sink=sink, max_latency=10.0, min_batch_size=50, max_batch_size=50)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(1030):
+        await pipeline.submit(_reading(i))
+    await pipeline.stop_processing()
+    await task
+
+    sizes = [len(b) for b in sink.batches]
+    assert sum(sizes) == 1030
+    assert sizes[:-1] == [50] * 20 and sizes[-1] == 30
+    assert pipeline.metrics()["persisted"] == 1030
+    with pytest.raises(RuntimeError):
+        await pipeline.submit(_reading(0))
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_max_latency():
+    sink = SlowSink()
+    pipeline = DataPipeline(batch_size=1000, sink=sink, max_latency=0.1)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(3):
+        await pipeline.submit(_reading(i))
+    await asyncio.sleep(0.3)
+    assert [len(b) for b in sink.batches] == [3]
+    assert pipeline.metrics()["p99_latency"] < 0.3
+    await pipeline.stop_processing()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_invalid_records_are_dropped_and_valid_ones_enriched():
+    sink = MemorySink()
+    pipeline = DataPipeline(batch_size=10, sink=sink, max_latency=0.05)
+    task = asyncio.create_task(pipeline.start_processing())
+    await pipeline.submit(_reading(1))
+    await pipeline.submit({"sensor_id": "s", "timestamp": "2025-01-01T00:00:00", "measurements": {"t": float("nan")}})
+    await pipeline.submit({"sensor_id": "s", "measurements": {"t": 1.0}})
+    await pipeline.submit({"sensor_id": "s", "timestamp": "not a date", "measurements": {"t": 1.0}})
+    await pipeline.stop_processing()
+    await task
+    assert len(sink.records) == 1
+    assert sink.records[0]["ts"] == 1735689600.0  # naive 2025-01-01T00:00:00 read as UTC
+    assert pipeline.stats["invalid"] == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_size_adapts_to_write_latency():
+    slow = SlowSink(per_record=0.001)  # 100 records -> 100ms
+    pipeline = DataPipeline(batch_size=100, sink=slow, target_write_latency=0.02, min_batch_size=5)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(300):
+        await pipeline.submit(_reading(i))
+    await pipeline.stop_processing()
+    await task
+    assert pipeline.batch_size <= 30  # settles around target / per-record cost = 20
+
+    fast = SlowSink()
+    pipeline = DataPipeline(batch_size=10, sink=fast, target_write_latency=0.02, max_batch_size=200)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(2000):
+        await pipeline.submit(_reading(i))
+    await pipeline.stop_processing()
+    await task
+    assert pipeline.batch_size > 10
+    assert sum(len(b) for b in fast.batches) == 2000
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_retried():
+    sink = SlowSink(fail_first=2)
+    pipeline = DataPipeline(batch_size=10, sink=sink, retry_backoff=0.01)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(10):
+        await pipeline.submit(_reading(i))
+    await pipeline.stop_processing()
+    await task
+    assert pipeline.stats["write_errors"] == 2
+    assert sum(len(b) for b in sink.batches) == 10 and not pipeline.failed_batches
+
+
+@pytest.mark.asyncio
+async def test_attached_broker_readings_reach_the_sink():
+    broker = MessageBroker()
+    sink = MemorySink()
+    pipeline = DataPipeline(batch_size=5, sink=sink, max_latency=0.05)
+    pipeline.attach(broker)
+    task = asyncio.create_task(pipeline.start_processing())
+    sensing = SensingAgent("sensing", broker, ["sensor_001", "sensor_002"])
+    for _ in range(4):
+        for sensor_id in sensing.sensor_ids:
+            await sensing.publish(SENSOR_TOPIC, MessageType.DATA, await sensing.collect_data(sensor_id))
+    await pipeline.stop_processing()
+    await task
+    assert len(sink.records) == 8
+    assert {r["sensor_id"] for r in sink.records} == {"sensor_001", "sensor_002"}
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from agents_system.data_ingestor import reduce as reducer
+from agents_system.data_ingestor.reduce import merge_stats, reduce_ndvi
+
+
+def _raster(shape, nan_fraction=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    ndvi = rng.uniform(-1.0, 1.0, size=shape).astype(np.float32)
+    ndvi[rng.random(shape) < nan_fraction] = np.nan
+    mask = (ndvi >= 0.4).astype(np.uint8)
+    return ndvi, mask
+
+
+def _reference(ndvi, mask):
+    valid = ~np.isnan(ndvi)
+    return float(np.nanmean(ndvi.astype(float))), 100.0 * (mask.astype(bool) & valid).sum() / valid.sum()
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (37, 53), (700, 800)])
+def test_reduce_matches_reference(monkeypatch, shape):
+    monkeypatch.setattr(reducer, "_BLOCK_PIXELS", 1000)  # force many blocks
+    ndvi, mask = _raster(shape, nan_fraction=0.0 if shape == (1, 1) else 0.1)
+    stats = reduce_ndvi(ndvi, mask)
+    mean, pct = _reference(ndvi, mask)
+    assert stats.valid_count == int((~np.isnan(ndvi)).sum())
+    assert stats.percent == pytest.approx(pct, rel=1e-12)
+    assert stats.mean == pytest.approx(mean, rel=1e-9)
+    expected_hist = np.histogram(ndvi[~np.isnan(ndvi)], bins=reducer.HIST_BINS, range=reducer.HIST_RANGE)[0]
+    assert stats.histogram.sum() == stats.valid_count
+    # Binning is done in float32, so a handful of values sitting on bin edges may land one bin over.
+    assert np.abs(stats.histogram - expected_hist).sum() <= 1e-4 * stats.valid_count + 2
+
+
+def test_percentiles_within_one_bin():
+    ndvi, mask = _raster((500, 500), nan_fraction=0.2)
+    stats = reduce_ndvi(ndvi, mask)
+    exact = np.nanpercentile(ndvi, [10, 50, 90])
+    approx = stats.percentiles((10, 50, 90))
+    width = 2.0 / reducer.HIST_BINS
+    for q, expected in zip((10, 50, 90), exact):
+        assert abs(approx[q] - expected) <= width
+
+
+def test_merge_of_tiles_equals_whole():
+    ndvi, mask = _raster((300, 300))
+    tiles = [reduce_ndvi(ndvi[r:r + 100, c:c + 150], mask[r:r + 100, c:c + 150])
+             for r in range(0, 300, 100) for c in range(0, 300, 150)]
+    merged, whole = merge_stats(tiles), reduce_ndvi(ndvi, mask)
+    assert (merged.valid_count, merged.vegetated_count) == (whole.valid_count, whole.vegetated_count)
+    assert merged.mean == pytest.approx(whole.mean, rel=1e-12)
+    np.testing.assert_array_equal(merged.histogram, whole.histogram)
+
+
+def test_all_nan_raster():
+    stats = reduce_ndvi(np.full((4, 4), np.nan, dtype=np.float32), np.zeros((4, 4), dtype=np.uint8))
+    assert stats.valid_count == 0
+    assert np.isnan(stats.mean) and np.isnan(stats.percent)
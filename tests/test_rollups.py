@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from core.rollups import DAY, HOUR, MINUTE, RollupEngine, lttb, parse_range
+from src.api import routes
+
+T0 = 1735689600  # 2025-01-01T00:00:00Z
+
+
+def _reading(ts, sensor="s1", **measurements):
+    return {"ts": ts, "sensor_id": sensor, "measurements": measurements}
+
+
+def test_buckets_keep_min_max_mean_count_per_sensor_and_overall():
+    engine = RollupEngine()
+    engine.ingest([_reading(T0 + 5, temperature=20.0), _reading(T0 + 50, temperature=30.0),
+                   _reading(T0 + 70, temperature=10.0), _reading(T0 + 10, "s2", temperature=40.0)])
+
+    minute = engine.query(["temperature"], T0, T0 + 120, sensor_id="s1")
+    assert minute["resolution"] == MINUTE
+    assert [p["t"] for p in minute["points"]] == [T0, T0 + 60]
+    assert minute["points"][0]["temperature"] == {"min": 20.0, "max": 30.0, "mean": 25.0, "count": 2}
+
+    overall = engine.query(["temperature"], T0, T0 + 60)
+    assert overall["points"][0]["temperature"] == {"min": 20.0, "max": 40.0, "mean": 30.0, "count": 3}
+
+    hourly = engine._series[(HOUR, "s1", "temperature")].aggs[T0]
+    assert hourly == [10.0, 30.0, 60.0, 3]
+
+
+def test_resolution_is_chosen_from_the_range():
+    engine = RollupEngine()
+    assert engine.resolution_for(parse_range("24h")) == MINUTE
+    assert engine.resolution_for(parse_range("7d")) == HOUR
+    assert engine.resolution_for(parse_range("30d")) == HOUR
+    assert engine.resolution_for(parse_range("365d")) == DAY
+    with pytest.raises(ValueError):
+        parse_range("yesterday")
+
+
+def test_long_history_queries_touch_a_bounded_number_of_buckets():
+    engine = RollupEngine()
+    # 30 days of one reading per minute.
+    engine.ingest(_reading(T0 + i * 60, temperature=float(i % 1440)) for i in range(30 * 1440))
+    result = engine.query(["temperature", "aqi"], T0, T0 + 30 * DAY, max_points=200)
+    assert result["resolution"] == HOUR
+    assert len(result["points"]) == 200
+    assert result["points"][0]["aqi"] is None
+    # 1-minute buckets older than the retention window were dropped.
+    assert len(engine._series[(MINUTE, "s1", "temperature")].starts) <= 2 * 1440 + 1
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[437] = 100.0
+    idx = lttb(x, y, 50)
+    assert len(idx) == 50 and idx[0] == 0 and idx[-1] == 999
+    assert 437 in idx
+    assert list(lttb(x[:10], y[:10], 50)) == list(range(10))
+
+
+def test_environmental_data_endpoint_reads_rollups(monkeypatch):
+    engine = RollupEngine()
+    now = 1_800_000_000
+    engine.ingest(_reading(now - i * 60, temperature=21.0, humidity=60.0, aqi=40.0, co2=415.0) for i in range(600))
+    monkeypatch.setattr(routes, "rollups", engine)
+    monkeypatch.setattr(routes.time, "time", lambda: now + 1)
+    client = TestClient(routes.app)
+
+    body = client.get("/api/v1/environmental-data", params={"range": "24h", "max_points": 100}).json()
+    assert body["resolution"] == "1m"
+    assert len(body["data"]) == 100
+    assert body["data"][0] == {**body["data"][0], "temp": 21.0, "humidity": 60.0, "aqi": 40.0, "co2": 415.0}
+    assert client.get("/api/v1/environmental-data", params={"range": "7d"}).json()["resolution"] == "1h"
+    assert client.get("/api/v1/environmental-data", params={"range": "soon"}).status_code == 400
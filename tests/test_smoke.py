@@ -1,12 +1,16 @@
-# Placeholder for test_agents.py
 import asyncio
+import os
+import pytest
 from agents_system.orchestrator import run_for_region
 
 
+@pytest.mark.skipif(not (os.getenv("SENTINELHUB_CLIENT_ID") and os.getenv("SENTINELHUB_CLIENT_SECRET")),
+                    reason="needs SentinelHub credentials and network access; "
+                           "see benchmarks/bench_region_pipeline.py for the offline run")
 def test_run_smoke():
-res = asyncio.run(run_for_region('unit-test-region'))
-assert 'metrics' in res
-assert 'analysis' in res
-assert 'plan' in res
-assert 'execution' in res
-assert 'report' in
\ No newline at end of file
+    res = asyncio.run(run_for_region('unit-test-region'))
+    assert 'metrics' in res
+    assert 'analysis' in res
+    assert 'plan' in res
+    assert 'execution' in res
+    assert 'report' in res
@@ -0,0 +1,93 @@
+import asyncio
+import random
+import pytest
+from fastapi.testclient import TestClient
+from core.rollups import RollupEngine
+from core.spatial import ALERT, REGION, SENSOR, SpatialIndex, intersects, parse_bbox
+from src.api import routes
+from src.core.agent_communication import Message, MessageBroker, MessageType
+
+
+def test_query_matches_a_linear_scan():
+    rng = random.Random(7)
+    index = SpatialIndex(cell_size=1.0)
+    boxes = {}
+    for i in range(3000):
+        x, y = rng.uniform(-180, 170), rng.uniform(-90, 80)
+        w, h = (0, 0) if i % 2 else (rng.uniform(0, 5), rng.uniform(0, 5))
+        boxes[f"e{i}"] = (x, y, x + w, y + h)
+        index.insert(f"e{i}", SENSOR if i % 2 else REGION, boxes[f"e{i}"])
+    for _ in range(50):
+        x, y = rng.uniform(-180, 160), rng.uniform(-90, 70)
+        viewport = (x, y, x + rng.uniform(0.1, 20), y + rng.uniform(0.1, 20))
+        expected = {k for k, b in boxes.items() if intersects(b, viewport)}
+        assert {e.id for e in index.query(viewport)} == expected
+
+
+def test_moves_removals_and_oversized_entities():
+    index = SpatialIndex(cell_size=0.5, max_cells=100)
+    index.insert("s1", SENSOR, (90.5, 26.5, 90.5, 26.5))
+    index.insert("s1", SENSOR, (10.0, 10.0, 10.0, 10.0))
+    assert index.query((90, 26, 91, 27), SENSOR) == []
+    assert [e.id for e in index.query((9, 9, 11, 11))] == ["s1"]
+    index.insert("asia", REGION, (60.0, 0.0, 150.0, 55.0))  # far more than 100 cells
+    assert [e.id for e in index.containing(90.5, 26.5)] == ["asia"]
+    assert index.remove("asia").id == "asia"
+    assert index.containing(90.5, 26.5) == [] and len(index) == 1
+
+
+def test_parse_bbox_rejects_bad_input():
+    assert parse_bbox("90,26,91,27") == (90.0, 26.0, 91.0, 27.0)
+    for bad in ("1,2,3", "91,26,90,27", "a,b,c,d"):
+        with pytest.raises(ValueError):
+            parse_bbox(bad)
+
+
+@pytest.mark.asyncio
+async def test_attach_tracks_sensors_and_recent_alerts():
+    broker = MessageBroker()
+    index = SpatialIndex()
+    index.insert("kaziranga", REGION, (93.0, 26.4, 93.6, 26.8))
+    task = index.attach(broker, max_alerts=2)
+    for i in range(3):
+        await broker.publish("alerts", Message.create("analysis_agent", "", MessageType.ALERT, {
+            "metric": "aqi", "value": 150 + i, "location": {"lon": 93.2, "lat": 26.6}}))
+    await broker.publish("sensor_data", Message.create("sensing", "", MessageType.DATA, {
+        "sensor_id": "sensor_001", "location": {"lon": 72.8, "lat": 19.0}, "measurements": {}}))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    task.cancel()
+    alerts = index.query((93, 26, 94, 27), ALERT)
+    assert sorted(a.data["value"] for a in alerts) == [151, 152]
+    assert all(a.data["regions"] == ["kaziranga"] for a in alerts)
+    assert [e.id for e in index.query((72, 18, 73, 20), SENSOR)] == ["sensor_001"]
+
+
+def test_api_bbox_filters(monkeypatch):
+    index = SpatialIndex()
+    index.insert("mumbai", REGION, (72.7, 18.8, 73.1, 19.3))
+    index.insert("a1", ALERT, (72.8, 19.0, 72.8, 19.0), {"id": "a1", "timestamp": "2025-01-01T00:00:00"})
+    index.insert("a2", ALERT, (77.2, 28.6, 77.2, 28.6), {"id": "a2", "timestamp": "2025-01-01T00:01:00"})
+    index.insert("s_mum", SENSOR, (72.8, 19.0, 72.8, 19.0))
+    index.insert("s_del", SENSOR, (77.2, 28.6, 77.2, 28.6))
+    engine = RollupEngine()
+    now = 1_800_000_000
+    engine.ingest([{"ts": now - 30, "sensor_id": "s_mum", "measurements": {"temperature": 30.0}},
+                   {"ts": now - 30, "sensor_id": "s_del", "measurements": {"temperature": 10.0}}])
+    monkeypatch.setattr(routes, "spatial", index)
+    monkeypatch.setattr(routes, "rollups", engine)
+    monkeypatch.setattr(routes.time, "time", lambda: now)
+    monkeypatch.setattr(routes, "response_cache", routes.ResponseCache())
+    client = TestClient(routes.app)
+
+    body = client.get("/api/v1/alerts", params={"bbox": "72,18,74,20"}).json()
+    assert [a["id"] for a in body["alerts"]] == ["a1"]
+    assert client.get("/api/v1/alerts", params={"bbox": "60,0,90,40"}).json()["total"] == 2
+    assert client.get("/api/v1/alerts", params={"bbox": "nope"}).status_code == 400
+
+    data = client.get("/api/v1/environmental-data", params={"range": "1h", "bbox": "72,18,74,20"}).json()
+    assert [p["temp"] for p in data["data"]] == [30.0]
+    everywhere = client.get("/api/v1/environmental-data", params={"range": "1h"}).json()
+    assert [p["temp"] for p in everywhere["data"]] == [20.0]
+
+    assert client.get("/api/v1/regions", params={"lon": 72.9, "lat": 19.1}).json()["regions"][0]["name"] == "mumbai"
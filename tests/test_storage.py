@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+import pytest
+from core.storage import WriteBehindBuffer, _month_bounds, copy_csv, month_key, open_storage, reading_row
+from pipelines.data_pipeline import DataPipeline
+
+
+def _reading(i, ts=1735689600.0):  # 2025-01-01T00:00:00Z
+    return {"sensor_id": f"sensor_{i % 10:03d}", "ts": ts + i,
+            "measurements": {"temperature": 20.0 + i % 5, "aqi": 40.0, "noise_db": 55.0}}
+
+
+def test_readings_are_split_into_monthly_partitions(tmp_path):
+    storage = open_storage(f"sqlite:///{tmp_path / 'ecoverse.db'}")
+    jan = [_reading(i) for i in range(100)]
+    feb = [_reading(i, ts=1738368000.0) for i in range(50)]  # 2025-02-01
+    assert storage.write_readings(jan + feb) == 150
+
+    assert storage.partitions() == ["sensor_readings_202501", "sensor_readings_202502"]
+    rows = storage.query_readings(sensor_id="sensor_003")
+    assert len(rows) == 15
+    assert rows[0]["measurements"] == {"temperature": 23.0, "aqi": 40.0, "noise_db": 55.0}
+    assert len(storage.query_readings(start=1738368000.0)) == 50
+    storage.close()
+
+
+def test_partition_bounds_are_utc_whatever_the_session_time_zone():
+    late_january = datetime(2025, 1, 31, 21, 0, tzinfo=timezone.utc).timestamp()  # 1 Feb in Asia/Kolkata
+    lower, upper = (datetime.fromisoformat(b) for b in _month_bounds(month_key(late_january)))
+    assert lower.utcoffset() is not None and upper.utcoffset() is not None
+    assert lower.timestamp() <= late_january < upper.timestamp()
+    assert _month_bounds("202412") == ("2024-12-01 00:00:00+00", "2025-01-01 00:00:00+00")
+
+
+@pytest.mark.skipif(not os.getenv("POSTGRES_TEST_URL"), reason="needs POSTGRES_TEST_URL (a scratch database)")
+def test_postgres_partitions_from_a_non_utc_session():
+    url = os.environ["POSTGRES_TEST_URL"]
+    storage = open_storage(url + ("&" if "?" in url else "?") + "options=-c%20timezone%3DAsia/Kolkata")
+    try:
+        edges = [datetime(2025, 1, 31, 21, 0, tzinfo=timezone.utc).timestamp(),  # 1 Feb locally
+                 datetime(2025, 3, 1, 2, 0, tzinfo=timezone.utc).timestamp()]  # 1 Mar, after midnight locally too
+        storage.write_readings([{"sensor_id": "edge", "ts": ts, "measurements": {"aqi": 1.0}} for ts in edges])
+        assert {"sensor_readings_202501", "sensor_readings_202503"} <= set(storage.partitions())
+        assert [r["ts"] for r in storage.query_readings(sensor_id="edge")] == edges
+    finally:
+        storage._execute("DROP TABLE IF EXISTS sensor_readings CASCADE")
+        storage.close()
+
+
+def test_copy_csv_encodes_nulls_and_json():
+    row = reading_row({"sensor_id": "s,1", "ts": 0.0, "measurements": {"aqi": 5, "x": "a\"b"}})
+    line = copy_csv([row]).getvalue()
+    assert line == '0.0,"s,1",,,5,,,"{""x"": ""a\\""b""}"\n'
+
+
+def test_bulk_insert_throughput():
+    storage = open_storage("sqlite://")
+    records = [_reading(i) for i in range(50_000)]
+    start = time.perf_counter()
+    storage.write_readings(records)
+    assert time.perf_counter() - start < 5.0  # tens of thousands per second, with margin for slow CI
+    assert storage._conn.execute("SELECT COUNT(*) FROM sensor_readings_202501").fetchone() == (50_000,)
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_on_size_interval_and_stop():
+    storage = open_storage("sqlite://")
+    buffer = WriteBehindBuffer(storage, max_rows=100, flush_interval=0.1)
+    buffer.start()
+    await buffer.add_readings([_reading(i) for i in range(150)])
+    await asyncio.sleep(0.05)
+    assert buffer.stats["rows_written"] == 150  # woken by size, not the interval
+    await buffer.add_readings([_reading(i) for i in range(5)])
+    await asyncio.sleep(0.2)
+    assert buffer.stats["rows_written"] == 155
+    await buffer.add_readings([_reading(i) for i in range(3)])
+    await buffer.stop()
+    assert buffer.pending == 0 and len(storage.query_readings()) == 158
+
+
+@pytest.mark.asyncio
+async def test_write_behind_keeps_rows_when_the_database_fails():
+    storage = open_storage("sqlite://")
+    calls = {"n": 0}
+    real_write = storage.write_readings
+
+    def flaky(records):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise ConnectionError("database restarting")
+        return real_write(records)
+
+    storage.write_readings = flaky
+    buffer = WriteBehindBuffer(storage)
+    await buffer.add_readings([_reading(i) for i in range(10)])
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert buffer.pending == 10
+    await buffer.flush()
+    assert buffer.pending == 0 and len(storage.query_readings()) == 10
+
+
+@pytest.mark.asyncio
+async def test_failed_backpressure_flush_does_not_duplicate_rows():
+    storage = open_storage("sqlite://")
+    calls = {"n": 0}
+    real_write = storage.write_readings
+
+    def flaky(records):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise ConnectionError("database restarting")
+        return real_write(records)
+
+    storage.write_readings = flaky
+    buffer = WriteBehindBuffer(storage, max_pending=50)
+    pipeline = DataPipeline(batch_size=50, sink=buffer, max_latency=0.05, retry_backoff=0.01)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(200):
+        await pipeline.submit({**_reading(i), "timestamp": "2025-01-01T00:00:00"})
+    await pipeline.stop_processing()
+    await task
+    await buffer.stop()
+    # The failed flush reached the pipeline, which retried only its own batch.
+    assert buffer.stats["write_errors"] == 1 and pipeline.stats["write_errors"] == 1
+    assert buffer.stats["rejected"] > 0
+    assert len(storage.query_readings()) == 200
+
+
+@pytest.mark.asyncio
+async def test_write_behind_stays_bounded_while_the_database_is_down():
+    storage = open_storage("sqlite://")
+
+    def down(records):
+        raise ConnectionError("database down")
+
+    storage.write_readings = down
+    buffer = WriteBehindBuffer(storage, max_pending=100)
+    pipeline = DataPipeline(batch_size=50, sink=buffer, max_latency=0.01, max_retries=2, retry_backoff=0.001)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(500):
+        await pipeline.submit({**_reading(i), "timestamp": "2025-01-01T00:00:00"})
+    await pipeline.stop_processing()
+    await task
+    assert buffer.pending <= 100
+    assert pipeline.stats["failed"] == 500 - buffer.pending and pipeline.failed_batches
+
+
+@pytest.mark.asyncio
+async def test_data_pipeline_persists_through_write_behind():
+    storage = open_storage("sqlite://")
+    buffer = WriteBehindBuffer(storage, flush_interval=0.05)
+    buffer.start()
+    pipeline = DataPipeline(batch_size=50, sink=buffer, max_latency=0.05)
+    task = asyncio.create_task(pipeline.start_processing())
+    for i in range(500):
+        await pipeline.submit({**_reading(i), "timestamp": "2025-01-01T00:00:00"})
+    await pipeline.stop_processing()
+    await task
+    await buffer.stop()
+    assert len(storage.query_readings()) == 500
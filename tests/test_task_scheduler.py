@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from core.task_scheduler import DAY, HOUR, SENTINEL2_REVISIT, RegionScheduler, RevisitPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _result(anomaly=False, change=0.5):
+    return {"analysis": {"is_anomaly": anomaly, "percent_change": change}}
+
+
+def _scheduler(**kwargs):
+    clock = Clock()
+    return RegionScheduler(RevisitPolicy(jitter=0.0), clock=clock, seed=0, **kwargs), clock
+
+
+def test_stable_regions_back_off_and_anomalies_revisit_next_pass():
+    scheduler, clock = _scheduler()
+    scheduler.add("r")
+    intervals = []
+    for anomaly in (False, False, False, False, True, False):
+        (state,) = scheduler.due()
+        when = scheduler.complete("r", _result(anomaly, -20.0 if anomaly else 0.5))
+        intervals.append((when - clock.now) / SENTINEL2_REVISIT)
+        clock.now = when
+    # The -20% jump keeps the region volatile (one revisit) while it is in the recent history.
+    assert intervals == [2, 4, 4, 4, 1, 1]
+
+
+def test_volatile_regions_stay_on_every_revisit():
+    scheduler, clock = _scheduler()
+    scheduler.add("r")
+    for change in (4.0, -4.0, 4.5, -4.5):  # below the anomaly threshold but noisy
+        scheduler.due()
+        clock.now = scheduler.complete("r", _result(False, change))
+    assert clock.now - scheduler.get("r").last_run == SENTINEL2_REVISIT
+
+
+def test_failures_retry_with_backoff():
+    scheduler, clock = _scheduler()
+    scheduler.add("r")
+    delays = []
+    for _ in range(3):
+        scheduler.due()
+        when = scheduler.complete("r", {"region": "r", "error": "TimeoutError"})
+        delays.append(when - clock.now)
+        clock.now = when
+    assert delays == [HOUR, 2 * HOUR, 4 * HOUR]
+    assert scheduler.get("r").last_error == "TimeoutError"
+
+
+def test_in_flight_runs_are_not_handed_out_twice_and_limits_hold():
+    scheduler, clock = _scheduler(concurrency=2, quota=3, quota_window=DAY)
+    for name in "abcde":
+        scheduler.add(name)
+    first = scheduler.due()
+    assert len(first) == 2  # concurrency
+    scheduler.trigger("a")
+    assert scheduler.due() == []  # still full, and "a" is in flight
+    assert scheduler.stats["deduplicated"] == 1
+    scheduler.complete("a", _result())
+    assert [s.name for s in scheduler.due()] == ["c"]
+    scheduler.complete("b", _result())
+    assert scheduler.due() == []  # 3 runs used the daily quota
+    clock.now = DAY + 1
+    assert len(scheduler.due()) == 1
+    with pytest.raises(ValueError):
+        _scheduler(quota=0)
+
+
+@pytest.mark.asyncio
+async def test_service_loop_runs_due_regions():
+    scheduler = RegionScheduler(RevisitPolicy(revisit=0.05, jitter=0.0, max_revisits=1), concurrency=2)
+    seen = []
+
+    async def runner(state):
+        seen.append(state.name)
+        await asyncio.sleep(0.01)
+        return _result()
+
+    for name in ("a", "b", "c"):
+        scheduler.add(name, bbox=(0, 0, 1, 1))
+    stop = asyncio.Event()
+    loop = asyncio.create_task(scheduler.run(runner, stop))
+    await asyncio.sleep(0.18)
+    stop.set()
+    await asyncio.wait_for(loop, 1)
+
+    assert set(seen) == {"a", "b", "c"}
+    assert all(seen.count(name) >= 2 for name in "abc")  # revisited every 50 ms
+    assert scheduler.metrics()["in_flight"] == 0